@@ -1,40 +1,102 @@
 from langchain_openai import ChatOpenAI
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from langchain_core.tools import Tool
 from langchain_core.prompts import PromptTemplate
+from langchain_core.agents import AgentAction
 
 from fastapi import HTTPException
 
 
 from langchain_classic.agents import AgentExecutor, create_react_agent ### the libirary moved after version 1 (old docs)
 import re
+import json
+import math
+import time
+import random
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
+import httpx
+import openai
 
-from app.routes.crud import asset_crud
+
+from app.routes.crud import async_asset_crud
+from app.cache import asset_cache
+from app.agent_cache import agent_answer_cache, normalize_question
+from app.agent_router import FastPathRouter
+from app.agent_memory import ConversationSession, agent_memory
+from app.agent_callbacks import AgentMetricsHandler
+from app.agent_metrics import QueryMetrics, agent_metrics, current_query_metrics
 from app.config import get_settings
+from app.schemas import AgentQuery
 
 settings = get_settings()
 
+SEARCH_FILTER_KEYS = ("category", "status", "min_value", "max_value", "purchase_date_from", "purchase_date_to", "search")
+SEARCH_SORT_FIELDS = ("name", "value", "purchase_date", "created_at", "updated_at")
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+# per-query state, so one AssetAgent (LLM client, tools, executor) can serve every request
+_current_db: ContextVar[AsyncSession] = ContextVar("agent_db")
+_referenced_asset_ids: ContextVar[list] = ContextVar("agent_referenced_asset_ids")
+_shared_tool_results: ContextVar[Optional["SharedToolResults"]] = ContextVar("agent_shared_tool_results", default=None)
+_current_session: ContextVar[Optional[ConversationSession]] = ContextVar("agent_session", default=None)
+# assets fetched by a batch's shared tool call, handed to the session of every query using its result
+_fetched_assets: ContextVar[Optional[dict]] = ContextVar("agent_fetched_assets", default=None)
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.AGENT_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.AGENT_HTTP_MAX_CONNECTIONS,
+        keepalive_expiry=60,
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
 class AssetAgent:
-    def __init__(self, db: Session):
-        self.db = db
-        self.referenced_asset_ids = []
-        self.llm = ChatOpenAI(
+    """
+    Built once per process (see get_asset_agent). The DB session and referenced ids of
+    the query being answered live in context variables set by aquery()/astream_query().
+    """
+
+    def __init__(self, llm=None):
+        self.llm = llm or ChatOpenAI(
             model="gpt-4o-mini",
             api_key=settings.OPEN_API_KEY, 
+            base_url=settings.AGENT_LLM_BASE_URL,
             temperature=0,
-            max_tokens=300 # forget to add max token causing reach limit 
+            max_tokens=300, # forget to add max token causing reach limit 
+            stream_usage=True,  # token usage of streamed calls, for the agent metrics
+            # pooled keep-alive connections shared by every query
+            http_async_client=httpx.AsyncClient(limits=_http_limits(), timeout=60),
         )
 
         self.tools = [
             Tool(
                 name="search_assets",
-                func=self.search_asset_tool,
-                description="Useful for when you need to answer questions about what assets exist. Returns a list of asset names, values, and categories."
+                func=None,  # async only, the agent runs through aquery()/astream_query()
+                coroutine=self.asearch_asset_tool,
+                description=f"""Search assets with filters. Input is a JSON object, every key optional:
+                category (electronics, furniture, vehicle, jewelry, other), status (active, sold, donated),
+                min_value, max_value, purchase_date_from, purchase_date_to (YYYY-MM-DD), search (words in name/description),
+                sort_by (value, name, purchase_date, created_at), order (asc, desc), limit (max {settings.AGENT_SEARCH_MAX_ROWS}).
+                Example: {{"category": "electronics", "sort_by": "value", "order": "desc", "limit": 5}}
+                Returns the count, total/avg/min/max value of ALL matches, then up to limit matching assets.
+                Use the totals line for sums and counts instead of adding up rows."""
             ),
              Tool(
                 name="get_asset_by_id",
-                func=self._get_asset_by_id,
+                func=None,
+                coroutine=self._aget_asset_by_id,
                 description="""Get detailed information about a specific asset by ID.
                 Use this when you have an asset ID and need full details.
                 Input should be the asset ID string.
@@ -52,112 +114,490 @@ class AssetAgent:
         ... (this Thought/Action/Action Input/Observation can repeat N times)
         Thought: I now know the final answer
         Final Answer: the final answer to the original input question
+        Conversation so far (use it for follow-up questions, assets listed there need no tool call):
+        {history}
         Begin! Question: {input}
         Thought: {agent_scratchpad}"""
 
         self.prompt = PromptTemplate.from_template(template)
 
+        # simple lookups/aggregates skip the LLM entirely
+        self.router = FastPathRouter(self._extract_asset_ids)
+
+        self.executor = AgentExecutor(
+            agent=create_react_agent(self.llm, self.tools, self.prompt),
+            tools=self.tools,
+            verbose=False,  ## convert it to true when you need to see the reasonoing 
+            handle_parsing_errors=True,
+            max_iterations=2
+        )
+
+    @property
+    def db(self) -> AsyncSession:
+        return _current_db.get()
+
+    @property
+    def referenced_asset_ids(self) -> list:
+        return _referenced_asset_ids.get()
+
 
     def _extract_asset_ids(self, text: str) -> list:
         uuid_pattern = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
         return re.findall(uuid_pattern, text, re.IGNORECASE)
 
-    def search_asset_tool(self, query: str = "") -> str:
+    def _parse_search_input(self, query: str) -> dict:
+        """Tool input -> get_all keyword arguments. Accepts the JSON filter object or plain search words"""
+        text = query.strip().strip("`").strip()
+        if text.startswith("json"):
+            text = text[4:].strip()
+
         try:
-            assets = asset_crud.get_all(self.db, limit=100)
-            if not assets:
-                return "The database is currently empty."
-            
-            result = []
-            for asset in assets:
-                result.append(
-                    f"ID: {asset.id}\n"
-                    f"  Name: {asset.name}\n"
-                    f"  Value: ${asset.value}\n"
-                    f"  Category: {asset.category}\n"
-                    f"  Status: {asset.status}\n"
-                    f"  Purchase Date: {asset.purchase_date}"
-                )
-            return "Current Assets in Database:\n" + "\n".join(result)
+            params = json.loads(text) if text.startswith("{") else {"search": text.strip("'\"")}
+        except json.JSONDecodeError:
+            params = {"search": text}
+
+        filters = {key: params.get(key) or None for key in SEARCH_FILTER_KEYS}
+        for key in ("min_value", "max_value"):
+            if filters[key] is not None:
+                filters[key] = float(filters[key])
+        for key in ("purchase_date_from", "purchase_date_to"):
+            if filters[key] is not None:
+                filters[key] = date.fromisoformat(str(filters[key]))
+
+        sort_by = params.get("sort_by")
+        order = params.get("order")
+        limit = int(params.get("limit") or settings.AGENT_SEARCH_MAX_ROWS)
+        return {
+            **filters,
+            "sort_by": sort_by if sort_by in SEARCH_SORT_FIELDS else "created_at",
+            "order": order if order in ("asc", "desc") else "desc",
+            "limit": max(1, min(limit, settings.AGENT_SEARCH_MAX_ROWS)),
+        }
+
+    async def asearch_asset_tool(self, query: str = "") -> str:
+        return await _shared_tool_call(("search_assets", query.strip()), lambda: self._asearch_assets(query))
+
+    async def _asearch_assets(self, query: str) -> str:
+        try:
+            try:
+                params = self._parse_search_input(query)
+            except (TypeError, ValueError) as e:
+                return self._invalid_search_input(e)
+
+            limit = params.pop("limit")
+            filters = {key: params[key] for key in SEARCH_FILTER_KEYS}
+
+            groups, _ = await async_asset_crud.analytics(self.db, [], **filters)
+            if not groups:
+                return "No assets match these filters."
+
+            assets = await async_asset_crud.get_all(self.db, limit=limit, **params)
+            _remember_assets(assets)
+            return self._format_search(groups[0], assets)
         except Exception as e:
             return f"Error accessing database: {str(e)}"
+
+    def _invalid_search_input(self, error: Exception) -> str:
+        return f"Invalid search input ({error}). Use a JSON object like {{\"category\": \"electronics\"}}."
+
+    def _format_search(self, totals: dict, assets: list) -> str:
+        """Totals line over every match, then the capped rows"""
+        lines = [
+            f"Matches: {totals['count']} assets, total value ${totals['total_value']:.2f}, "
+            f"avg ${totals['avg_value']:.2f}, min ${totals['min_value']:.2f}, max ${totals['max_value']:.2f}",
+            "id | name | category | status | value | purchase_date",
+        ]
+        lines.extend(_asset_row(asset) for asset in assets)
+
+        remaining = totals["count"] - len(assets)
+        if remaining > 0:
+            lines.append(f"... and {remaining} more (narrow the filters or change sort_by/order to see others)")
+        return "\n".join(lines)
         
-    def _get_asset_by_id(self, asset_id: str) -> str:
+    async def _aget_asset_by_id(self, asset_id: str) -> str:
+        text, found_id = await _shared_tool_call(("get_asset_by_id", asset_id.strip()), lambda: self._alookup_asset(asset_id))
+        # recorded here and not in the lookup, a shared/remembered result still counts for every query using it
+        if found_id:
+            self.referenced_asset_ids.append(found_id)
+        return text
+
+    async def _alookup_asset(self, asset_id: str) -> Tuple[str, Optional[str]]:
         try:
-            asset = asset_crud.get_by_id(self.db, asset_id.strip())
-            
+            asset = await async_asset_crud.get_by_id(self.db, asset_id.strip())
+
             if not asset:
-                return f"Asset with ID {asset_id} not found."
-            
-            self.referenced_asset_ids.append(asset.id)
-            
-            return (
-                f"Asset Details:\n"
-                f"ID: {asset.id}\n"
-                f"Name: {asset.name}\n"
-                f"Category: {asset.category}\n"
-                f"Value: ${asset.value}\n"
-                f"Status: {asset.status}\n"
-                f"Purchase Date: {asset.purchase_date}\n"
-                f"Description: {asset.description or 'N/A'}\n"
-                f"Created: {asset.created_at}\n"
-                f"Updated: {asset.updated_at}"
-            )
-        
+                return f"Asset with ID {asset_id} not found.", None
+
+            _remember_assets([asset])
+            return self._format_asset(asset), asset.id
+
         except Exception as e:
-            return f"Error getting asset: {str(e)}"
-    
+            return f"Error getting asset: {str(e)}", None
 
-    def query(self, question: str) -> dict:
-        """The single entry point for the API"""
-        self.referenced_asset_ids = []
+    def _format_asset(self, asset) -> str:
+        return (
+            f"Asset Details:\n"
+            f"ID: {asset.id}\n"
+            f"Name: {asset.name}\n"
+            f"Category: {asset.category}\n"
+            f"Value: ${asset.value}\n"
+            f"Status: {asset.status}\n"
+            f"Purchase Date: {asset.purchase_date}\n"
+            f"Description: {asset.description or 'N/A'}\n"
+            f"Created: {asset.created_at}\n"
+            f"Updated: {asset.updated_at}"
+        )
+    
 
+    async def aquery(self, question: str, db: AsyncSession, include_metrics: bool = False, session_id: Optional[str] = None) -> dict:
+        """The single entry point for the API: async LLM client and async tools"""
         try:
-            agent = create_react_agent(self.llm, self.tools, self.prompt)
-            
-            executor = AgentExecutor(
-                agent=agent,
-                tools=self.tools,
-                verbose=False,  ## convert it to true when you need to see the reasonoing 
-                handle_parsing_errors=True,
-                max_iterations=2
-            )
-            
-            result = executor.invoke({"input": question})
-            
-            extracted_ids = self._extract_asset_ids(result["output"])
-            if extracted_ids:
-                self.referenced_asset_ids.extend(extracted_ids)
-            
-            unique_sources = list(set(self.referenced_asset_ids))
-            
-            if not unique_sources and "asset" in result["output"].lower():
-                if "intermediate_steps" in result:
-                    for step in result["intermediate_steps"]:
-                        if len(step) >= 2:
-                            tool_output = str(step[1])
-                            ids = self._extract_asset_ids(tool_output)
-                            unique_sources.extend(ids)
-                    unique_sources = list(set(unique_sources))
-            
-            return {
-                "answer": result["output"],
-                "sources": unique_sources,
-                "query_type": "success",
-                "assets_found": len(unique_sources) if unique_sources else None
-            }
+            return await self._aquery(question, db, include_metrics, session_id)
         except HTTPException:
             raise
         except Exception as e:
-            error_str = str(e).lower()
-
-            if "rate limit" in error_str or "429" in error_str:
-                raise HTTPException(
-                    status_code=429,
-                    detail="OpenAI rate limit reached. Please retry later."
-                )
-
-            raise HTTPException(
-                status_code=500,
-                detail="Internal agent error"
-            )
\ No newline at end of file
+            raise self._agent_error(e)
+
+    async def _aquery(self, question: str, db: AsyncSession, include_metrics: bool, session_id: Optional[str] = None) -> dict:
+        """aquery() letting executor errors through, so the batch can retry rate limits"""
+        metrics = QueryMetrics(question)
+        session = await agent_memory.session(session_id)
+        cached = await self._cached_answer(question, metrics, include_metrics, session)
+        if cached is not None:
+            return cached
+        data_version = await asset_cache.data_version()
+
+        route = self.router.parse(question)
+        with self._query_scope(db, metrics, data_version, session):
+            if route is not None:
+                metrics.fast_path = True
+                response = await self.router.aanswer(db, route)
+            else:
+                result = await self.executor.ainvoke(self._executor_input(question, session), config=self._run_config(metrics))
+                response = await self._answer(question, result, data_version, session)
+            await self._remember_turn(session, question, response)
+        return self._with_metrics(response, metrics, include_metrics)
+
+    async def abatch_query(self, queries: List[AgentQuery], session_factory: Callable[[], AsyncSession]) -> dict:
+        """
+        Answer a list of questions concurrently (at most AGENT_BATCH_CONCURRENCY at a time), each
+        on its own session. Repeated questions run once, identical tool calls hit the DB once,
+        and a rate limit on any query pauses the whole batch before retrying.
+        """
+        semaphore = asyncio.Semaphore(settings.AGENT_BATCH_CONCURRENCY)
+        backoff = _RateLimitBackoff()
+        shared = SharedToolResults(session_factory)
+        shared_token = _shared_tool_results.set(shared)
+        try:
+            # the tasks copy the context here, so they all see the same SharedToolResults
+            tasks = {}
+            for query in queries:
+                key = (normalize_question(query.question), query.include_metrics, query.session_id)
+                if key not in tasks:
+                    tasks[key] = asyncio.ensure_future(self._abatch_item(query, session_factory, semaphore, backoff))
+            await asyncio.gather(*tasks.values())
+        finally:
+            _shared_tool_results.reset(shared_token)
+
+        results = [
+            {**tasks[(normalize_question(query.question), query.include_metrics, query.session_id)].result(), "question": query.question}
+            for query in queries
+        ]
+        failed = sum(1 for result in results if result["error"] is not None)
+        return {
+            "results": results,
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "shared_tool_calls": shared.hits,
+        }
+
+    async def _abatch_item(self, query: AgentQuery, session_factory, semaphore: asyncio.Semaphore, backoff: "_RateLimitBackoff") -> dict:
+        async with semaphore:
+            for attempt in range(settings.AGENT_BATCH_MAX_RETRIES + 1):
+                await backoff.wait()
+                try:
+                    async with session_factory() as db:
+                        response = await self._aquery(query.question, db, query.include_metrics, query.session_id)
+                        return {"response": response, "error": None}
+                except Exception as e:
+                    delay = _rate_limit_delay(e, attempt)
+                    if delay is None or attempt == settings.AGENT_BATCH_MAX_RETRIES:
+                        error = e if isinstance(e, HTTPException) else self._agent_error(e)
+                        return {"response": None, "error": {"status": error.status_code, "detail": error.detail}}
+                    backoff.pause(delay)
+
+    async def astream_query(self, question: str, db: AsyncSession, include_metrics: bool = False, session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        aquery() as Server-Sent Events: tool_start/tool_end for every tool call, token for
+        each piece of the final answer as the LLM writes it, then answer (the AgentResponse
+        payload) or error
+        """
+        metrics = QueryMetrics(question)
+        session = await agent_memory.session(session_id)
+        cached = await self._cached_answer(question, metrics, include_metrics, session)
+        if cached is not None:
+            yield _sse("answer", cached)
+            return
+        data_version = await asset_cache.data_version()
+
+        route = self.router.parse(question)
+        if route is not None:
+            metrics.fast_path = True
+            try:
+                with self._query_scope(db, metrics, data_version, session):
+                    response = await self.router.aanswer(db, route)
+                    await self._remember_turn(session, question, response)
+            except Exception as e:
+                error = self._agent_error(e)
+                yield _sse("error", {"status": error.status_code, "detail": error.detail})
+                return
+            yield _sse("answer", self._with_metrics(response, metrics, include_metrics))
+            return
+
+        try:
+            with self._query_scope(db, metrics, data_version, session):
+                result = None
+                generated = {}  # LLM run id -> text generated so far
+                events = self.executor.astream_events(self._executor_input(question, session), config=self._run_config(metrics), version="v2")
+                async for event in events:
+                    kind = event["event"]
+                    if kind == "on_parser_end" and isinstance(event["data"].get("output"), AgentAction):
+                        # the tool events don't carry plain string inputs, the parsed ReAct action does
+                        action = event["data"]["output"]
+                        yield _sse("tool_start", {"tool": action.tool, "input": action.tool_input})
+                    elif kind == "on_tool_end":
+                        yield _sse("tool_end", {"tool": event["name"], "output": str(event["data"].get("output"))})
+                    elif kind == "on_chat_model_stream":
+                        token = self._answer_token(generated, event["run_id"], event["data"]["chunk"].content)
+                        if token:
+                            yield _sse("token", {"text": token})
+                    elif kind == "on_chain_end" and not event["parent_ids"]:
+                        result = event["data"]["output"]
+
+                response = await self._answer(question, result, data_version, session)
+                await self._remember_turn(session, question, response)
+        except Exception as e:
+            # the 200 and headers are already sent, report the failure as the last event
+            error = e if isinstance(e, HTTPException) else self._agent_error(e)
+            yield _sse("error", {"status": error.status_code, "detail": error.detail})
+            return
+        yield _sse("answer", self._with_metrics(response, metrics, include_metrics))
+
+    @contextmanager
+    def _query_scope(self, db: AsyncSession, metrics: QueryMetrics, data_version: int, session: Optional[ConversationSession] = None):
+        """Per-query state of the shared agent, the metrics are recorded when the query ends"""
+        if session is not None:
+            session.sync_version(data_version)
+        db_token = _current_db.set(db)
+        ids_token = _referenced_asset_ids.set([])
+        metrics_token = current_query_metrics.set(metrics)
+        session_token = _current_session.set(session)
+        try:
+            yield
+        except Exception:
+            metrics.error = True
+            raise
+        finally:
+            _current_db.reset(db_token)
+            _referenced_asset_ids.reset(ids_token)
+            current_query_metrics.reset(metrics_token)
+            _current_session.reset(session_token)
+            agent_metrics.record(metrics.finish())
+
+    def _run_config(self, metrics: QueryMetrics) -> dict:
+        return {"callbacks": [AgentMetricsHandler(metrics)]}
+
+    def _executor_input(self, question: str, session: Optional[ConversationSession]) -> dict:
+        return {"input": question, "history": session.render() if session is not None else "(none)"}
+
+    async def _remember_turn(self, session: Optional[ConversationSession], question: str, response: dict) -> None:
+        if session is not None:
+            session.record_turn(question, response["answer"])
+            await agent_memory.save(session)
+
+    async def _cached_answer(self, question: str, metrics: QueryMetrics, include_metrics: bool, session: Optional[ConversationSession] = None) -> Optional[dict]:
+        if session is not None and session.has_history:
+            return None  # a follow-up depends on the conversation, not just the question
+        cached = await agent_answer_cache.get(question)
+        if cached is None:
+            return None
+        metrics.cached = True
+        agent_metrics.record(metrics.finish())
+        # the session starts here too, a follow-up needs this turn as its context
+        if session is not None:
+            session.sync_version(await asset_cache.data_version())
+        await self._remember_turn(session, question, cached)
+        return self._with_metrics({**cached, "cached": True}, metrics, include_metrics)
+
+    def _with_metrics(self, response: dict, metrics: QueryMetrics, include_metrics: bool) -> dict:
+        return {**response, "metrics": metrics.as_dict()} if include_metrics else response
+
+    def _answer_token(self, generated: dict, run_id: str, chunk: str) -> str:
+        """The part of a streamed LLM chunk that belongs to the final answer (ReAct thoughts/actions are not streamed)"""
+        text = generated.get(run_id, "") + chunk
+        generated[run_id] = text
+        marker = text.find(FINAL_ANSWER_MARKER)
+        if marker < 0:
+            return ""
+        answer_start = marker + len(FINAL_ANSWER_MARKER)
+        already_seen = len(text) - len(chunk)
+        if already_seen <= answer_start:
+            return text[answer_start:].lstrip()
+        return chunk
+
+    async def _answer(self, question: str, result: dict, data_version: int, session: Optional[ConversationSession] = None) -> dict:
+        """Executor result -> AgentResponse payload, cached under the data version read before the query"""
+        extracted_ids = self._extract_asset_ids(result["output"])
+        if extracted_ids:
+            self.referenced_asset_ids.extend(extracted_ids)
+        
+        unique_sources = list(set(self.referenced_asset_ids))
+        
+        if not unique_sources and "asset" in result["output"].lower():
+            if "intermediate_steps" in result:
+                for step in result["intermediate_steps"]:
+                    if len(step) >= 2:
+                        tool_output = str(step[1])
+                        ids = self._extract_asset_ids(tool_output)
+                        unique_sources.extend(ids)
+                unique_sources = list(set(unique_sources))
+        
+        response = {
+            "answer": result["output"],
+            "sources": unique_sources,
+            "query_type": "success",
+            "assets_found": len(unique_sources) if unique_sources else None
+        }
+        if session is None or not session.has_history:
+            await agent_answer_cache.set(question, response, data_version)
+        return response
+
+    def _agent_error(self, e: Exception) -> HTTPException:
+        delay = _rate_limit_delay(e)
+        if delay is not None:
+            return HTTPException(
+                status_code=429,
+                detail="OpenAI rate limit reached. Please retry later.",
+                headers={"Retry-After": str(math.ceil(delay))},
+            )
+
+        return HTTPException(
+            status_code=500,
+            detail="Internal agent error"
+        )
+
+
+def _rate_limit_delay(e: Exception, attempt: int = 0) -> Optional[float]:
+    """Seconds to wait before retrying when e is an LLM rate limit (Retry-After if sent, else exponential with jitter), None otherwise"""
+    # the exception type or its status, never its message: asset ids, values and counts can contain "429"
+    if not isinstance(e, openai.RateLimitError) and getattr(e, "status_code", None) != 429:
+        return None
+    retry_after = getattr(getattr(e, "response", None), "headers", {}).get("retry-after")
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        base = settings.AGENT_BATCH_BACKOFF_SECONDS
+        return base * 2 ** attempt + random.uniform(0, base)
+
+
+class _RateLimitBackoff:
+    """Shared by the queries of one batch: a rate limit on any of them pauses all of them"""
+
+    def __init__(self):
+        self.resume_at = 0.0
+
+    def pause(self, delay: float) -> None:
+        self.resume_at = max(self.resume_at, time.monotonic() + delay)
+
+    async def wait(self) -> None:
+        delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class SharedToolResults:
+    """
+    Tool results of one batch, keyed by (tool, input): identical calls across its queries run once.
+    A call runs in a task of its own, on its own DB session and outside any conversation, so it
+    doesn't depend on the query that happened to start it; the assets it fetched go to the session
+    of every query that uses the result.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession]):
+        self.session_factory = session_factory
+        self._results: Dict[tuple, asyncio.Future] = {}
+        self.hits = 0
+
+    async def get(self, key: tuple, run: Callable[[], Awaitable]):
+        result = self._results.get(key)
+        if result is None:
+            result = self._results[key] = asyncio.ensure_future(self._run(run))
+        else:
+            self.hits += 1
+        result, fetched = await result
+        session = _current_session.get()
+        if session is not None and fetched:
+            session.remember_assets(fetched)
+        return result
+
+    async def _run(self, run: Callable[[], Awaitable]) -> Tuple[Any, dict]:
+        # the task has its own copy of the context, these don't leak into the query that started it
+        fetched = {}
+        _fetched_assets.set(fetched)
+        _current_session.set(None)
+        async with self.session_factory() as db:
+            _current_db.set(db)
+            return await run(), fetched
+
+
+async def _shared_tool_call(key: tuple, run: Callable[[], Awaitable]):
+    """
+    The session's remembered result for key, else run() once per batch for the same key
+    (or just run() outside a batch)
+    """
+    session = _current_session.get()
+    if session is not None:
+        remembered = session.tool_result(key)
+        if remembered is not None:
+            return remembered
+
+    shared = _shared_tool_results.get()
+    result = await run() if shared is None else await shared.get(key, run)
+    if session is not None and not _is_tool_error(result):
+        session.remember_tool_result(key, result)
+    return result
+
+
+def _is_tool_error(result) -> bool:
+    """DB errors are not remembered, the next call retries them"""
+    text = result[0] if isinstance(result, tuple) else result
+    return text.startswith("Error")
+
+
+def _asset_row(asset) -> str:
+    return f"{asset.id} | {asset.name} | {asset.category} | {asset.status} | ${asset.value} | {asset.purchase_date}"
+
+
+def _remember_assets(assets) -> None:
+    """Keep fetched assets in the conversation, follow-ups about them need no tool call"""
+    rows = {asset.id: _asset_row(asset) for asset in assets}
+    fetched = _fetched_assets.get()
+    if fetched is not None:
+        fetched.update(rows)
+    session = _current_session.get()
+    if session is not None:
+        session.remember_assets(rows)
+
+
+_asset_agent: Optional[AssetAgent] = None
+_asset_agent_lock = threading.Lock()
+
+
+def get_asset_agent() -> AssetAgent:
+    """The process-wide agent, built on first use"""
+    global _asset_agent
+    if _asset_agent is None:
+        with _asset_agent_lock:
+            if _asset_agent is None:
+                _asset_agent = AssetAgent()
+    return _asset_agent
\ No newline at end of file
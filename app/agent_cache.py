@@ -0,0 +1,137 @@
+"""
+Answer cache for agent queries.
+
+Answers are keyed on the normalized question plus the asset data version (bumped by
+every AsyncAssetCRUD write, see AssetCache.data_version), so any change to the assets makes
+every cached answer unreachable.
+
+With AGENT_CACHE_SEMANTIC=true a miss on the exact question also looks for a cached
+question whose embedding is at least AGENT_CACHE_SIMILARITY cosine-similar, in a small
+in-process vector index ("total value of my electronics" ~ "what are my electronics worth in total").
+The embedding call is async (aembed_query), so a lookup waiting on it doesn't block the event loop.
+"""
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from app.cache import CacheBackend, asset_cache, cache_backend
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, punctuation to spaces, collapsed whitespace"""
+    return " ".join(re.sub(r"[^\w$.-]+", " ", question.lower()).split()).strip(" .")
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class AgentAnswerCache:
+    """Cached AgentResponse payloads, exact match first, then optional embedding similarity"""
+
+    # embeddings of recent questions kept in process, so a repeated question isn't embedded again
+    MAX_EMBEDDINGS = 1024
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        embed: Optional[Callable[[str], Awaitable[List[float]]]] = None,
+        threshold: float = 0.95,
+        max_vectors: int = 512,
+        enabled: bool = True,
+    ):
+        self.backend = backend
+        self.threshold = threshold
+        self.max_vectors = max_vectors
+        self.enabled = enabled
+        self._embed = embed
+        # normalized question -> embedding, the most recently used last
+        self._embedded: "OrderedDict[str, List[float]]" = OrderedDict()
+        # (data version, embedding, normalized question) of the cached answers
+        self._vectors: List[Tuple[int, List[float], str]] = []
+        self._lock = threading.Lock()
+        self.semantic_hits = 0
+
+    def _key(self, version: int, normalized: str) -> str:
+        return f"agent:{version}:{normalized}"
+
+    async def _vector(self, normalized: str) -> List[float]:
+        vector = self._embedded.get(normalized)
+        if vector is None:
+            vector = await self._embed(normalized)
+        with self._lock:
+            self._embedded[normalized] = vector
+            self._embedded.move_to_end(normalized)
+            while len(self._embedded) > self.MAX_EMBEDDINGS:
+                self._embedded.popitem(last=False)
+        return vector
+
+    async def get(self, question: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        version = await asset_cache.data_version()
+        normalized = normalize_question(question)
+
+        cached = await self.backend.get(self._key(version, normalized))
+        if cached is not None or self._embed is None:
+            return cached
+
+        vector = await self._vector(normalized)
+        with self._lock:
+            # answers from older data versions can never be served again
+            self._vectors = [entry for entry in self._vectors if entry[0] == version]
+            best = max(self._vectors, key=lambda entry: _cosine(vector, entry[1]), default=None)
+        if best is None or _cosine(vector, best[1]) < self.threshold:
+            return None
+
+        cached = await self.backend.get(self._key(version, best[2]))
+        if cached is not None:
+            self.semantic_hits += 1
+        return cached
+
+    async def set(self, question: str, response: dict, version: int) -> None:
+        """Store an answer computed against the given data version (read it before running the query)"""
+        if not self.enabled:
+            return
+        normalized = normalize_question(question)
+        await self.backend.set(self._key(version, normalized), response)
+
+        if self._embed is not None:
+            vector = await self._vector(normalized)
+            with self._lock:
+                self._vectors.append((version, vector, normalized))
+                del self._vectors[:-self.max_vectors]
+
+    async def stats(self) -> dict:
+        return {**await self.backend.stats(), "semantic_hits": self.semantic_hits, "vectors": len(self._vectors)}
+
+
+_embeddings: Optional[Any] = None
+
+
+async def _openai_embed(text: str) -> List[float]:
+    global _embeddings
+    if _embeddings is None:
+        from langchain_openai import OpenAIEmbeddings  # imported on the first semantic lookup, it is slow to import
+
+        _embeddings = OpenAIEmbeddings(
+            model=settings.AGENT_CACHE_EMBEDDING_MODEL,
+            api_key=settings.OPEN_API_KEY,
+            base_url=settings.AGENT_LLM_BASE_URL,
+        )
+    return await _embeddings.aembed_query(text)
+
+
+agent_answer_cache = AgentAnswerCache(
+    cache_backend("agent_answers", max_entries=settings.AGENT_CACHE_MAX_ENTRIES, ttl=settings.AGENT_CACHE_TTL_SECONDS),
+    embed=_openai_embed if settings.AGENT_CACHE_SEMANTIC else None,
+    threshold=settings.AGENT_CACHE_SIMILARITY,
+    enabled=settings.AGENT_CACHE_ENABLED,
+)
@@ -0,0 +1,63 @@
+"""
+LangChain callbacks of the agent, kept apart from app/agent_metrics.py so that importing
+the metrics doesn't import LangChain.
+"""
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.agent_metrics import QueryMetrics
+
+
+class AgentMetricsHandler(BaseCallbackHandler):
+    """Records LLM and tool calls of one query into its QueryMetrics"""
+
+    # called inline by the async executor too, no thread hop per event
+    run_inline = True
+
+    def __init__(self, metrics: QueryMetrics):
+        self.metrics = metrics
+        self._started: Dict[UUID, float] = {}
+        self._tool_names: Dict[UUID, str] = {}
+
+    def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized: dict, prompts: list, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt_tokens, completion_tokens = _token_usage(response)
+        self.metrics.llm_calls.append({
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "ms": self._elapsed_ms(run_id),
+        })
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, name: Optional[str] = None, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+        self._tool_names[run_id] = name or (serialized or {}).get("name", "unknown")
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self.metrics.tool_calls.append({"tool": self._tool_names.pop(run_id, "unknown"), "ms": self._elapsed_ms(run_id)})
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.metrics.tool_calls.append({"tool": self._tool_names.pop(run_id, "unknown"), "ms": self._elapsed_ms(run_id), "error": True})
+
+    def _elapsed_ms(self, run_id: UUID) -> float:
+        started = self._started.pop(run_id, None)
+        return round((time.perf_counter() - started) * 1000, 2) if started else 0.0
+
+
+def _token_usage(response: LLMResult) -> tuple:
+    """(prompt, completion) tokens: usage_metadata of the message (streamed calls) or llm_output token_usage"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
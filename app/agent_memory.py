@@ -0,0 +1,198 @@
+"""
+Session memory for agent conversations (AgentQuery.session_id).
+
+A session keeps:
+  - the recent turns (question, answer), rendered into the prompt as {history}
+  - a summary of older turns: when the history goes over AGENT_MEMORY_TOKEN_BUDGET the
+    oldest turn is folded into one short line, and the oldest lines are dropped after that
+  - the assets already fetched (one row each), so follow-ups can be answered without tools
+  - tool results by (tool, input), so a repeated search/lookup doesn't hit the database
+
+Assets and tool results belong to one asset data version (AssetCache.data_version) and
+are dropped as soon as any asset is written. Sessions expire after AGENT_MEMORY_TTL_SECONDS
+without a query. With a shared SHARED_STATE_BACKEND the session is stored again after every
+turn (as JSON, to_dict/from_dict), so the next question of a conversation can land on any worker.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+from app.cache import CacheBackend, cache_backend
+from app.config import get_settings
+
+settings = get_settings()
+
+SUMMARY_ANSWER_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token for English text, close enough for a budget and needs no tokenizer download"""
+    return len(text) // 4 + 1
+
+
+class ConversationSession:
+    """Memory of one session_id, safe to share between concurrent queries of that session"""
+
+    def __init__(self, session_id: str, token_budget: int, max_tool_results: int):
+        self.session_id = session_id
+        self.token_budget = token_budget
+        self.max_tool_results = max_tool_results
+        self.turns: List[dict] = []
+        self.summary: List[str] = []
+        self.assets: "OrderedDict[str, str]" = OrderedDict()
+        self.tool_results: "OrderedDict[tuple, Any]" = OrderedDict()
+        self.data_version: Optional[int] = None
+        self.tool_hits = 0
+        self._lock = threading.Lock()
+
+    def to_dict(self) -> dict:
+        """The session as JSON types, what the shared backends store"""
+        with self._lock:
+            return {
+                "session_id": self.session_id,
+                "token_budget": self.token_budget,
+                "max_tool_results": self.max_tool_results,
+                "turns": self.turns,
+                "summary": self.summary,
+                "assets": list(self.assets.items()),
+                "tool_results": [[list(key), result] for key, result in self.tool_results.items()],
+                "data_version": self.data_version,
+                "tool_hits": self.tool_hits,
+            }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ConversationSession":
+        session = cls(data["session_id"], data["token_budget"], data["max_tool_results"])
+        session.turns = data["turns"]
+        session.summary = data["summary"]
+        session.assets = OrderedDict(data["assets"])
+        # keys and (text, asset id) results are tuples again, JSON made them lists
+        session.tool_results = OrderedDict(
+            (tuple(key), tuple(result) if isinstance(result, list) else result) for key, result in data["tool_results"]
+        )
+        session.data_version = data["data_version"]
+        session.tool_hits = data["tool_hits"]
+        return session
+
+    @property
+    def has_history(self) -> bool:
+        return bool(self.turns or self.summary)
+
+    def sync_version(self, data_version: int) -> None:
+        """Forget fetched assets/tool results once the assets changed"""
+        with self._lock:
+            if self.data_version != data_version:
+                self.assets.clear()
+                self.tool_results.clear()
+                self.data_version = data_version
+
+    def tool_result(self, key: tuple) -> Optional[Any]:
+        with self._lock:
+            result = self.tool_results.get(key)
+            if result is not None:
+                self.tool_results.move_to_end(key)
+                self.tool_hits += 1
+            return result
+
+    def remember_tool_result(self, key: tuple, result: Any) -> None:
+        with self._lock:
+            self.tool_results[key] = result
+            while len(self.tool_results) > self.max_tool_results:
+                self.tool_results.popitem(last=False)
+
+    def remember_assets(self, rows: dict) -> None:
+        """asset id -> one line row"""
+        with self._lock:
+            for asset_id, row in rows.items():
+                self.assets[asset_id] = row
+                self.assets.move_to_end(asset_id)
+
+    def record_turn(self, question: str, answer: str) -> None:
+        with self._lock:
+            self.turns.append({"question": question, "answer": answer})
+            self._fit_budget()
+
+    def render(self) -> str:
+        """The {history} block of the prompt, always within the token budget"""
+        with self._lock:
+            self._fit_budget()
+            return self._render()
+
+    def _render(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append("Earlier in this conversation:\n" + "\n".join(self.summary))
+        if self.turns:
+            parts.append("\n".join(f"User: {turn['question']}\nAssistant: {turn['answer']}" for turn in self.turns))
+        if self.assets:
+            parts.append(
+                "Assets already looked up (id | name | category | status | value | purchase_date):\n"
+                + "\n".join(self.assets.values())
+            )
+        return "\n\n".join(parts) if parts else "(none)"
+
+    def _fit_budget(self) -> None:
+        # fold old turns first, then forget the oldest summary lines, then the oldest asset rows
+        while estimate_tokens(self._render()) > self.token_budget:
+            if len(self.turns) > 1:
+                turn = self.turns.pop(0)
+                answer = turn["answer"] if len(turn["answer"]) <= SUMMARY_ANSWER_CHARS else turn["answer"][:SUMMARY_ANSWER_CHARS] + "..."
+                self.summary.append(f"- Q: {turn['question']} A: {answer}")
+            elif self.summary:
+                self.summary.pop(0)
+            elif self.assets:
+                self.assets.popitem(last=False)
+            elif self.turns and len(self.turns[0]["answer"]) > SUMMARY_ANSWER_CHARS:
+                self.turns[0]["answer"] = self.turns[0]["answer"][:SUMMARY_ANSWER_CHARS] + "..."
+            else:
+                return
+
+
+class AgentMemory:
+    """
+    ConversationSession per session_id on top of a CacheBackend (LRU + idle TTL). The in-process
+    backend keeps the session object itself, the shared ones a JSON copy (to_dict)
+    """
+
+    def __init__(self, backend: CacheBackend, token_budget: int, max_tool_results: int, enabled: bool = True):
+        self.backend = backend
+        self.token_budget = token_budget
+        self.max_tool_results = max_tool_results
+        self.enabled = enabled
+
+    def _key(self, session_id: str) -> str:
+        return f"agent:session:{session_id}"
+
+    def _stored(self, session: ConversationSession) -> Any:
+        return session if self.backend.in_process else session.to_dict()
+
+    async def session(self, session_id: Optional[str]) -> Optional[ConversationSession]:
+        """The session for session_id (created on first use), None without a session id"""
+        if not self.enabled or not session_id:
+            return None
+        # no lock: the in-process backend doesn't suspend between this get and set, so concurrent
+        # first queries of a session still share one object
+        stored = await self.backend.get(self._key(session_id))
+        if stored is None:
+            session = ConversationSession(session_id, self.token_budget, self.max_tool_results)
+        else:
+            session = stored if isinstance(stored, ConversationSession) else ConversationSession.from_dict(stored)
+        # set on every query, the TTL counts from the last one
+        await self.backend.set(self._key(session_id), self._stored(session))
+        return session
+
+    async def save(self, session: Optional[ConversationSession]) -> None:
+        """Store the session after a query changed it (a shared backend holds a copy, not the object)"""
+        if session is not None:
+            await self.backend.set(self._key(session.session_id), self._stored(session))
+
+    async def forget(self, session_id: str) -> None:
+        await self.backend.delete(self._key(session_id))
+
+
+agent_memory = AgentMemory(
+    cache_backend("agent_sessions", max_entries=settings.AGENT_MEMORY_MAX_SESSIONS, ttl=settings.AGENT_MEMORY_TTL_SECONDS),
+    token_budget=settings.AGENT_MEMORY_TOKEN_BUDGET,
+    max_tool_results=settings.AGENT_MEMORY_MAX_TOOL_RESULTS,
+    enabled=settings.AGENT_MEMORY_ENABLED,
+)
@@ -0,0 +1,205 @@
+"""
+Token and latency instrumentation for agent queries.
+
+Every query gets a QueryMetrics, filled while the executor runs:
+  - AgentMetricsHandler (a LangChain callback in app/agent_callbacks.py): prompt/completion
+    tokens and time of each LLM call (one per ReAct iteration) and the time of each tool call
+  - SQLAlchemy cursor events: time spent in the database while that query was current
+
+Finished queries are aggregated by agent_metrics into histograms, plus the questions that
+cost the most tokens and time, served on GET /api/v1/agent/metrics.
+Nothing here imports LangChain, so the API serves the metrics without loading the agent.
+"""
+import bisect
+import heapq
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ms buckets for latencies, plain counts for tokens/iterations
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 10)
+TOP_QUESTIONS = 10
+
+current_query_metrics: ContextVar[Optional["QueryMetrics"]] = ContextVar("agent_query_metrics", default=None)
+
+
+class QueryMetrics:
+    """Cost and timings of one agent query"""
+
+    def __init__(self, question: str):
+        self.question = question
+        self.llm_calls: List[dict] = []
+        self.tool_calls: List[dict] = []
+        self.db_ms = 0.0
+        self.db_queries = 0
+        self.total_ms = 0.0
+        self.cached = False
+        self.fast_path = False
+        self.error = False
+        self._started = time.perf_counter()
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(call["prompt_tokens"] for call in self.llm_calls)
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(call["completion_tokens"] for call in self.llm_calls)
+
+    def finish(self) -> "QueryMetrics":
+        self.total_ms = (time.perf_counter() - self._started) * 1000
+        return self
+
+    def as_dict(self) -> dict:
+        return {
+            "iterations": len(self.llm_calls),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "llm_calls": self.llm_calls,
+            "tool_calls": self.tool_calls,
+            "db_ms": round(self.db_ms, 2),
+            "db_queries": self.db_queries,
+            "total_ms": round(self.total_ms, 2),
+            "fast_path": self.fast_path,
+        }
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_query_metrics.get() is not None:
+        conn.info.setdefault("agent_query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = current_query_metrics.get()
+    started = conn.info.get("agent_query_started")
+    if metrics is not None and started:
+        metrics.db_ms += (time.perf_counter() - started.pop()) * 1000
+        metrics.db_queries += 1
+
+
+class Histogram:
+    """Fixed bucket histogram (counts per upper bound, the last bucket is +Inf)"""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (None above the last bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 2),
+            "avg": round(self.sum / self.count, 2) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {**{f"le_{bound}": count for bound, count in zip(self.buckets, self.counts)}, "le_inf": self.counts[-1]},
+        }
+
+
+class AgentMetrics:
+    """In-process aggregate of every finished agent query"""
+
+    def __init__(self, top: int = TOP_QUESTIONS):
+        self.top = top
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.queries = 0
+            self.cached = 0
+            self.fast_path = 0
+            self.errors = 0
+            self.total_ms = Histogram(LATENCY_BUCKETS_MS)
+            self.db_ms = Histogram(LATENCY_BUCKETS_MS)
+            self.llm_ms = Histogram(LATENCY_BUCKETS_MS)
+            self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+            self.completion_tokens = Histogram(TOKEN_BUCKETS)
+            self.iterations = Histogram(ITERATION_BUCKETS)
+            self.tool_ms: Dict[str, Histogram] = {}
+            # min-heaps of (cost, question), the root is the cheapest of the kept questions
+            self._top_tokens: list = []
+            self._top_latency: list = []
+
+    def record(self, metrics: QueryMetrics) -> None:
+        with self._lock:
+            self.queries += 1
+            if metrics.cached:
+                # no LLM/tool work, keep them out of the histograms
+                self.cached += 1
+                return
+            if metrics.error:
+                self.errors += 1
+            if metrics.fast_path:
+                self.fast_path += 1
+
+            self.total_ms.observe(metrics.total_ms)
+            self.db_ms.observe(metrics.db_ms)
+            self.prompt_tokens.observe(metrics.prompt_tokens)
+            self.completion_tokens.observe(metrics.completion_tokens)
+            self.iterations.observe(len(metrics.llm_calls))
+            for call in metrics.llm_calls:
+                self.llm_ms.observe(call["ms"])
+            for call in metrics.tool_calls:
+                self.tool_ms.setdefault(call["tool"], Histogram(LATENCY_BUCKETS_MS)).observe(call["ms"])
+
+            self._keep_top(self._top_tokens, metrics.prompt_tokens + metrics.completion_tokens, metrics.question)
+            self._keep_top(self._top_latency, round(metrics.total_ms, 2), metrics.question)
+
+    def _keep_top(self, heap: list, cost: float, question: str) -> None:
+        if len(heap) < self.top:
+            heapq.heappush(heap, (cost, question))
+        elif cost > heap[0][0]:
+            heapq.heapreplace(heap, (cost, question))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "cached": self.cached,
+                "fast_path": self.fast_path,
+                "errors": self.errors,
+                "total_ms": self.total_ms.snapshot(),
+                "llm_call_ms": self.llm_ms.snapshot(),
+                "db_ms": self.db_ms.snapshot(),
+                "tool_ms": {tool: histogram.snapshot() for tool, histogram in self.tool_ms.items()},
+                "prompt_tokens": self.prompt_tokens.snapshot(),
+                "completion_tokens": self.completion_tokens.snapshot(),
+                "iterations": self.iterations.snapshot(),
+                "top_questions_by_tokens": [
+                    {"question": question, "total_tokens": cost} for cost, question in sorted(self._top_tokens, reverse=True)
+                ],
+                "top_questions_by_latency": [
+                    {"question": question, "total_ms": cost} for cost, question in sorted(self._top_latency, reverse=True)
+                ],
+            }
+
+
+agent_metrics = AgentMetrics()
@@ -0,0 +1,205 @@
+"""
+Deterministic fast path in front of the agent LLM.
+
+Simple lookups and aggregates are answered straight from AsyncAssetCRUD (the analytics
+rollups for counts/sums) in milliseconds:
+  - "show asset <uuid>"                       -> detail
+  - "how many active assets"                  -> count
+  - "total value of furniture"                -> total
+  - "average value of my electronics"         -> average
+  - "most valuable / cheapest vehicle"        -> max / min
+optionally narrowed by a category, a status and a purchase year ("bought in 2024").
+
+The parser is deliberately conservative: every word of the question has to be known
+(a filter, an intent word or filler), exactly one intent must match, otherwise the
+question goes to the LLM. "how many assets are not sold" or "total value of my macbooks"
+fall through because of "not" / "macbooks".
+"""
+import re
+from datetime import date
+from typing import Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.agent_cache import normalize_question
+from app.config import get_settings
+from app.routes.crud import async_asset_crud
+
+settings = get_settings()
+
+CATEGORY_WORDS = {
+    "electronics": "electronics", "electronic": "electronics",
+    "furniture": "furniture",
+    "vehicle": "vehicle", "vehicles": "vehicle",
+    "jewelry": "jewelry", "jewellery": "jewelry",
+    "other": "other",
+}
+STATUS_WORDS = {"active": "active", "sold": "sold", "donated": "donated"}
+
+# (intent, pattern) on the normalized question
+INTENT_PATTERNS = [
+    ("count", re.compile(r"\b(how many|number of|count)\b")),
+    ("average", re.compile(r"\b(average|avg|mean)\b")),
+    ("max", re.compile(r"\b(most valuable|most expensive|highest value[d]?|priciest)\b")),
+    ("min", re.compile(r"\b(least valuable|least expensive|lowest value[d]?|cheapest)\b")),
+    ("total", re.compile(r"\b(total|sum|combined|how much|portfolio value)\b")),
+]
+INTENT_WORDS = {
+    "how", "many", "number", "count", "average", "avg", "mean", "most", "least", "valuable", "expensive",
+    "highest", "lowest", "valued", "priciest", "cheapest", "total", "sum", "combined", "much", "portfolio",
+}
+FILLER_WORDS = {
+    "what", "whats", "s", "is", "are", "was", "were", "the", "a", "an", "my", "i", "me", "do", "does", "did",
+    "have", "has", "own", "of", "all", "in", "on", "for", "currently", "assets", "asset", "items", "item",
+    "things", "value", "worth", "spend", "spent", "cost", "please", "can", "you", "tell", "show", "give",
+    "there", "that", "which", "with", "bought", "purchased", "during", "now", "overall", "together", "it",
+}
+DETAIL_WORDS = FILLER_WORDS | {
+    "get", "details", "detail", "info", "information", "about", "describe", "find", "look", "up", "lookup",
+    "display", "id", "how", "much", "price", "status", "category",
+}
+YEAR = re.compile(r"^(19|20)\d{2}$")
+# a year only counts as the purchase year right after a purchase verb, directly or through "in"/"during"
+# ("purchased 2023", "bought in 2024"). "assets worth 2000" is an amount and "sold in 2024" isn't
+# about the purchase, both go to the LLM
+PURCHASE_WORDS = {"bought", "purchased"}
+YEAR_CONTEXT_WORDS = {"in", "during"}
+
+
+class FastPathQuery:
+    """A parsed simple question"""
+
+    def __init__(self, intent: str, filters: Optional[dict] = None, asset_id: Optional[str] = None, year: Optional[int] = None):
+        self.intent = intent
+        self.filters = filters or {}
+        self.asset_id = asset_id
+        self.year = year
+
+    def crud_filters(self) -> dict:
+        """Keyword filters for AsyncAssetCRUD.analytics/get_all"""
+        return {
+            "category": self.filters.get("category"),
+            "status": self.filters.get("status"),
+            "min_value": None,
+            "max_value": None,
+            "purchase_date_from": date(self.year, 1, 1) if self.year else None,
+            "purchase_date_to": date(self.year, 12, 31) if self.year else None,
+            "search": None,
+        }
+
+    def describe(self, count: int) -> str:
+        """'3 active electronics assets purchased in 2024'"""
+        words = [self.filters.get("status"), self.filters.get("category"), "asset" if count == 1 else "assets"]
+        text = " ".join(word for word in words if word)
+        return f"{text} purchased in {self.year}" if self.year else text
+
+
+class FastPathRouter:
+    """Parses simple questions, aanswer() runs them on an AsyncSession"""
+
+    def __init__(self, extract_asset_ids: Callable[[str], List[str]]):
+        self.extract_asset_ids = extract_asset_ids
+
+    def parse(self, question: str) -> Optional[FastPathQuery]:
+        """The FastPathQuery for a simple question, None when the LLM has to answer it"""
+        if not settings.AGENT_FAST_PATH_ENABLED:
+            return None
+
+        asset_ids = set(id.lower() for id in self.extract_asset_ids(question))
+        if asset_ids:
+            words = normalize_question(re.sub(r"[0-9a-fA-F-]{36}", " ", question)).split()
+            if len(asset_ids) == 1 and all(word in DETAIL_WORDS for word in words):
+                return FastPathQuery("detail", asset_id=asset_ids.pop())
+            return None
+
+        text = normalize_question(re.sub(r"(?<=\d),(?=\d)", "", question))
+        intents = {intent for intent, pattern in INTENT_PATTERNS if pattern.search(text)}
+        if intents & {"max", "min"}:
+            # "how much is my most valuable ..." asks about the extreme, not a total
+            intents.discard("total")
+        if len(intents) != 1:
+            return None
+
+        filters, year = {}, None
+        words = text.split()
+        for i, word in enumerate(words):
+            if word in CATEGORY_WORDS:
+                if filters.setdefault("category", CATEGORY_WORDS[word]) != CATEGORY_WORDS[word]:
+                    return None  # two categories
+            elif word in STATUS_WORDS:
+                if filters.setdefault("status", STATUS_WORDS[word]) != STATUS_WORDS[word]:
+                    return None
+            elif YEAR.match(word):
+                if not self._purchase_year(words, i):
+                    return None  # an amount, or a year of something else, the LLM reads it
+                if year is not None and year != int(word):
+                    return None
+                year = int(word)
+            elif word not in INTENT_WORDS and word not in FILLER_WORDS:
+                return None
+        return FastPathQuery(intents.pop(), filters, year=year)
+
+    def _purchase_year(self, words: List[str], i: int) -> bool:
+        """Whether the year at words[i] follows a purchase verb"""
+        previous = words[i - 1] if i >= 1 else None
+        if previous in PURCHASE_WORDS:
+            return True
+        return previous in YEAR_CONTEXT_WORDS and i >= 2 and words[i - 2] in PURCHASE_WORDS
+
+    async def aanswer(self, db: AsyncSession, route: FastPathQuery) -> dict:
+        if route.intent == "detail":
+            return self._detail_answer(route, await async_asset_crud.get_by_id(db, route.asset_id))
+
+        filters = route.crud_filters()
+        groups, _ = await async_asset_crud.analytics(db, [], **filters)
+        if not groups:
+            return self._response(f"You have no {route.describe(0)}.", [])
+        assets = await async_asset_crud.get_all(db, limit=self._limit(route), sort_by="value", order=self._order(route), **filters)
+        return self._aggregate_answer(route, groups[0], assets)
+
+    def _limit(self, route: FastPathQuery) -> int:
+        # the extremes need one row, aggregates list the most valuable matches as sources
+        return 1 if route.intent in ("max", "min") else settings.AGENT_SEARCH_MAX_ROWS
+
+    def _order(self, route: FastPathQuery) -> str:
+        return "asc" if route.intent == "min" else "desc"
+
+    def _detail_answer(self, route: FastPathQuery, asset) -> dict:
+        if asset is None:
+            return self._response(f"Asset with ID {route.asset_id} not found.", [])
+        description = f" Description: {asset.description}." if asset.description else ""
+        return self._response(
+            f"{asset.name} (ID: {asset.id}) is a {asset.status} {asset.category} asset worth {_money(asset.value)}, "
+            f"purchased on {asset.purchase_date}.{description}",
+            [asset.id],
+        )
+
+    def _aggregate_answer(self, route: FastPathQuery, totals: dict, assets: list) -> dict:
+        count = totals["count"]
+        described = route.describe(count)
+        if route.intent == "count":
+            answer = f"You have {count} {described}."
+        elif route.intent == "total":
+            answer = f"Your {count} {described} are worth {_money(totals['total_value'])} in total."
+        elif route.intent == "average":
+            answer = f"The average value of your {count} {described} is {_money(totals['avg_value'])}."
+        else:
+            asset = assets[0]
+            which = "most" if route.intent == "max" else "least"
+            return self._response(
+                f"Your {which} valuable {route.describe(1)} is {asset.name} (ID: {asset.id}), worth {_money(asset.value)}.",
+                [asset.id],
+            )
+        return self._response(answer, [asset.id for asset in assets], assets_found=count)
+
+    def _response(self, answer: str, sources: List[str], assets_found: Optional[int] = None) -> dict:
+        return {
+            "answer": answer,
+            "sources": sources,
+            "query_type": "success",
+            "assets_found": assets_found if assets_found is not None else (len(sources) or None),
+        }
+
+
+def _money(value: float) -> str:
+    return f"${value:,.2f}"
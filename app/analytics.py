@@ -0,0 +1,96 @@
+"""
+Pre-aggregated asset totals for the analytics endpoint.
+
+asset_rollups holds count/sum/min/max of live assets per (category, status, purchase month).
+Triggers on the assets table keep it current for every write path (single and bulk
+creates, updates, soft and hard deletes), so portfolio stats grouped by any of those
+dimensions read O(groups) rows instead of scanning assets.
+
+Rebuild from scratch (e.g. after editing assets outside the app with triggers dropped):
+    python -m app.analytics
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+
+settings = get_settings()
+
+ROLLUPS_ENABLED = (settings.DATABASE_URL or "").startswith("sqlite")
+
+GROUP_DIMENSIONS = ("category", "status", "purchase_month")
+
+# add/remove one asset row (NEW/OLD) to/from its rollup group
+_ADD_NEW = """
+    INSERT INTO asset_rollups (category, status, purchase_month, asset_count, total_value, min_value, max_value)
+        SELECT new.category, new.status, strftime('%Y-%m', new.purchase_date), 1, new.value, new.value, new.value
+        WHERE new.is_deleted = 0
+    ON CONFLICT (category, status, purchase_month) DO UPDATE SET
+        asset_count = asset_count + 1,
+        total_value = total_value + excluded.total_value,
+        min_value = min(min_value, excluded.min_value),
+        max_value = max(max_value, excluded.max_value);
+"""
+
+_OLD_GROUP = "category = old.category AND status = old.status AND purchase_month = strftime('%Y-%m', old.purchase_date)"
+
+_REMOVE_OLD = f"""
+    UPDATE asset_rollups SET asset_count = asset_count - 1, total_value = total_value - old.value
+        WHERE {_OLD_GROUP} AND old.is_deleted = 0;
+    UPDATE asset_rollups SET
+        min_value = (SELECT min(value) FROM assets WHERE is_deleted = 0 AND category = old.category
+                     AND status = old.status AND strftime('%Y-%m', purchase_date) = strftime('%Y-%m', old.purchase_date)),
+        max_value = (SELECT max(value) FROM assets WHERE is_deleted = 0 AND category = old.category
+                     AND status = old.status AND strftime('%Y-%m', purchase_date) = strftime('%Y-%m', old.purchase_date))
+        WHERE {_OLD_GROUP} AND old.is_deleted = 0 AND (old.value <= min_value OR old.value >= max_value);
+    DELETE FROM asset_rollups WHERE {_OLD_GROUP} AND asset_count <= 0;
+"""
+
+ROLLUP_TRIGGERS = {
+    "assets_rollup_insert": f"CREATE TRIGGER assets_rollup_insert AFTER INSERT ON assets BEGIN {_ADD_NEW} END",
+    "assets_rollup_update": (
+        "CREATE TRIGGER assets_rollup_update AFTER UPDATE OF category, status, purchase_date, value, is_deleted ON assets "
+        f"BEGIN {_REMOVE_OLD} {_ADD_NEW} END"
+    ),
+    "assets_rollup_delete": f"CREATE TRIGGER assets_rollup_delete AFTER DELETE ON assets BEGIN {_REMOVE_OLD} END",
+}
+
+REBUILD_SQL = """
+    INSERT INTO asset_rollups (category, status, purchase_month, asset_count, total_value, min_value, max_value)
+    SELECT category, status, strftime('%Y-%m', purchase_date), count(*), sum(value), min(value), max(value)
+    FROM assets WHERE is_deleted = 0
+    GROUP BY category, status, strftime('%Y-%m', purchase_date)
+"""
+
+
+def create_rollups(bind: Engine) -> None:
+    """Create the rollup triggers; the first time they appear the rollup table is filled from assets"""
+    if not ROLLUPS_ENABLED:
+        return
+    with bind.begin() as conn:
+        existing = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+        missing = [name for name in ROLLUP_TRIGGERS if name not in existing]
+        for name in missing:
+            conn.execute(text(ROLLUP_TRIGGERS[name]))
+        if missing:
+            # rows written before the triggers existed are not in the rollups yet
+            _refill(conn)
+
+
+def rebuild_rollups(bind: Engine) -> int:
+    """Recompute every rollup group from assets in one transaction, returns the number of groups"""
+    create_rollups(bind)
+    with bind.begin() as conn:
+        return _refill(conn)
+
+
+def _refill(conn) -> int:
+    conn.execute(text("DELETE FROM asset_rollups"))
+    return conn.execute(text(REBUILD_SQL)).rowcount
+
+
+if __name__ == "__main__":
+    from app.database import engine, init_db
+
+    init_db()
+    print(f"Rebuilt {rebuild_rollups(engine)} rollup groups")
@@ -0,0 +1,376 @@
+"""
+Read cache for asset list/detail responses.
+
+Entries hold the already serialized JSON body plus its ETag. Keys carry a version
+number that AsyncAssetCRUD bumps on writes, so a write makes every older entry
+unreachable instead of having to find and delete it:
+  - list pages: assets:list:<list version>:<normalized query>, any write bumps the list version
+  - details:    assets:detail:<detail version>.<asset version>:<id>, a single write bumps that asset's
+                version, a bulk write the detail version of every asset
+
+CacheBackend is the interface the backends implement (picked by SHARED_STATE_BACKEND, see
+app/shared_state.py):
+  - MemoryCache: in-process LRU + TTL, one worker
+  - SQLiteCache: a SQLite file shared by the workers of one host
+  - RedisCache: a Redis-compatible server shared by any number of hosts
+With a shared backend a write in one worker invalidates the entries of every worker.
+
+The interface is async: SQLiteCache runs its queries in a thread (asyncio.to_thread) and
+RedisCache uses redis.asyncio, so waiting on the shared store never blocks the event loop.
+The shared backends store values as JSON, not pickle: a process that can write to the store
+can at worst poison an entry, not run code in the API.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.config import get_settings
+from app.shared_state import backend, redis_client, sqlite_state
+
+settings = get_settings()
+
+# (serialized JSON body, etag), a [body, etag] list once it went through a shared backend
+CachedBody = Tuple[str, str]
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _loads(data) -> Optional[Any]:
+    """The stored value, None (a miss) for an entry that isn't JSON, like one pickled by an older version"""
+    try:
+        return json.loads(data)
+    except ValueError:
+        return None
+
+
+class CacheBackend:
+    """
+    Interface for cache backends. Values must be JSON types (dicts, lists, strings, numbers,
+    booleans, None), tuples come back as lists from the shared backends
+    """
+
+    # True when get() returns the object that was set (MemoryCache), False for copies decoded from JSON
+    in_process = False
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def get_counter(self, key: str) -> int:
+        """Counters are never evicted (losing one would resurrect stale entries)"""
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+    async def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Thread safe in-process LRU cache with per-entry TTL, keeps the objects themselves"""
+
+    in_process = True
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._counters: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    async def get_counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    async def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Entries (as JSON) and counters in the shared SQLite file, rows of other namespaces are left alone.
+    Every write is a single statement in autocommit mode, so the file's write lock is held for one
+    statement at a time, and the queries run in a thread, so a worker waiting for it keeps serving
+    """
+
+    # expired entries are purged (and the oldest beyond max_entries dropped) every PRUNE_EVERY sets
+    PRUNE_EVERY = 100
+
+    def __init__(self, namespace: str, max_entries: int = 1024, ttl: float = 60):
+        self.state = sqlite_state()
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._sets = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        row = await asyncio.to_thread(self._fetch, key)
+        value = _loads(row[0]) if row is not None else None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def _fetch(self, key: str) -> Optional[tuple]:
+        return self.state.connection().execute(
+            "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at >= ?",
+            (self.namespace, key, time.time()),
+        ).fetchone()
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        self._sets += 1
+        await asyncio.to_thread(self._store, key, _dumps(value), expires_at, self._sets % self.PRUNE_EVERY == 0)
+
+    def _store(self, key: str, value: str, expires_at: float, prune: bool) -> None:
+        conn = self.state.connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, value, expires_at),
+        )
+        if prune:
+            self._prune(conn)
+
+    def _prune(self, conn) -> None:
+        conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?", (self.namespace, time.time()))
+        # the ones closest to expiring go first (not strictly LRU, reads don't write)
+        conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN (SELECT key FROM cache_entries WHERE namespace = ? "
+            "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries),
+        )
+
+    async def delete(self, key: str) -> None:
+        await self._execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    async def get_counter(self, key: str) -> int:
+        row = await self._execute("SELECT value FROM counters WHERE namespace = ? AND key = ?", (self.namespace, key))
+        return row[0] if row else 0
+
+    async def incr(self, key: str) -> int:
+        # the upsert reads and bumps the counter atomically on its own
+        row = await self._execute(
+            "INSERT INTO counters (namespace, key, value) VALUES (?, ?, 1) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET value = value + 1 RETURNING value",
+            (self.namespace, key),
+        )
+        return row[0]
+
+    async def clear(self) -> None:
+        await self._execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    async def stats(self) -> dict:
+        row = await self._execute(
+            "SELECT count(*) FROM cache_entries WHERE namespace = ? AND expires_at >= ?", (self.namespace, time.time())
+        )
+        return {
+            "backend": "sqlite",
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": row[0],
+            "max_entries": self.max_entries,
+        }
+
+    async def _execute(self, sql: str, parameters: tuple) -> Optional[tuple]:
+        """One statement in a thread, its first row"""
+        return await asyncio.to_thread(lambda: self.state.connection().execute(sql, parameters).fetchone())
+
+
+class RedisCache(CacheBackend):
+    """
+    Entries (as JSON) as <namespace>:entry:<key> with a TTL, counters as <namespace>:counter:<key> without one.
+    max_entries isn't enforced, entries expire by TTL and Redis evicts under memory pressure
+    (use a volatile-* maxmemory-policy so the counters are never evicted)
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 1024, ttl: float = 60):
+        self.redis = redis_client()
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        data = await self.redis.get(f"{self.namespace}:entry:{key}")
+        value = _loads(data) if data is not None else None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl_ms = max(1, int((ttl if ttl is not None else self.ttl) * 1000))
+        await self.redis.set(f"{self.namespace}:entry:{key}", _dumps(value), px=ttl_ms)
+
+    async def delete(self, key: str) -> None:
+        await self.redis.delete(f"{self.namespace}:entry:{key}")
+
+    async def get_counter(self, key: str) -> int:
+        return int(await self.redis.get(f"{self.namespace}:counter:{key}") or 0)
+
+    async def incr(self, key: str) -> int:
+        return await self.redis.incr(f"{self.namespace}:counter:{key}")
+
+    async def clear(self) -> None:
+        keys = [key async for key in self.redis.scan_iter(match=f"{self.namespace}:entry:*", count=1000)]
+        for start in range(0, len(keys), 1000):
+            await self.redis.delete(*keys[start:start + 1000])
+
+    async def stats(self) -> dict:
+        return {"backend": "redis", "hits": self.hits, "misses": self.misses, "max_entries": self.max_entries}
+
+
+def cache_backend(namespace: str, max_entries: int, ttl: float) -> CacheBackend:
+    """The SHARED_STATE_BACKEND implementation, namespace keeps the caches apart in a shared store"""
+    name = backend()
+    if name == "sqlite":
+        return SQLiteCache(namespace, max_entries=max_entries, ttl=ttl)
+    if name == "redis":
+        return RedisCache(namespace, max_entries=max_entries, ttl=ttl)
+    return MemoryCache(max_entries=max_entries, ttl=ttl)
+
+
+class AssetCache:
+    """Asset specific keys and invalidation on top of a CacheBackend"""
+
+    LIST_VERSION = "assets:list:version"
+    DETAIL_VERSION = "assets:detail:version"
+
+    def __init__(self, backend: CacheBackend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+
+    async def list_key(self, **params) -> str:
+        normalized = json.dumps(params, sort_keys=True, default=str)
+        return f"assets:list:{await self.data_version()}:{normalized}"
+
+    def _asset_version(self, asset_id: str) -> str:
+        return f"assets:detail:version:{asset_id}"
+
+    async def detail_key(self, asset_id: str) -> str:
+        detail_version, asset_version = await asyncio.gather(
+            self.backend.get_counter(self.DETAIL_VERSION), self.backend.get_counter(self._asset_version(asset_id))
+        )
+        return f"assets:detail:{detail_version}.{asset_version}:{asset_id}"
+
+    async def data_version(self) -> int:
+        """Bumped by every AsyncAssetCRUD write (the list version), for caches of anything derived from assets"""
+        return await self.backend.get_counter(self.LIST_VERSION)
+
+    async def invalidate_lists(self) -> None:
+        """A row was added, so every list page/total may be stale"""
+        await self.backend.incr(self.LIST_VERSION)
+
+    async def invalidate_asset(self, asset_id: str) -> None:
+        """
+        One asset changed: bump its version and the list version. Deleting its detail entry instead would
+        race with a reader that loaded the old row before the write and stores it after the delete
+        """
+        await self.backend.incr(self._asset_version(asset_id))
+        await self.backend.incr(self.LIST_VERSION)
+
+    async def invalidate_all(self) -> None:
+        """Unknown set of assets changed (bulk writes)"""
+        await self.backend.incr(self.DETAIL_VERSION)
+        await self.backend.incr(self.LIST_VERSION)
+
+    async def _store(self, key: str, body: bytes) -> CachedBody:
+        # the body as text, so the shared backends can store it as JSON
+        cached = (body.decode(), f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+        if self.enabled:
+            await self.backend.set(key, cached)
+        return cached
+
+    async def response(self, request: Request, key: str, build: Callable[[], Awaitable[bytes]]) -> Response:
+        """
+        Serve the JSON body cached under key, awaiting build (and caching its body) on a miss.
+        Answers 304 when the client's If-None-Match already has this body.
+        """
+        cached: Optional[CachedBody] = await self.backend.get(key) if self.enabled else None
+        if cached is None:
+            cached = await self._store(key, await build())
+        return self._respond(request, cached)
+
+    def _respond(self, request: Request, cached: CachedBody) -> Response:
+        body, etag = cached
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+asset_cache = AssetCache(
+    cache_backend("assets", max_entries=settings.CACHE_MAX_ENTRIES, ttl=settings.CACHE_TTL_SECONDS),
+    enabled=settings.CACHE_ENABLED,
+)
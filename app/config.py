@@ -5,9 +5,76 @@ load_dotenv()
 
 class get_settings:
     DATABASE_URL:str = os.getenv("DATABASE_URL")
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL")  # defaults to DATABASE_URL with the async driver
     PROJECT_NAME: str = "Asset Management API"
     API_V1_PREFIX: str = "/api/v1"
     OPEN_API_KEY:str = os.getenv("OPEN_API_KEY")
+    AGENT_ENABLED: bool = os.getenv("AGENT_ENABLED", "true").lower() == "true"  # false: CRUD-only server, LangChain is never imported
+    AGENT_PRELOAD: bool = os.getenv("AGENT_PRELOAD", "false").lower() == "true"  # build the agent at startup instead of on the first /agent query
+    AGENT_LLM_BASE_URL: str = os.getenv("AGENT_LLM_BASE_URL")  # OpenAI compatible endpoint, defaults to api.openai.com
+    AGENT_HTTP_MAX_CONNECTIONS: int = int(os.getenv("AGENT_HTTP_MAX_CONNECTIONS", 20))  # keep-alive pool to the LLM
+    AGENT_CACHE_ENABLED: bool = os.getenv("AGENT_CACHE_ENABLED", "true").lower() == "true"
+    AGENT_CACHE_MAX_ENTRIES: int = int(os.getenv("AGENT_CACHE_MAX_ENTRIES", 1024))
+    AGENT_CACHE_TTL_SECONDS: float = float(os.getenv("AGENT_CACHE_TTL_SECONDS", 3600))
+    AGENT_CACHE_SEMANTIC: bool = os.getenv("AGENT_CACHE_SEMANTIC", "false").lower() == "true"  # also match similar questions by embedding
+    AGENT_CACHE_SIMILARITY: float = float(os.getenv("AGENT_CACHE_SIMILARITY", 0.95))
+    AGENT_CACHE_EMBEDDING_MODEL: str = os.getenv("AGENT_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
+    AGENT_FAST_PATH_ENABLED: bool = os.getenv("AGENT_FAST_PATH_ENABLED", "true").lower() == "true"  # answer simple questions without the LLM
+    AGENT_BATCH_MAX_QUERIES: int = int(os.getenv("AGENT_BATCH_MAX_QUERIES", 100))
+    AGENT_BATCH_CONCURRENCY: int = int(os.getenv("AGENT_BATCH_CONCURRENCY", 8))  # queries of one batch running at once
+    AGENT_BATCH_MAX_RETRIES: int = int(os.getenv("AGENT_BATCH_MAX_RETRIES", 3))  # retries of a rate limited query
+    AGENT_BATCH_BACKOFF_SECONDS: float = float(os.getenv("AGENT_BATCH_BACKOFF_SECONDS", 1.0))  # first backoff without Retry-After, doubles per retry
+    AGENT_MEMORY_ENABLED: bool = os.getenv("AGENT_MEMORY_ENABLED", "true").lower() == "true"
+    AGENT_MEMORY_MAX_SESSIONS: int = int(os.getenv("AGENT_MEMORY_MAX_SESSIONS", 1000))
+    AGENT_MEMORY_TTL_SECONDS: float = float(os.getenv("AGENT_MEMORY_TTL_SECONDS", 1800))  # idle time before a session is forgotten
+    AGENT_MEMORY_TOKEN_BUDGET: int = int(os.getenv("AGENT_MEMORY_TOKEN_BUDGET", 1000))  # max size of the history in the prompt
+    AGENT_MEMORY_MAX_TOOL_RESULTS: int = int(os.getenv("AGENT_MEMORY_MAX_TOOL_RESULTS", 50))  # remembered tool results per session
+    AGENT_SEARCH_MAX_ROWS: int = int(os.getenv("AGENT_SEARCH_MAX_ROWS", 20))  # rows search_assets shows the LLM
+    BULK_BATCH_SIZE: int = int(os.getenv("BULK_BATCH_SIZE", 1000))  # rows per transaction in /assets/bulk
+    BULK_MAX_ERRORS: int = int(os.getenv("BULK_MAX_ERRORS", 1000))  # row errors reported back, the rest are only counted
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+    CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", 60))
+    COUNT_ESTIMATE_CAP: int = int(os.getenv("COUNT_ESTIMATE_CAP", 10000))  # total=estimate stops counting here
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", 5000))  # rows fetched per cursor round trip (and per Parquet row group) in /assets/export
+    FAST_SERIALIZATION_ENABLED: bool = os.getenv("FAST_SERIALIZATION_ENABLED", "true").lower() == "true"  # asset list/detail JSON from plain rows + orjson
+    # group commit: single creates/updates queued and committed together every WRITE_BATCH_MAX_DELAY_MS or WRITE_BATCH_MAX_ROWS writes
+    WRITE_BATCH_ENABLED: bool = os.getenv("WRITE_BATCH_ENABLED", "false").lower() == "true"
+    WRITE_BATCH_MAX_ROWS: int = int(os.getenv("WRITE_BATCH_MAX_ROWS", 100))
+    WRITE_BATCH_MAX_DELAY_MS: float = float(os.getenv("WRITE_BATCH_MAX_DELAY_MS", 5))
+
+    # where caches, agent sessions, data-version counters and rate limit buckets live: memory (one worker), sqlite or redis (several workers)
+    SHARED_STATE_BACKEND: str = os.getenv("SHARED_STATE_BACKEND", "memory")
+    SHARED_STATE_URL: str = os.getenv("SHARED_STATE_URL")  # sqlite: file path (default shared_state.db), redis: redis://host:port/db
+
+    # token bucket per client and route: RATE_LIMIT_AGENT_* for the agent query routes, RATE_LIMIT_API_* for everything else
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_API_PER_SECOND: float = float(os.getenv("RATE_LIMIT_API_PER_SECOND", 100))
+    RATE_LIMIT_API_BURST: int = int(os.getenv("RATE_LIMIT_API_BURST", 200))
+    RATE_LIMIT_AGENT_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_AGENT_PER_MINUTE", 30))  # a batch takes one per question
+    RATE_LIMIT_AGENT_BURST: int = int(os.getenv("RATE_LIMIT_AGENT_BURST", 10))
+    RATE_LIMIT_MAX_CLIENTS: int = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", 10000))  # buckets kept, least recently used are dropped (= full again)
+    RATE_LIMIT_TRUST_FORWARDED: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"  # client = first X-Forwarded-For hop (only behind a proxy)
+    # admission control: agent queries running at once, the rest wait up to AGENT_ADMISSION_WAIT_SECONDS and get 503
+    AGENT_MAX_IN_FLIGHT: int = int(os.getenv("AGENT_MAX_IN_FLIGHT", 16))
+    AGENT_ADMISSION_WAIT_SECONDS: float = float(os.getenv("AGENT_ADMISSION_WAIT_SECONDS", 0))
+
+    # database performance profile: "production" applies the SQLite pragmas below on every connection, "default" leaves SQLite defaults
+    DB_PROFILE: str = os.getenv("DB_PROFILE", "production")
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")  # readers don't block the writer
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # safe with WAL, fsync only at checkpoints
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", -64 * 1024))  # negative = KiB, so 64MB per connection
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    # startup only checks the schema version, a database that is behind is migrated when this is true (else: python -m app.migrate)
+    DB_MIGRATE_ON_STARTUP: bool = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true"
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    # separate read-only pool for list/count/detail reads (DATABASE_READ_URL can point at a replica, defaults to DATABASE_URL)
+    DB_READ_POOL_ENABLED: bool = os.getenv("DB_READ_POOL_ENABLED", "false").lower() == "true"
+    DATABASE_READ_URL: str = os.getenv("DATABASE_READ_URL")
+    DB_READ_POOL_SIZE: int = int(os.getenv("DB_READ_POOL_SIZE", 10))
 
     class Config:
         env_file = ".env"
@@ -1,20 +1,108 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.orm import sessionmaker
 
 from app.config import get_settings
+from app.search import create_search_index
+from app.analytics import create_rollups
+from app.indexes import migrate_indexes
 
 settings = get_settings()
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+def _async_url(url: str) -> str:
+    """Same database through an async driver (sqlite:// -> sqlite+aiosqlite://)"""
+    parsed = make_url(url)
+    if parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+def _is_file_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def _engine_options(url: str, pool_size: int) -> dict:
+    """Explicit pool sizing (in-memory SQLite keeps SQLAlchemy's single connection pool)"""
+    options = {}
+    if make_url(url).get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    if make_url(url).get_backend_name() != "sqlite" or _is_file_sqlite(url):
+        options.update(pool_size=pool_size, max_overflow=settings.DB_MAX_OVERFLOW, pool_timeout=settings.DB_POOL_TIMEOUT)
+    return options
+
+
+def _tune_sqlite(target_engine, read_only: bool = False) -> None:
+    """Apply the DB_PROFILE pragmas to every new connection of a SQLite engine"""
+    sync_engine = getattr(target_engine, "sync_engine", target_engine)
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    pragmas = []
+    if settings.DB_PROFILE == "production":
+        if _is_file_sqlite(str(sync_engine.url)):
+            pragmas += [
+                f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}",
+                f"PRAGMA mmap_size = {settings.SQLITE_MMAP_SIZE}",
+            ]
+        pragmas += [
+            f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}",
+            f"PRAGMA cache_size = {settings.SQLITE_CACHE_SIZE}",
+            f"PRAGMA busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}",
+            "PRAGMA temp_store = MEMORY",
+        ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+
+    @event.listens_for(sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL, settings.DB_POOL_SIZE))
+_tune_sqlite(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or _async_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, settings.DB_POOL_SIZE))
+_tune_sqlite(async_engine)
+
+# expire_on_commit=False: returned objects are serialized after commit and must not lazy load on the event loop
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# read-only pools: list/count/detail reads get their own connections, so they never queue behind ingest writes
+if settings.DB_READ_POOL_ENABLED:
+    READ_DATABASE_URL = settings.DATABASE_READ_URL or SQLALCHEMY_DATABASE_URL
+    ASYNC_READ_DATABASE_URL = _async_url(READ_DATABASE_URL)
+    async_read_engine = create_async_engine(ASYNC_READ_DATABASE_URL, **_engine_options(ASYNC_READ_DATABASE_URL, settings.DB_READ_POOL_SIZE))
+    _tune_sqlite(async_read_engine, read_only=True)
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+else:
+    AsyncReadSessionLocal = AsyncSessionLocal
+
+
+def _forget_pools_after_fork() -> None:
+    """A forked worker (gunicorn --preload) must open its own connections, not reuse the parent's"""
+    engines = [engine, async_engine.sync_engine]
+    if settings.DB_READ_POOL_ENABLED:
+        engines.append(async_read_engine.sync_engine)
+    for target in engines:
+        target.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_forget_pools_after_fork)
+
 Base = declarative_base()
 
 
@@ -25,6 +113,25 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
 def init_db() -> None:
     """Initialize database - create all tables"""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    from app import models  # noqa: F401  registers the tables on Base.metadata for scripts that didn't import them
+
+    Base.metadata.create_all(bind=engine)
+
+    # create_all skips tables that already exist, so make sure index changes reach old databases too
+    migrate_indexes(engine, Base.metadata)
+
+    create_search_index(engine)
+    create_rollups(engine)
@@ -0,0 +1,112 @@
+"""
+Streaming writers for the export endpoint.
+
+Each writer takes the batches of row tuples from AsyncAssetCRUD.stream_rows and yields
+the encoded bytes of one batch at a time, so memory stays at one batch whatever the row count:
+  csv      header + one line per asset, importable again through /assets/bulk
+  ndjson   one JSON object per line
+  parquet  one row group per batch through pyarrow's ParquetWriter (pyarrow is in requirements.txt)
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from importlib.util import find_spec
+from typing import AsyncIterator, List, Sequence
+
+PARQUET_AVAILABLE = find_spec("pyarrow") is not None
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+Batches = AsyncIterator[List[tuple]]
+
+
+def _iso(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+async def iter_csv(columns: Sequence[str], batches: Batches) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    async for rows in batches:
+        writer.writerows([_iso(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # header only, nothing matched
+        yield buffer.getvalue().encode()
+
+
+async def iter_ndjson(columns: Sequence[str], batches: Batches) -> AsyncIterator[bytes]:
+    async for rows in batches:
+        yield "".join(json.dumps(dict(zip(columns, row)), default=_iso) + "\n" for row in rows).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file for ParquetWriter that hands back what was written since the last take()"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.string()),
+        ("name", pa.string()),
+        ("category", pa.string()),
+        ("value", pa.float64()),
+        ("purchase_date", pa.date32()),
+        ("status", pa.string()),
+        ("description", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ])
+
+
+async def iter_parquet(columns: Sequence[str], batches: Batches) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        async for rows in batches:
+            # rows -> columns, straight into arrow arrays
+            arrays = [pa.array(values, type=schema.field(name).type) for name, values in zip(columns, zip(*rows))]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    # footer (and the magic bytes of an empty file)
+    yield sink.take()
+
+
+WRITERS = {"csv": iter_csv, "ndjson": iter_ndjson, "parquet": iter_parquet}
@@ -0,0 +1,67 @@
+"""
+Index migrations for databases created before the current models.
+
+create_all only creates the indexes of tables it creates, so an existing database keeps
+whatever indexes it was born with. migrate_indexes brings it up to date:
+  - drops OBSOLETE_INDEXES, the full indexes replaced by the partial ix_assets_live_* ones
+    (and the single column ones no list query could use well)
+  - creates every index of the models that is missing
+
+No ANALYZE on purpose: without sqlite_stat1 SQLite picks the live indexes for every list/count
+query (tests/test_index_plans.py), with it the unfiltered count goes back to a table scan.
+
+Part of init_db, which app/migrate.py runs once per SCHEMA_VERSION (python -m app.migrate, or on
+startup with DB_MIGRATE_ON_STARTUP=true), not on every startup. Changing the indexes here means
+bumping SCHEMA_VERSION. To only migrate the indexes, without the rest of the schema:
+    python -m app.indexes
+"""
+from typing import List, Tuple
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.engine import Engine
+
+OBSOLETE_INDEXES = (
+    # index=True on columns, superseded by the partial composites (ix_assets_id duplicated the primary key)
+    "ix_assets_id",
+    "ix_assets_name",
+    "ix_assets_status",
+    "ix_assets_is_deleted",
+    # full (sort column, id) indexes, now partial as ix_assets_live_<column>_id
+    "ix_assets_name_id",
+    "ix_assets_value_id",
+    "ix_assets_purchase_date_id",
+    "ix_assets_created_at_id",
+    "ix_assets_updated_at_id",
+)
+
+
+def migrate_indexes(bind: Engine, metadata: MetaData) -> Tuple[List[str], List[str]]:
+    """Drop obsolete indexes and create the missing ones of `metadata`, returns (dropped, created)"""
+    dropped, created = [], []
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        tables = set(inspector.get_table_names())
+        for table in metadata.sorted_tables:
+            if table.name not in tables:
+                continue  # create_all makes new tables with all their indexes
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+
+            for name in OBSOLETE_INDEXES:
+                if name in existing:
+                    conn.execute(text(f"DROP INDEX {name}"))
+                    dropped.append(name)
+
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=conn)
+                    created.append(index.name)
+    return dropped, created
+
+
+if __name__ == "__main__":
+    from app import models  # noqa: F401  registers the tables on Base.metadata
+    from app.database import Base, engine
+
+    dropped, created = migrate_indexes(engine, Base.metadata)
+    print(f"Dropped {len(dropped)} indexes: {', '.join(dropped) or '-'}")
+    print(f"Created {len(created)} indexes: {', '.join(created) or '-'}")
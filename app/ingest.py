@@ -0,0 +1,95 @@
+"""
+Streaming parsers for the bulk ingest endpoint.
+
+The request body is read chunk by chunk and turned into (line number, row) pairs,
+so only the current chunk and the current batch are ever held in memory.
+CSV rows must fit on one line (no quoted newlines).
+"""
+import csv
+import json
+from typing import AsyncIterator, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from app.schemas import AssetCreate
+
+# a row is either the parsed dict or the error message for that line
+ParsedRow = Tuple[int, Union[dict, str]]
+
+
+def _decode(line: bytes, first: bool) -> Union[str, UnicodeDecodeError]:
+    """The line as text (a BOM on the first line is dropped), or the error if it isn't UTF-8"""
+    try:
+        return line.decode("utf-8-sig" if first else "utf-8").rstrip("\r")
+    except UnicodeDecodeError as e:
+        return e
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Union[str, UnicodeDecodeError]]]:
+    """
+    Split a byte stream into (line number, line) without loading the whole body.
+    A line that isn't valid UTF-8 comes as its UnicodeDecodeError, so only that line fails
+    """
+    buffer = b""
+    line_no = 0
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, _decode(line, line_no == 1)
+    if buffer:
+        yield line_no + 1, _decode(buffer, line_no == 0)
+
+
+def _decode_error(e: UnicodeDecodeError) -> str:
+    return f"Invalid UTF-8 at byte {e.start}: {e.reason}"
+
+
+async def iter_ndjson_rows(stream: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """One JSON object per line"""
+    async for line_no, line in iter_lines(stream):
+        if isinstance(line, UnicodeDecodeError):
+            yield line_no, _decode_error(line)
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, "Expected a JSON object"
+            continue
+        yield line_no, row
+
+
+async def iter_csv_rows(stream: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """First line is the header, empty cells are left out so schema defaults apply"""
+    header: Optional[list] = None
+    async for line_no, line in iter_lines(stream):
+        if isinstance(line, UnicodeDecodeError):
+            yield line_no, _decode_error(line)
+            continue
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield line_no, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield line_no, {name: value for name, value in zip(header, values) if value != ""}
+
+
+def validate_row(row: dict) -> Union[AssetCreate, str]:
+    """Validate a parsed row with AssetCreate, returning a one-line error message on failure"""
+    try:
+        return AssetCreate.model_validate(row)
+    except ValidationError as e:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+            for error in e.errors()
+        )
@@ -1,13 +1,29 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query
-from app.database import get_db,init_db
-from app.routes.crud import asset_crud
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from app.database import get_async_db, get_async_read_db, AsyncReadSessionLocal
+from app.migrate import ensure_schema
+from app.routes.crud import async_asset_crud, EXPORT_COLUMNS
 from app.config import get_settings
 from app.schemas import (
-    AssetCreate, AssetResponse, AssetListResponse, AssetUpdate, AgentResponse, AgentQuery
+    AssetCreate, AssetResponse, AssetListResponse, AssetUpdate, AgentResponse, AgentQuery,
+    BulkIngestResponse, BulkRowError, BulkOperationResponse, AnalyticsResponse, AnalyticsGroup,
+    AgentBatchQuery, AgentBatchResponse
 )
-from app.agent import AssetAgent
-from sqlalchemy.orm import Session
+from app.pagination import encode_cursor, InvalidCursor
+from app.ingest import iter_ndjson_rows, iter_csv_rows, validate_row
+from app.export import WRITERS, MEDIA_TYPES, PARQUET_AVAILABLE
+from app.serialization import FAST_SERIALIZATION, asset_json, asset_list_json
+from app.cache import asset_cache
+from app.agent_cache import agent_answer_cache
+from app.agent_metrics import agent_metrics
+from app.agent_memory import agent_memory
+from app.rate_limit import rate_limit, rate_limiter, agent_admission
+from app.write_batch import write_batcher
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import asyncio
+import os
 from typing import Optional
 from datetime import datetime
 
@@ -19,15 +35,41 @@ settings = get_settings()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    dependencies=[Depends(rate_limit)],
 )
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
-    init_db()
+    """Check (or migrate) the database schema on startup"""
+    ensure_schema(settings.DB_MIGRATE_ON_STARTUP)
+    if settings.AGENT_ENABLED and settings.AGENT_PRELOAD and settings.OPEN_API_KEY:
+        await asset_agent()  # build the LLM client, tools and executor now rather than on the first query
     print(f" {settings.PROJECT_NAME} started!")
 
 
+_asset_agent = None
+
+
+def _build_asset_agent():
+    from app.agent import get_asset_agent  # LangChain takes seconds to import, CRUD-only servers never pay for it
+
+    return get_asset_agent()
+
+
+async def asset_agent():
+    """Dependency of the agent query routes: the shared agent, imported and built on first use"""
+    global _asset_agent
+    if not settings.AGENT_ENABLED:
+        raise HTTPException(status_code=503, detail="The agent is disabled on this server")
+    if _asset_agent is None:
+        try:
+            # off the event loop, the CRUD routes keep serving while the first agent query loads it
+            _asset_agent = await asyncio.to_thread(_build_asset_agent)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
+    return _asset_agent
+
+
 @app.get("/")
 async def root():
     return {"message": "test_test"}
@@ -39,26 +81,69 @@ async def root():
     response_model=AssetResponse,
     status_code=status.HTTP_201_CREATED
 )
-def create_asset(
+async def create_asset(
     asset: AssetCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        db_asset = asset_crud.create(db, asset)
+        db_asset = await write_batcher.create(db, asset)
         return db_asset
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get(
-    f"{settings.API_V1_PREFIX}/assets",
-    response_model=AssetListResponse,
+@app.post(
+    f"{settings.API_V1_PREFIX}/assets/bulk",
+    response_model=BulkIngestResponse,
     tags=["assets"]
 )
-def get_assets(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+async def bulk_create_assets(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$", description="Body format, defaults to the Content-Type (text/csv or NDJSON)"),
+    batch_size: int = Query(settings.BULK_BATCH_SIZE, ge=1, le=50000, description="Rows per transaction"),
+):
+    """Bulk create assets from a streamed NDJSON or CSV body, one transaction per batch"""
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    rows = iter_csv_rows(request.stream()) if format == "csv" else iter_ndjson_rows(request.stream())
+
+    inserted = 0
+    failed = 0
+    errors: list[BulkRowError] = []
+
+    def record_error(line: int, error: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < settings.BULK_MAX_ERRORS:
+            errors.append(BulkRowError(line=line, error=error))
+
+    async def flush(batch: list):
+        nonlocal inserted
+        try:
+            inserted += await async_asset_crud.bulk_create(db, [asset for _, asset in batch])
+        except Exception as e:
+            # the whole batch was rolled back
+            for line, _ in batch:
+                record_error(line, f"Batch insert failed: {e}")
+
+    batch = []
+    async for line, row in rows:
+        validated = validate_row(row) if isinstance(row, dict) else row
+        if isinstance(validated, str):
+            record_error(line, validated)
+            continue
+        batch.append((line, validated))
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    return BulkIngestResponse(inserted=inserted, failed=failed, errors=errors)
+
+
+def asset_filters(
     category: Optional[str] = Query(None, description="Filter by category"),
     status: Optional[str] = Query(None, description="Filter by status"),
     min_value:Optional[int] =Query(None,description="Filter by Min value"),
@@ -66,11 +151,8 @@ def get_assets(
     purchase_date_from:Optional[datetime]= Query(None,description="Filter by purchase_date_from"),
     purchase_date_to:Optional[datetime]= Query(None,description="Filter by purchase_date_to"),
     search:Optional[str]=Query(None,description="Filter using search keyWord"),
-    sort_by: str = Query("created_at", regex="^(name|value|purchase_date|created_at|updated_at)$",description="Field to sort by"), ## make sure sort by valid fields
-    order: str = Query("desc", regex="^(asc|desc)$", description="Sort order"),
-
-):
-    """Get all assets"""
+) -> dict:
+    """Asset filter query parameters shared by list and bulk endpoints"""
 
     if min_value is not None and max_value is not None:
       if min_value > max_value:
@@ -85,9 +167,176 @@ def get_assets(
             status_code=400,
             detail="purchate_date_from cannot be greater than purchate_date_to"
         )
-    assets = asset_crud.get_all(db, skip, limit, category, status, min_value, max_value,purchase_date_from,purchase_date_to,search,sort_by,order)
-    total = asset_crud.count(db, category, status,min_value, max_value,purchase_date_from,purchase_date_to,search)
-    return AssetListResponse(total=total, assets=assets)
+
+    return dict(
+        category=category,
+        status=status,
+        min_value=min_value,
+        max_value=max_value,
+        purchase_date_from=purchase_date_from,
+        purchase_date_to=purchase_date_to,
+        search=search,
+    )
+
+
+@app.get(
+    f"{settings.API_V1_PREFIX}/assets",
+    response_model=AssetListResponse,
+    tags=["assets"]
+)
+async def get_assets(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db),
+    filters: dict = Depends(asset_filters),
+    sort_by: str = Query("created_at", pattern="^(name|value|purchase_date|created_at|updated_at|relevance)$",description="Field to sort by (relevance needs search)"), ## make sure sort by valid fields
+    order: str = Query("desc", pattern="^(asc|desc)$", description="Sort order"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor (replaces skip)"),
+    total: str = Query("exact", pattern="^(exact|estimate|none)$", description="How to compute total: exact, estimate (capped count) or none"),
+
+):
+    """Get all assets"""
+
+    if cursor and skip:
+        raise HTTPException(
+            status_code=400,
+            detail="skip cannot be combined with cursor"
+        )
+
+    if sort_by == "relevance" and (not filters["search"] or cursor):
+        raise HTTPException(
+            status_code=400,
+            detail="sort_by=relevance needs search and works with skip, not cursor"
+        )
+
+    async def build() -> bytes:
+        try:
+            # fetch one extra row to know if there is a next page
+            assets, total_count, total_is_estimate = await async_asset_crud.get_page(
+                db, skip, limit + 1, sort_by=sort_by, order=order, cursor=cursor, total=total, as_rows=FAST_SERIALIZATION, **filters
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        next_cursor = None
+        if len(assets) > limit:
+            assets = assets[:limit]
+            if sort_by != "relevance":
+                next_cursor = encode_cursor(assets[-1], sort_by, order)
+
+        if FAST_SERIALIZATION:
+            return asset_list_json(assets, total_count, total_is_estimate, next_cursor)
+        return AssetListResponse(
+            total=total_count, total_is_estimate=total_is_estimate, assets=assets, next_cursor=next_cursor
+        ).model_dump_json().encode()
+
+    cache_key = await asset_cache.list_key(
+        skip=skip, limit=limit, sort_by=sort_by, order=order, cursor=cursor, total=total, **filters
+    )
+    return await asset_cache.response(request, cache_key, build)
+
+
+def require_filter(filters: dict) -> None:
+    """Refuse bulk writes without any filter so a bare request can't touch the whole table"""
+    if not any(value is not None for value in filters.values()):
+        raise HTTPException(
+            status_code=400,
+            detail="At least one filter is required for bulk operations"
+        )
+
+
+@app.patch(
+    f"{settings.API_V1_PREFIX}/assets",
+    response_model=BulkOperationResponse,
+    tags=["assets"]
+)
+async def bulk_update_assets(
+    asset: AssetUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    filters: dict = Depends(asset_filters),
+    dry_run: bool = Query(False, description="Only count the assets that would be updated"),
+):
+    """Update every asset matching the filters in a single UPDATE"""
+    require_filter(filters)
+    affected = await async_asset_crud.bulk_update(db, asset, dry_run=dry_run, **filters)
+    return BulkOperationResponse(affected=affected, dry_run=dry_run)
+
+
+@app.delete(
+    f"{settings.API_V1_PREFIX}/assets",
+    response_model=BulkOperationResponse,
+    tags=["assets"]
+)
+async def bulk_delete_assets(
+    db: AsyncSession = Depends(get_async_db),
+    filters: dict = Depends(asset_filters),
+    dry_run: bool = Query(False, description="Only count the assets that would be deleted"),
+):
+    """Soft delete every asset matching the filters in a single UPDATE"""
+    require_filter(filters)
+    affected = await async_asset_crud.bulk_soft_delete(db, dry_run=dry_run, **filters)
+    return BulkOperationResponse(affected=affected, dry_run=dry_run)
+
+
+@app.get(
+    f"{settings.API_V1_PREFIX}/assets/analytics",
+    response_model=AnalyticsResponse,
+    tags=["assets"]
+)
+async def get_assets_analytics(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    filters: dict = Depends(asset_filters),
+    group_by: str = Query("category", pattern="^(category|status|purchase_month)(,(category|status|purchase_month))*$", description="Comma separated: category, status, purchase_month"),
+):
+    """Count, total, average, min and max asset value per group (category/status-only filters read the rollups)"""
+    dimensions = list(dict.fromkeys(group_by.split(",")))
+
+    async def build() -> bytes:
+        groups, source = await async_asset_crud.analytics(db, dimensions, **filters)
+
+        count = sum(group["count"] for group in groups)
+        total_value = sum(group["total_value"] for group in groups)
+        summary = AnalyticsGroup(
+            count=count,
+            total_value=total_value,
+            avg_value=total_value / count if count else 0,
+            min_value=min((group["min_value"] for group in groups), default=None),
+            max_value=max((group["max_value"] for group in groups), default=None),
+        )
+        return AnalyticsResponse(
+            group_by=dimensions, source=source, summary=summary, groups=groups
+        ).model_dump_json().encode()
+
+    cache_key = await asset_cache.list_key(view="analytics", group_by=dimensions, **filters)
+    return await asset_cache.response(request, cache_key, build)
+
+
+@app.get(
+    f"{settings.API_V1_PREFIX}/assets/export",
+    tags=["assets"]
+)
+async def export_assets(
+    db: AsyncSession = Depends(get_async_read_db),
+    filters: dict = Depends(asset_filters),
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$", description="csv, ndjson or parquet"),
+    sort_by: str = Query("created_at", pattern="^(name|value|purchase_date|created_at|updated_at)$", description="Field to sort by"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="Sort order"),
+):
+    """Stream every matching asset (no pagination) from a server-side cursor, memory stays flat whatever the row count"""
+    if format == "parquet" and not PARQUET_AVAILABLE:
+        raise HTTPException(
+            status_code=400,
+            detail="format=parquet needs pyarrow installed on the server (pip install -r requirements.txt)"
+        )
+
+    batches = async_asset_crud.stream_rows(db, sort_by=sort_by, order=order, batch_size=settings.EXPORT_BATCH_SIZE, **filters)
+    return StreamingResponse(
+        WRITERS[format](EXPORT_COLUMNS, batches),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="assets.{format}"'},
+    )
 
 
 @app.get(
@@ -95,20 +344,30 @@ def get_assets(
     response_model=AssetResponse,
     tags=["assets"]
 )
-def get_asset(
+async def get_asset(
     asset_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get asset by ID"""
-    asset = asset_crud.get_by_id(db, asset_id)
-    
-    if not asset:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Asset with ID {asset_id} not found"
-        )
-    
-    return asset
+
+    async def build() -> bytes:
+        if FAST_SERIALIZATION:
+            asset = await async_asset_crud.get_row_by_id(db, asset_id)
+        else:
+            asset = await async_asset_crud.get_by_id(db, asset_id)
+
+        if not asset:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Asset with ID {asset_id} not found"
+            )
+
+        if FAST_SERIALIZATION:
+            return asset_json(asset)
+        return AssetResponse.model_validate(asset).model_dump_json().encode()
+
+    return await asset_cache.response(request, await asset_cache.detail_key(asset_id), build)
 
 
 
@@ -117,13 +376,13 @@ def get_asset(
     response_model=AssetResponse,
     tags=["assets"]
 )
-def update_asset(
+async def update_asset(
     asset_id: str,
     asset: AssetUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update an asset"""
-    db_asset = asset_crud.update(db, asset_id, asset)
+    db_asset = await write_batcher.update(db, asset_id, asset)
     
     if not db_asset:
         raise HTTPException(
@@ -142,17 +401,17 @@ def update_asset(
     status_code=status.HTTP_204_NO_CONTENT,
     tags=["assets"]
 )
-def delete_asset(
+async def delete_asset(
     asset_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     hard: bool = Query(False, description="Set true for hard delete")
 
 ):
     """Delete an asset (soft delete by default, hard delete if hard=true)"""
     if hard:
-        deleted = asset_crud.delete(db, asset_id)
+        deleted = await async_asset_crud.delete(db, asset_id)
     else:
-        deleted = asset_crud.soft_delete(db, asset_id)
+        deleted = await async_asset_crud.soft_delete(db, asset_id)
     
     if not deleted:
         raise HTTPException(
@@ -160,19 +419,56 @@ def delete_asset(
             detail=f"Asset with ID {asset_id} not found"
         )
 
+@app.get(f"{settings.API_V1_PREFIX}/cache/stats", tags=["cache"])
+async def cache_stats():
+    """Hit/miss/eviction counters of the asset read cache and the agent answer cache (hits/misses are per worker)"""
+    return {
+        "worker": os.getpid(),
+        "enabled": asset_cache.enabled,
+        **await asset_cache.backend.stats(),
+        "agent": {"enabled": agent_answer_cache.enabled, **await agent_answer_cache.stats()},
+    }
+
+
+@app.get(f"{settings.API_V1_PREFIX}/write-batch/stats", tags=["assets"])
+def write_batch_stats():
+    """Group commit counters: batches, writes per batch, commit time"""
+    return write_batcher.stats()
+
+
+@app.get(f"{settings.API_V1_PREFIX}/rate-limit/stats", tags=["rate limit"])
+async def rate_limit_stats():
+    """Requests allowed/limited per bucket group and the agent admission slots"""
+    return {"worker": os.getpid(), **await rate_limiter.stats(), "agent_admission": agent_admission.stats()}
+
+
+@app.get(f"{settings.API_V1_PREFIX}/agent/metrics", tags=["agent"])
+def agent_query_metrics():
+    """Token, iteration and latency histograms of agent queries, plus the most expensive questions"""
+    return agent_metrics.snapshot()
+
+
+@app.delete(f"{settings.API_V1_PREFIX}/agent/sessions/{{session_id}}", status_code=status.HTTP_204_NO_CONTENT, tags=["agent"])
+async def forget_agent_session(session_id: str):
+    """Drop the conversation memory of a session"""
+    await agent_memory.forget(session_id)
+    return None
+
+
 @app.post(
     f"{settings.API_V1_PREFIX}/agent/query",
     response_model=AgentResponse,
     tags=["agent"]
 )
-def query_agent(
+async def query_agent(
     query: AgentQuery,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db),
+    agent=Depends(asset_agent),
 ):
 
     try:
-        agent = AssetAgent(db)
-        result = agent.query(query.question)
+        async with agent_admission.slot():
+            result = await agent.aquery(query.question, db, include_metrics=query.include_metrics, session_id=query.session_id)
         return AgentResponse(**result)
     except HTTPException:
         raise
@@ -180,4 +476,51 @@ def query_agent(
         raise HTTPException(
             status_code=500,
             detail=f"Agent error: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@app.post(
+    f"{settings.API_V1_PREFIX}/agent/query/batch",
+    response_model=AgentBatchResponse,
+    tags=["agent"]
+)
+async def query_agent_batch(batch: AgentBatchQuery, request: Request, agent=Depends(asset_agent)):
+    """Answer many questions concurrently, every question gets its own result or error"""
+    if len(batch.queries) > settings.AGENT_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.AGENT_BATCH_MAX_QUERIES} queries per batch"
+        )
+    # every question's token in one take, a 429 costs nothing (the rate_limit dependency skips this route)
+    await rate_limiter.check(request, cost=len(batch.queries))
+    async with agent_admission.slot(weight=min(len(batch.queries), settings.AGENT_BATCH_CONCURRENCY)):
+        return await agent.abatch_query(batch.queries, AsyncReadSessionLocal)
+
+
+@app.post(
+    f"{settings.API_V1_PREFIX}/agent/query/stream",
+    tags=["agent"]
+)
+async def stream_agent_query(
+    query: AgentQuery,
+    db: AsyncSession = Depends(get_async_read_db),
+    agent=Depends(asset_agent),
+):
+    """Server-Sent Events: tool_start, tool_end, token (final answer text) and a closing answer or error event"""
+    # admitted before the response starts so a shed query still gets a real 503
+    admission = await agent_admission.admit()
+
+    async def events():
+        try:
+            async for event in agent.astream_query(query.question, db, include_metrics=query.include_metrics, session_id=query.session_id):
+                yield event
+        finally:
+            await admission.release()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # also released when the client goes away before the stream started
+        background=BackgroundTask(admission.release),
+    )
@@ -0,0 +1,67 @@
+"""
+Schema migrations.
+
+init_db (create_all, index migration, FTS table and triggers, rollup triggers) used to run on
+every startup. Now it runs once per SCHEMA_VERSION: migrate() applies it and stamps the
+version in the schema_version table, and startup only reads that stamp:
+  - stamp == SCHEMA_VERSION: nothing to do (one SELECT)
+  - older or missing: migrated on startup with DB_MIGRATE_ON_STARTUP=true (the default, handy
+    in development), otherwise startup fails until the migration ran
+  - newer: the code is older than the database, startup fails
+
+Bump SCHEMA_VERSION with every change to the models, app/indexes.py, the FTS table or the
+rollup triggers. As a deploy step, before the workers start:
+    python -m app.migrate
+"""
+from typing import Optional
+
+from sqlalchemy import Column, Integer, MetaData, Table, delete, func, insert, inspect, select
+
+from app.database import engine, init_db
+
+SCHEMA_VERSION = 1
+
+# own MetaData: not part of Base.metadata, only migrate() creates it
+schema_version = Table("schema_version", MetaData(), Column("version", Integer, nullable=False))
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database schema doesn't match SCHEMA_VERSION and won't be migrated on startup"""
+
+
+def current_version() -> Optional[int]:
+    """Stamped schema version, None for a database that was never migrated"""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_version.name):
+            return None
+        return conn.execute(select(func.max(schema_version.c.version))).scalar()
+
+
+def migrate() -> Optional[int]:
+    """Bring the schema up to date and stamp SCHEMA_VERSION, returns the version it had before"""
+    previous = current_version()
+    init_db()
+    with engine.begin() as conn:
+        schema_version.create(conn, checkfirst=True)
+        conn.execute(delete(schema_version))
+        conn.execute(insert(schema_version).values(version=SCHEMA_VERSION))
+    return previous
+
+
+def ensure_schema(migrate_if_needed: bool = True) -> None:
+    """Startup check: nothing when the database is at SCHEMA_VERSION, else migrate it or raise SchemaOutOfDate"""
+    version = current_version()
+    if version == SCHEMA_VERSION:
+        return
+    if version is not None and version > SCHEMA_VERSION:
+        raise SchemaOutOfDate(f"Database schema is at version {version}, newer than this code ({SCHEMA_VERSION})")
+    if not migrate_if_needed:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {version or 0}, expected {SCHEMA_VERSION}: run `python -m app.migrate`"
+        )
+    migrate()
+
+
+if __name__ == "__main__":
+    previous = migrate()
+    print(f"Schema migrated from version {previous or 0} to {SCHEMA_VERSION}")
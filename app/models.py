@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Date, DateTime, Boolean
+from sqlalchemy import Column, String, Float, Date, DateTime, Boolean, Index, Integer, column, false
 from datetime import datetime
 from app.database import Base
 import uuid
@@ -8,22 +8,58 @@ def generate_uuid():
     """Generate UUID string for asset ID"""
     return str(uuid.uuid4())
 
+
+def _live_index(*columns: str) -> Index:
+    """
+    Partial index over live assets (WHERE is_deleted = 0): every read filters on it, so soft-deleted
+    rows don't take space in the indexes. Existing databases are migrated by app/indexes.py
+    """
+    live = column("is_deleted") == false()
+    return Index("ix_assets_live_" + "_".join(columns), *columns, sqlite_where=live, postgresql_where=live)
+
 class Asset(Base):
     __tablename__ = "assets"
 
-    id = Column(String, primary_key=True, default=generate_uuid, index=True)
-    name = Column(String,nullable=False, index=True)
+    id = Column(String, primary_key=True, default=generate_uuid)
+    name = Column(String,nullable=False)
     category = Column(String,nullable=False)
     value = Column(Float,nullable=False)
     purchase_date = Column(Date,nullable=False)
-    status = Column(String,nullable=False, index=True)
+    status = Column(String,nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     description = Column(String(500), nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
-    is_deleted = Column(Boolean, default=False, nullable=False, index=True)
+    is_deleted = Column(Boolean, default=False, nullable=False)
     deleted_at = Column(DateTime, nullable=True)
 
+    # (sort column, id) pairs back the keyset pagination in AsyncAssetCRUD.get_all and the value/purchase_date ranges,
+    # (category/status, sort column, id) the filtered lists in the default and value order
+    __table_args__ = (
+        _live_index("name", "id"),
+        _live_index("value", "id"),
+        _live_index("purchase_date", "id"),
+        _live_index("created_at", "id"),
+        _live_index("updated_at", "id"),
+        _live_index("category", "created_at", "id"),
+        _live_index("status", "created_at", "id"),
+        _live_index("category", "value", "id"),
+        _live_index("status", "value", "id"),
+    )
+
+
+class AssetRollup(Base):
+    """Live (not deleted) asset totals per category/status/purchase month, kept up to date by triggers in app/analytics.py"""
+    __tablename__ = "asset_rollups"
+
+    category = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    purchase_month = Column(String, primary_key=True)  # YYYY-MM
+    asset_count = Column(Integer, nullable=False, default=0)
+    total_value = Column(Float, nullable=False, default=0)
+    min_value = Column(Float, nullable=True)
+    max_value = Column(Float, nullable=True)
+
     
 
 class AssetStatus:
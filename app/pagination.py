@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Tuple
+
+from app.models import Asset
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor can't be decoded or doesn't match the query"""
+
+
+def encode_cursor(asset: Asset, sort_by: str, order: str) -> str:
+    """Build an opaque cursor pointing right after the given asset"""
+    sort_value = getattr(asset, sort_by)
+    if isinstance(sort_value, (date, datetime)):
+        sort_value = sort_value.isoformat()
+
+    payload = json.dumps([sort_by, order, sort_value, asset.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> Tuple[Any, str]:
+    """Decode a cursor into (sort value, asset id) for the active sort"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort_by, cursor_order, sort_value, asset_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode())
+        )
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+
+    # a cursor is only valid for the sort it was created with
+    if cursor_sort_by != sort_by or cursor_order != order:
+        raise InvalidCursor("Cursor does not match sort_by/order")
+
+    python_type = getattr(Asset, sort_by).type.python_type
+    try:
+        if python_type is datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        elif python_type is date:
+            sort_value = date.fromisoformat(sort_value)
+        else:
+            sort_value = python_type(sort_value)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Malformed cursor")
+
+    return sort_value, str(asset_id)
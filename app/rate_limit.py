@@ -0,0 +1,365 @@
+"""
+Rate limiting and admission control.
+
+Rate limits are token buckets, one per (client, route): a bucket holds up to `burst` tokens
+and refills at `rate` tokens per second, every request takes one (an agent batch takes one
+per question in a single take). A request that finds its bucket empty gets 429 with Retry-After
+set to when the tokens it needs are back.
+  - agent query routes (/agent/query, /agent/query/stream, /agent/query/batch): RATE_LIMIT_AGENT_*
+  - every other route: RATE_LIMIT_API_*
+The client is the peer address, or the first X-Forwarded-For hop with RATE_LIMIT_TRUST_FORWARDED.
+
+RateLimitStore is the interface of the bucket stores (picked by SHARED_STATE_BACKEND, see
+app/shared_state.py): MemoryRateLimitStore keeps them in process (LRU bounded), the SQLite
+and Redis stores let every worker count against the same buckets. take() is async, the SQLite
+store runs its transaction in a thread and the Redis one uses redis.asyncio.
+
+Admission control caps the agent queries in flight in this process (AGENT_MAX_IN_FLIGHT,
+a batch counts as many as it runs at once). When every slot is taken a query waits at most
+AGENT_ADMISSION_WAIT_SECONDS and is then shed with 503 before it costs an LLM call, with a
+Retry-After from the recent query latency. The agent can't pile up more work than the LLM
+quota serves, and CRUD routes keep their latency while it is saturated.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from app.config import get_settings
+from app.shared_state import backend, redis_client, sqlite_state
+
+settings = get_settings()
+
+AGENT_QUERY_ROUTES = tuple(f"{settings.API_V1_PREFIX}/agent/query{suffix}" for suffix in ("", "/stream", "/batch"))
+# takes its tokens itself, one per question in a single take (query_agent_batch)
+AGENT_BATCH_ROUTE = f"{settings.API_V1_PREFIX}/agent/query/batch"
+
+
+class RateLimitStore:
+    """Interface for token bucket stores"""
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> Tuple[bool, float, float]:
+        """
+        Take `cost` tokens from the bucket of `key`.
+        Returns (allowed, tokens left, seconds until the request would be allowed)
+        """
+        raise NotImplementedError
+
+    async def stats(self) -> dict:
+        raise NotImplementedError
+
+
+def refill(tokens: float, updated: float, now: float, rate: float, burst: float, cost: float) -> Tuple[bool, float, float]:
+    """
+    Token bucket step shared by the stores: (allowed, tokens after, retry after).
+    A cost above the burst is allowed on a full bucket and leaves it in debt,
+    so big batches pass but the client waits for every token they took.
+    """
+    tokens = min(burst, tokens + (now - updated) * rate)
+    needed = min(cost, burst)
+    if tokens >= needed:
+        return True, tokens - cost, 0.0
+    return False, tokens, (needed - tokens) / rate
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Thread safe in-process buckets, the least recently used are dropped past max_keys"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> Tuple[bool, float, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            allowed, tokens, retry_after = refill(tokens, updated, now, rate, burst, cost)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed, tokens, retry_after
+
+    async def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "memory", "buckets": len(self._buckets), "max_keys": self.max_keys}
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """
+    Buckets in the shared SQLite file, each take is one short write transaction (read, refill, write)
+    run in a thread, so waiting for the file's write lock doesn't stall the event loop
+    """
+
+    # buckets that are full again are deleted (and the oldest beyond max_keys) every PRUNE_EVERY takes
+    PRUNE_EVERY = 1000
+
+    def __init__(self, max_keys: int = 10000):
+        self.state = sqlite_state()
+        self.max_keys = max_keys
+        self._takes = 0
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> Tuple[bool, float, float]:
+        self._takes += 1
+        return await asyncio.to_thread(self._take, key, rate, burst, cost, self._takes % self.PRUNE_EVERY == 0)
+
+    def _take(self, key: str, rate: float, burst: float, cost: float, prune: bool) -> Tuple[bool, float, float]:
+        # wall clock, the workers don't share a monotonic one
+        now = time.time()
+        with self.state.transaction() as conn:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            allowed, tokens, retry_after = refill(tokens, updated, now, rate, burst, cost)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (burst - tokens) / rate),
+            )
+            if prune:
+                self._prune(conn, now)
+        return allowed, tokens, retry_after
+
+    def _prune(self, conn, now: float) -> None:
+        # a bucket that is full again is the same as a missing one
+        conn.execute("DELETE FROM rate_buckets WHERE full_at < ?", (now,))
+        conn.execute(
+            "DELETE FROM rate_buckets WHERE key IN (SELECT key FROM rate_buckets ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+            (self.max_keys,),
+        )
+
+    async def stats(self) -> dict:
+        buckets = await asyncio.to_thread(lambda: self.state.connection().execute("SELECT count(*) FROM rate_buckets").fetchone()[0])
+        return {"backend": "sqlite", "buckets": buckets, "max_keys": self.max_keys}
+
+
+# refill() on the Redis server: read, refill and write a bucket atomically with the server's clock
+REDIS_TAKE = """
+local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate)
+local needed = math.min(cost, burst)
+local allowed, retry_after = 0, 0
+if tokens >= needed then
+    allowed = 1
+    tokens = tokens - cost
+else
+    retry_after = (needed - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+-- gone once it would be full again
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Buckets as Redis hashes, taken by a Lua script; idle buckets expire once full again (max_keys isn't needed)"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.redis = redis_client()
+        self.max_keys = max_keys
+        self._take = self.redis.register_script(REDIS_TAKE)
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> Tuple[bool, float, float]:
+        allowed, tokens, retry_after = await self._take(keys=[key], args=[rate, burst, cost])
+        return bool(allowed), float(tokens), float(retry_after)
+
+    async def stats(self) -> dict:
+        return {"backend": "redis", "max_keys": self.max_keys}
+
+
+def rate_limit_store(max_keys: int) -> RateLimitStore:
+    """The SHARED_STATE_BACKEND implementation"""
+    name = backend()
+    if name == "sqlite":
+        return SQLiteRateLimitStore(max_keys=max_keys)
+    if name == "redis":
+        return RedisRateLimitStore(max_keys=max_keys)
+    return MemoryRateLimitStore(max_keys=max_keys)
+
+
+class RateLimit:
+    """rate tokens/second, up to burst tokens"""
+
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+
+
+def route_path(request: Request) -> str:
+    """The path template of the matched route ("/assets/{asset_id}"), the URL path without one"""
+    return getattr(request.scope.get("route"), "path", request.url.path)
+
+
+class RateLimiter:
+    """Per client and route token buckets on top of a RateLimitStore"""
+
+    def __init__(self, store: RateLimitStore, api: RateLimit, agent: RateLimit, enabled: bool = True, trust_forwarded: bool = False):
+        self.store = store
+        self.api = api
+        self.agent = agent
+        self.enabled = enabled
+        self.trust_forwarded = trust_forwarded
+        self.allowed = 0
+        self.limited = {api.name: 0, agent.name: 0}
+
+    def client_id(self, request: Request) -> str:
+        if self.trust_forwarded:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return request.client.host if request.client else "unknown"
+
+    def limit_for(self, path: str) -> RateLimit:
+        return self.agent if path in AGENT_QUERY_ROUTES else self.api
+
+    async def check(self, request: Request, cost: float = 1) -> None:
+        """Take `cost` tokens for this request's client and route, 429 when there aren't enough"""
+        if not self.enabled or cost <= 0:
+            return
+        path = route_path(request)
+        limit = self.limit_for(path)
+        key = f"ratelimit:{limit.name}:{self.client_id(request)}:{request.method} {path}"
+
+        allowed, tokens, retry_after = await self.store.take(key, limit.rate, limit.burst, cost)
+        if allowed:
+            self.allowed += 1
+            return
+        self.limited[limit.name] += 1
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded, retry in {math.ceil(retry_after)}s",
+            headers={
+                "Retry-After": str(math.ceil(retry_after)),
+                "X-RateLimit-Limit": str(limit.burst),
+                "X-RateLimit-Remaining": str(max(0, math.floor(tokens))),
+            },
+        )
+
+    async def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "allowed": self.allowed,
+            "limited": dict(self.limited),
+            **await self.store.stats(),
+        }
+
+
+class Admission:
+    """A granted slot, release() is safe to await more than once"""
+
+    def __init__(self, controller: "AdmissionController", weight: int):
+        self.controller = controller
+        self.weight = weight
+        self.started = time.monotonic()
+        self.released = False
+
+    async def release(self) -> None:
+        if not self.released:
+            self.released = True
+            await self.controller._release(self)
+
+
+class AdmissionController:
+    """Caps the agent work in flight, sheds the excess with 503 + Retry-After"""
+
+    # weight of the newest latency in the moving average Retry-After is based on
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(self, max_in_flight: int, max_wait: float = 0):
+        self.max_in_flight = max_in_flight
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self.latency: Optional[float] = None
+        # notified by every release, waiting queries sleep on it instead of polling
+        self._released: Optional[asyncio.Condition] = None
+        self._released_loop = None
+
+    def _released_condition(self) -> asyncio.Condition:
+        # one per event loop, asyncio primitives are bound to the loop they first wait in
+        loop = asyncio.get_running_loop()
+        if self._released_loop is not loop:
+            self._released, self._released_loop = asyncio.Condition(), loop
+        return self._released
+
+    def _has_room(self, weight: int) -> bool:
+        return self.in_flight + weight <= self.max_in_flight
+
+    async def admit(self, weight: int = 1) -> Admission:
+        """A slot of `weight` (capped at max_in_flight), or HTTPException 503 once max_wait is over"""
+        weight = max(1, min(weight, self.max_in_flight))
+        if not self._has_room(weight) and self.max_wait > 0:
+            released = self._released_condition()
+            async with released:
+                try:
+                    await asyncio.wait_for(released.wait_for(lambda: self._has_room(weight)), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+        if not self._has_room(weight):
+            self.shed += 1
+            raise HTTPException(
+                status_code=503,
+                detail="The agent is at capacity, retry later",
+                headers={"Retry-After": str(self.retry_after())},
+            )
+        self.in_flight += weight
+        self.admitted += 1
+        return Admission(self, weight)
+
+    @asynccontextmanager
+    async def slot(self, weight: int = 1) -> AsyncIterator[Admission]:
+        admission = await self.admit(weight)
+        try:
+            yield admission
+        finally:
+            await admission.release()
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: the typical query latency, 1s until one finished"""
+        return max(1, math.ceil(self.latency or 1))
+
+    async def _release(self, admission: Admission) -> None:
+        self.in_flight -= admission.weight
+        elapsed = time.monotonic() - admission.started
+        self.latency = elapsed if self.latency is None else self.latency + self.LATENCY_SMOOTHING * (elapsed - self.latency)
+        released = self._released_condition()
+        async with released:
+            released.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "latency_s": round(self.latency, 3) if self.latency is not None else None,
+        }
+
+
+rate_limiter = RateLimiter(
+    rate_limit_store(max_keys=settings.RATE_LIMIT_MAX_CLIENTS),
+    api=RateLimit("api", settings.RATE_LIMIT_API_PER_SECOND, settings.RATE_LIMIT_API_BURST),
+    agent=RateLimit("agent", settings.RATE_LIMIT_AGENT_PER_MINUTE / 60, settings.RATE_LIMIT_AGENT_BURST),
+    enabled=settings.RATE_LIMIT_ENABLED,
+    trust_forwarded=settings.RATE_LIMIT_TRUST_FORWARDED,
+)
+agent_admission = AdmissionController(settings.AGENT_MAX_IN_FLIGHT, settings.AGENT_ADMISSION_WAIT_SECONDS)
+
+
+async def rate_limit(request: Request) -> None:
+    """App wide dependency: one token per request from the client's bucket for this route"""
+    if route_path(request) == AGENT_BATCH_ROUTE:
+        return  # a 429 on part of the batch would still have cost this token
+    await rate_limiter.check(request)
@@ -1,40 +1,36 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import  or_
-from typing import List, Optional
+from sqlalchemy import  or_, tuple_, select, func, literal, insert, update, delete, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional, Tuple
 from datetime import datetime
 
 
-from app.models import Asset
+from app.models import Asset, AssetRollup
 from app.schemas import (AssetCreate, AssetUpdate)
+from app.pagination import decode_cursor
+from app.search import FTS_ENABLED, assets_fts, to_fts_query, search_condition, join_search
+from app.analytics import ROLLUPS_ENABLED
+from app.config import get_settings
+from app.cache import asset_cache
 
+settings = get_settings()
 
-class AssetCRUD:
+# columns of /assets/export, the CSV header is importable again through /assets/bulk
+EXPORT_COLUMNS = ("id", "name", "category", "value", "purchase_date", "status", "description", "created_at", "updated_at")
+# AssetResponse fields in schema order, selected as plain rows by the fast serialization path
+RESPONSE_COLUMNS = ("name", "category", "value", "purchase_date", "status", "description", "id", "created_at", "updated_at")
+
+
+class AssetStatements:
     """
-    CRUD operations for assets all database operations go through this class
+    The SQL statements of the asset operations, only built here: AsyncAssetCRUD runs them
     """
-    
-    def create(self, db: Session, asset_data: AssetCreate) -> Asset:
-        """Create a new asset"""
-        db_asset = Asset(
-            name=asset_data.name,
-            category=asset_data.category.value,
-            value=asset_data.value,
-            purchase_date=asset_data.purchase_date,
-            status=asset_data.status.value,
-            description=asset_data.description
-        )
-        db.add(db_asset)
-        db.commit()
-        db.refresh(db_asset)
-        return db_asset
-    
 
+    def _insert_returning(self):
+        """INSERT ... RETURNING: the generated id and timestamps come back with the insert, no refresh SELECT"""
+        return insert(Asset).returning(Asset, sort_by_parameter_order=True)
 
-    def get_all(
+    def _filter_conditions(
         self,
-        db: Session,
-        skip: int = 0,
-        limit: int = 100,
         category: Optional[str]= None,
         status: Optional[str] = None,
         min_value:Optional[int]= None,
@@ -42,105 +38,181 @@ class AssetCRUD:
         purchase_date_from:Optional[datetime]=None,
         purchase_date_to:Optional[datetime]=None,
         search:Optional[str]=None,
-        sort_by:str="created_at",
-        order:str="desc"
-        ) -> List[Asset]:
-        """Get all assets"""
+        ) -> list:
+        """Build the WHERE conditions shared by the list, count and total queries"""
+        conditions = [Asset.is_deleted == False]
 
-        query = db.query(Asset).filter(Asset.is_deleted == False)
-        
         if category:
-         query = query.filter(Asset.category == category) # it's not fuzzy search it needs to be exact match!! 
-
-        if status: 
-            query = query.filter(Asset.status == status) # same as category
+            conditions.append(Asset.category == category) # it's not fuzzy search it needs to be exact match!!
 
+        if status:
+            conditions.append(Asset.status == status) # same as category
 
-            #### after finishing task clean this code and wrap it insted of ugly if conditions.
         if min_value:
-            query = query.filter(Asset.value >= min_value)
+            conditions.append(Asset.value >= min_value)
 
-        if max_value: 
-            query = query.filter(Asset.value <=max_value)
+        if max_value:
+            conditions.append(Asset.value <= max_value)
 
         if purchase_date_from:
-           query = query.filter(Asset.purchase_date >= purchase_date_from)
+            conditions.append(Asset.purchase_date >= purchase_date_from)
 
         if purchase_date_to:
-           query = query.filter(Asset.purchase_date <= purchase_date_to)
+            conditions.append(Asset.purchase_date <= purchase_date_to)
 
         if search:
-            search_filter= or_(
-                Asset.name.ilike(f"%{search}%"),
-                Asset.description.ilike(f"%{search}%")
-            )
-            query = query.filter(search_filter)
-        
+            fts_query = to_fts_query(search) if FTS_ENABLED else None
+            if fts_query:
+                conditions.append(search_condition(fts_query))
+            else:
+                conditions.append(or_(
+                    Asset.name.ilike(f"%{search}%"),
+                    Asset.description.ilike(f"%{search}%")
+                ))
+
+        return conditions
+
+    def _page_select(self, filters: dict, skip: int, limit: int, sort_by: str, order: str, cursor: Optional[str], *extra_columns, columns: Optional[list] = None) -> Select:
+        """
+        Filtered, ordered and paginated SELECT (offset pagination with skip, or keyset pagination with cursor)
+        of Asset objects, or of just `columns` as plain rows
+        """
+        # best full-text matches first, only offset pagination since rank isn't a stored column
+        if sort_by == "relevance":
+            fts_query = to_fts_query(filters.get("search") or "") if FTS_ENABLED else None
+            if fts_query:
+                # the joined MATCH filters and ranks, so it replaces the rowid IN (...) search condition
+                conditions = self._filter_conditions(**{**filters, "search": None})
+                query = join_search(select(*(columns or [Asset]), *extra_columns).where(*conditions), fts_query)
+                query = query.order_by(assets_fts.c.rank, Asset.id)
+            else:
+                query = select(*(columns or [Asset]), *extra_columns).where(*self._filter_conditions(**filters))
+                query = query.order_by(Asset.created_at.desc(), Asset.id.desc())
+            return query.offset(skip).limit(limit)
+
+        query = select(*(columns or [Asset]), *extra_columns).where(*self._filter_conditions(**filters))
+        sort_column = getattr(Asset, sort_by)
+
+        # keyset: seek straight past the last row of the previous page using the (sort column, id) index
+        if cursor:
+            sort_value, last_id = decode_cursor(cursor, sort_by, order)
+            if order == "asc":
+                query = query.where(tuple_(sort_column, Asset.id) > tuple_(sort_value, last_id))
+            else:
+                query = query.where(tuple_(sort_column, Asset.id) < tuple_(sort_value, last_id))
+
+        # id is the tiebreaker so pages are stable when sort values repeat
         if order == "asc":
-            query = query.order_by(getattr(Asset, sort_by).asc())
+            query = query.order_by(sort_column.asc(), Asset.id.asc())
         else:
-            query = query.order_by(getattr(Asset, sort_by).desc())
-        
-        
-
-        return query.offset(skip).limit(limit).all()
-
-    
-    def count(
-        self,
-        db: Session,
-        category: Optional[str]= None,
-        status:Optional[str] = None,
-        min_value:Optional[int]= None,
-        max_value:Optional[int]= None,
-        purchase_date_from:Optional[datetime]=None,
-        purchase_date_to:Optional[datetime]=None,
-        search: Optional[str] = None,
-        ) -> int:
-        """Count total assets"""
-        query = db.query(Asset).filter(Asset.is_deleted == False)
-        if category:
-         query = query.filter(Asset.category.ilike(category))
-
-        if status: 
-            query = query.filter(Asset.status.ilike(status))
-
-        if min_value:
-            query = query.filter(Asset.value >= min_value)
-
-        if max_value: 
-            query = query.filter(Asset.value <=max_value)
-
-        if purchase_date_from:
-           query = query.filter(Asset.purchase_date >= purchase_date_from)
-
-        if purchase_date_to:
-           query = query.filter(Asset.purchase_date <= purchase_date_to)
-
-        if search:
-            search_filter = or_(
-                Asset.name.ilike(f"%{search}%"),
-                Asset.description.ilike(f"%{search}%")
+            query = query.order_by(sort_column.desc(), Asset.id.desc())
+
+        if not cursor and skip:
+            query = query.offset(skip)
+
+        return query.limit(limit)
+
+    def _total_select(self, conditions: list, cap: Optional[int] = None):
+        """SELECT count(*) over the filtered rows, stopping after `cap` rows when given"""
+        rows = select(literal(1)).select_from(Asset).where(*conditions)
+        if cap:
+            rows = rows.limit(cap)
+        # correlate(None) keeps it standalone when embedded in the page query on the same table
+        return select(func.count()).select_from(rows.subquery()).correlate(None)
+
+    def _export_select(self, sort_by: str, order: str, filters: dict) -> Select:
+        """Plain column SELECT of every filtered asset (no ORM objects), ordered by the (sort column, id) index"""
+        sort_column = getattr(Asset, sort_by)
+        ordering = (sort_column.asc(), Asset.id.asc()) if order == "asc" else (sort_column.desc(), Asset.id.desc())
+        columns = [getattr(Asset, column) for column in EXPORT_COLUMNS]
+        return select(*columns).where(*self._filter_conditions(**filters)).order_by(*ordering)
+
+    def _page_statement(self, skip: int, limit: int, sort_by: str, order: str, cursor: Optional[str], total: str, filters: dict, columns: Optional[list] = None) -> Tuple[Select, Optional[Select], Optional[int]]:
+        """
+        Page SELECT for get_page (with the total embedded as a scalar subquery unless total="none"),
+        plus the standalone total SELECT and the estimate cap
+        """
+        if total == "none":
+            return self._page_select(filters, skip, limit, sort_by, order, cursor, columns=columns), None, None
+
+        cap = settings.COUNT_ESTIMATE_CAP if total == "estimate" else None
+        total_select = self._total_select(self._filter_conditions(**filters), cap)
+        total_column = total_select.scalar_subquery().label("total")
+        return self._page_select(filters, skip, limit, sort_by, order, cursor, total_column, columns=columns), total_select, cap
+
+    def _analytics_select(self, group_by: List[str], filters: dict) -> Tuple[Select, str]:
+        """
+        GROUP BY statement for analytics and where it reads from.
+        Only category/status filters can be answered from the rollups, anything else aggregates the filtered assets.
+        """
+        rollup_filters = {"category", "status"}
+        if ROLLUPS_ENABLED and all(value is None for key, value in filters.items() if key not in rollup_filters):
+            dimensions = [getattr(AssetRollup, dimension).label(dimension) for dimension in group_by]
+            query = select(
+                *dimensions,
+                func.sum(AssetRollup.asset_count).label("count"),
+                func.sum(AssetRollup.total_value).label("total_value"),
+                func.min(AssetRollup.min_value).label("min_value"),
+                func.max(AssetRollup.max_value).label("max_value"),
             )
-            query = query.filter(search_filter)
-        
-
-        return query.count()
-    
-
-    def get_by_id(self, db: Session, asset_id: str) -> Optional[Asset]:
-        """Get an asset by ID"""
-        return db.query(Asset).filter(
-            Asset.id == asset_id,
-            Asset.is_deleted == False
-        ).first()
-    
-    def update(self, db:Session, asset_id:str, asset_data:AssetUpdate) -> Optional[Asset]: 
-        """ Update an asset by id """
-        db_asset = self.get_by_id(db,asset_id)
-
-        if not db_asset: 
-            return None
+            if filters.get("category"):
+                query = query.where(AssetRollup.category == filters["category"])
+            if filters.get("status"):
+                query = query.where(AssetRollup.status == filters["status"])
+            return query.group_by(*dimensions), "rollup"
+
+        columns = {
+            "category": Asset.category,
+            "status": Asset.status,
+            "purchase_month": func.strftime("%Y-%m", Asset.purchase_date),
+        }
+        dimensions = [columns[dimension].label(dimension) for dimension in group_by]
+        query = select(
+            *dimensions,
+            func.count().label("count"),
+            func.sum(Asset.value).label("total_value"),
+            func.min(Asset.value).label("min_value"),
+            func.max(Asset.value).label("max_value"),
+        ).where(*self._filter_conditions(**filters))
+        return query.group_by(*dimensions), "assets"
+
+    def _analytics_groups(self, rows, group_by: List[str]) -> List[dict]:
+        groups = []
+        for row in rows:
+            if not row.count:
+                continue
+            group = {dimension: getattr(row, dimension) for dimension in group_by}
+            group.update(
+                count=row.count,
+                total_value=row.total_value,
+                avg_value=row.total_value / row.count,
+                min_value=row.min_value,
+                max_value=row.max_value,
+            )
+            groups.append(group)
+        return groups
+
+    def _bulk_rows(self, assets_data: List[AssetCreate]) -> List[dict]:
+        return [
+            {
+                "name": asset_data.name,
+                "category": asset_data.category.value,
+                "value": asset_data.value,
+                "purchase_date": asset_data.purchase_date,
+                "status": asset_data.status.value,
+                "description": asset_data.description,
+            }
+            for asset_data in assets_data
+        ]
+
+    def _by_id(self, asset_id: str) -> list:
+        return [Asset.id == asset_id, Asset.is_deleted == False]
+
+    def _response_columns(self) -> list:
+        return [getattr(Asset, column) for column in RESPONSE_COLUMNS]
+
+    def _update_values(self, asset_data: AssetUpdate) -> dict:
+        """Column values from an AssetUpdate (only the fields that were sent)"""
         updated_data = asset_data.model_dump(exclude_unset=True)
 
         if 'status' in updated_data and updated_data['status']:
@@ -149,41 +221,165 @@ class AssetCRUD:
         if 'category' in updated_data and updated_data['category']:   #missed updating category after adding Asset Category Class 
            updated_data['category'] = updated_data['category'].value
 
-        for field, value in updated_data.items():
-            setattr(db_asset, field, value)
-        
-        db.commit()
-        db.refresh(db_asset)
-        return db_asset
-    
-    def delete(self, db: Session, asset_id: str) -> bool:
-        """Delete an asset"""
-        db_asset = self.get_by_id(db, asset_id)
-        
-        if not db_asset:
-            return False
-        
-        db.delete(db_asset)
-        db.commit()
-        
-        return True 
-    
-    def soft_delete(self, db:Session, asset_id: str) -> bool:
-        """ soft Delete  an asset (Keeping it in the database)"""
-        db_asset = self.get_by_id(db, asset_id)
+        return updated_data
+
+    def _update_returning(self, asset_id: str, updated_data: dict):
+        return update(Asset).where(*self._by_id(asset_id)).values(**updated_data).returning(Asset)
+
+    def _soft_delete_statement(self, conditions: list):
+        return update(Asset).where(*conditions).values(is_deleted=True, deleted_at=datetime.utcnow())
+
 
-        if not db_asset:
-            return False
-        
-        db_asset.is_deleted = True
-        db_asset.deleted_at = datetime.utcnow()
-        db.commit()
+class AsyncAssetCRUD(AssetStatements):
+    """
+    CRUD operations for assets, all database operations go through this class (on an AsyncSession)
+    """
+
+    async def create(self, db: AsyncSession, asset_data: AssetCreate) -> Asset:
+        """Create a new asset (single INSERT ... RETURNING)"""
+        db_asset = (await db.execute(self._insert_returning(), self._bulk_rows([asset_data]))).scalar_one()
+        await db.commit()
+        await asset_cache.invalidate_lists()
+        return db_asset
 
-        return True;
+    async def bulk_create(self, db: AsyncSession, assets_data: List[AssetCreate]) -> int:
+        """Insert many assets with a single executemany in one transaction (no per-row refresh)"""
+        if not assets_data:
+            return 0
+        rows = self._bulk_rows(assets_data)
+        try:
+            await db.execute(insert(Asset), rows)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        await asset_cache.invalidate_lists()
+        return len(rows)
+
+    async def get_all(self, db: AsyncSession, skip: int = 0, limit: int = 100, sort_by: str = "created_at", order: str = "desc", cursor: Optional[str] = None, **filters) -> List[Asset]:
+        """Get all assets (offset pagination with skip, or keyset pagination with cursor)"""
+        result = await db.scalars(self._page_select(filters, skip, limit, sort_by, order, cursor))
+        return result.all()
+
+    async def get_page(self, db: AsyncSession, skip: int = 0, limit: int = 100, sort_by: str = "created_at", order: str = "desc", cursor: Optional[str] = None, total: str = "exact", as_rows: bool = False, **filters) -> Tuple[list, Optional[int], bool]:
+        """
+        Get a page of assets and the total in one round trip.
+        total: "exact" counts every match, "estimate" stops counting at COUNT_ESTIMATE_CAP, "none" skips it.
+        as_rows: plain rows of RESPONSE_COLUMNS instead of Asset objects (no identity map, no ORM instances)
+        Returns (assets, total, total_is_estimate)
+        """
+        columns = self._response_columns() if as_rows else None
+        page_select, total_select, cap = self._page_statement(skip, limit, sort_by, order, cursor, total, filters, columns)
+
+        if total_select is None:
+            result = await db.execute(page_select)
+            return (result.all() if as_rows else result.scalars().all()), None, False
+
+        rows = (await db.execute(page_select)).all()
+
+        if rows:
+            total_count = rows[0].total
+        elif skip or cursor:
+            # past the last page the total rides on no row, so ask for it directly
+            total_count = (await db.execute(total_select)).scalar()
+        else:
+            total_count = 0
+
+        return (rows if as_rows else [row.Asset for row in rows]), total_count, bool(cap) and total_count >= cap
+
+    async def stream_rows(self, db: AsyncSession, sort_by: str = "created_at", order: str = "desc", batch_size: int = 1000, **filters) -> AsyncIterator[List[tuple]]:
+        """
+        Every filtered asset as batches of plain row tuples (EXPORT_COLUMNS order),
+        read through a server-side cursor so only one batch is in memory at a time
+        """
+        statement = self._export_select(sort_by, order, filters).execution_options(yield_per=batch_size)
+        result = await db.stream(statement)
+        try:
+            async for partition in result.partitions():
+                yield [tuple(row) for row in partition]
+        finally:
+            await result.close()
+
+    async def analytics(self, db: AsyncSession, group_by: List[str], **filters) -> Tuple[List[dict], str]:
+        """Count/sum/avg/min/max of asset values per group, computed in the database. Returns (groups, source)"""
+        query, source = self._analytics_select(group_by, filters)
+        return self._analytics_groups((await db.execute(query)).all(), group_by), source
+
+    async def count(self, db: AsyncSession, **filters) -> int:
+        """Count total assets"""
+        return (await db.execute(self._total_select(self._filter_conditions(**filters)))).scalar()
 
+    async def get_by_id(self, db: AsyncSession, asset_id: str) -> Optional[Asset]:
+        """Get an asset by ID"""
+        return (await db.scalars(select(Asset).where(*self._by_id(asset_id)))).first()
+
+    async def get_row_by_id(self, db: AsyncSession, asset_id: str):
+        """Get an asset by ID as a plain row of RESPONSE_COLUMNS"""
+        return (await db.execute(select(*self._response_columns()).where(*self._by_id(asset_id)))).first()
+
+    async def update(self, db: AsyncSession, asset_id: str, asset_data: AssetUpdate) -> Optional[Asset]:
+        """Update an asset by id (single UPDATE ... RETURNING)"""
+        updated_data = self._update_values(asset_data)
+        if not updated_data:
+            return await self.get_by_id(db, asset_id)
+
+        db_asset = (await db.execute(
+            self._update_returning(asset_id, updated_data)
+        )).scalar_one_or_none()
+        await db.commit()
+        if db_asset:
+            await asset_cache.invalidate_asset(asset_id)
+        return db_asset
 
-    
+    async def delete(self, db: AsyncSession, asset_id: str) -> bool:
+        """Delete an asset"""
+        result = await db.execute(delete(Asset).where(*self._by_id(asset_id)))
+        await db.commit()
+        if result.rowcount:
+            await asset_cache.invalidate_asset(asset_id)
+        return result.rowcount > 0
 
+    async def soft_delete(self, db: AsyncSession, asset_id: str) -> bool:
+        """ soft Delete  an asset (Keeping it in the database)"""
+        result = await db.execute(self._soft_delete_statement(self._by_id(asset_id)))
+        await db.commit()
+        if result.rowcount:
+            await asset_cache.invalidate_asset(asset_id)
+        return result.rowcount > 0
+
+    async def bulk_update(self, db: AsyncSession, asset_data: AssetUpdate, dry_run: bool = False, **filters) -> int:
+        """Apply the same changes to every asset matching the filters in one UPDATE, returns affected rows"""
+        conditions = self._filter_conditions(**filters)
+        if dry_run:
+            return (await db.execute(self._total_select(conditions))).scalar()
+
+        updated_data = self._update_values(asset_data)
+        if not updated_data:
+            return 0
+
+        result = await db.execute(
+            update(Asset).where(*conditions).values(**updated_data),
+            execution_options={"synchronize_session": False}
+        )
+        await db.commit()
+        if result.rowcount:
+            await asset_cache.invalidate_all()
+        return result.rowcount
+
+    async def bulk_soft_delete(self, db: AsyncSession, dry_run: bool = False, **filters) -> int:
+        """Soft delete every asset matching the filters in one UPDATE, returns affected rows"""
+        conditions = self._filter_conditions(**filters)
+        if dry_run:
+            return (await db.execute(self._total_select(conditions))).scalar()
+
+        result = await db.execute(
+            self._soft_delete_statement(conditions),
+            execution_options={"synchronize_session": False}
+        )
+        await db.commit()
+        if result.rowcount:
+            await asset_cache.invalidate_all()
+        return result.rowcount
 
 
-asset_crud = AssetCRUD()
+async_asset_crud = AsyncAssetCRUD()
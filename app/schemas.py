@@ -55,8 +55,52 @@ class AssetResponse(AssetBase):
 
 class AssetListResponse(BaseModel):
     """Schema for paginated list of assets"""
-    total: int
+    total: Optional[int] = None  # None when requested with total=none
+    total_is_estimate: bool = False  # True when total=estimate hit the cap (at least this many)
     assets: list[AssetResponse]
+    next_cursor: Optional[str] = None
+
+
+
+class BulkRowError(BaseModel):
+    """A row rejected by the bulk ingest"""
+    line: int
+    error: str
+
+
+class BulkIngestResponse(BaseModel):
+    """Summary of a bulk ingest"""
+    inserted: int
+    failed: int
+    errors: list[BulkRowError] = []  # capped at BULK_MAX_ERRORS, failed has the real count
+
+
+
+class BulkOperationResponse(BaseModel):
+    """Result of a filter-based bulk update/delete"""
+    affected: int  # rows changed, or rows that would change when dry_run
+    dry_run: bool = False
+
+
+
+class AnalyticsGroup(BaseModel):
+    """Aggregates for one group (the dimensions not grouped by stay None)"""
+    category: Optional[str] = None
+    status: Optional[str] = None
+    purchase_month: Optional[str] = None
+    count: int
+    total_value: float
+    avg_value: float
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+
+
+class AnalyticsResponse(BaseModel):
+    """Asset value statistics grouped by category/status/purchase month"""
+    group_by: list[str]
+    source: str  # "rollup" when served from asset_rollups, "assets" when aggregated over the filtered rows
+    summary: AnalyticsGroup
+    groups: list[AnalyticsGroup]
 
 
 
@@ -73,10 +117,61 @@ class AssetUpdate(BaseModel):
 
 class AgentQuery(BaseModel):
     question: str = Field(..., min_length=1, description="Question about assets")
+    include_metrics: bool = Field(False, description="Return token usage and timings of this query")
+    session_id: Optional[str] = Field(None, max_length=128, description="Conversation id, questions with the same id share memory")
+
+
+class AgentLLMCall(BaseModel):
+    prompt_tokens: int
+    completion_tokens: int
+    ms: float
+
+
+class AgentToolCall(BaseModel):
+    tool: str
+    ms: float
+    error: bool = False
+
+
+class AgentQueryMetrics(BaseModel):
+    iterations: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    llm_calls: list[AgentLLMCall]
+    tool_calls: list[AgentToolCall]
+    db_ms: float
+    db_queries: int
+    total_ms: float
+    fast_path: bool = False  # answered by the rule based router, no LLM call
 
 
 class AgentResponse(BaseModel):
     answer: str
     sources: list[str] = []
     query_type: str = "general"
-    assets_found: Optional[int] = None
\ No newline at end of file
+    assets_found: Optional[int] = None
+    cached: bool = False  # answered from the agent answer cache
+    metrics: Optional[AgentQueryMetrics] = None  # only when include_metrics was set
+
+
+class AgentBatchQuery(BaseModel):
+    queries: list[AgentQuery] = Field(..., min_length=1, description="Questions answered concurrently")
+
+
+class AgentBatchError(BaseModel):
+    status: int
+    detail: str
+
+
+class AgentBatchResult(BaseModel):
+    question: str
+    response: Optional[AgentResponse] = None
+    error: Optional[AgentBatchError] = None  # set instead of response when this question failed
+
+
+class AgentBatchResponse(BaseModel):
+    results: list[AgentBatchResult]  # same order as the queries
+    succeeded: int
+    failed: int
+    shared_tool_calls: int  # tool calls answered from another query's identical call
\ No newline at end of file
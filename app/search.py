@@ -0,0 +1,109 @@
+"""
+Full-text search over asset name/description using a SQLite FTS5 table.
+
+assets_fts keeps its own copy of name/description keyed by assets.rowid, and
+triggers on the assets table keep it in sync for every write path (create,
+update, soft delete, hard delete). Soft-deleted assets are removed from the index.
+
+The table is filled from assets when it (or one of its triggers) is first created, so migrating an
+existing database makes its rows searchable. Rebuild it by hand after a VACUUM, which can renumber rowids:
+    python -m app.search
+"""
+import re
+from typing import Optional
+
+from sqlalchemy import column, literal_column, select, table, text
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# FTS5 only exists on SQLite, other databases keep the ILIKE search
+FTS_ENABLED = (settings.DATABASE_URL or "").startswith("sqlite")
+
+assets_fts = table("assets_fts", column("rowid"), column("rank"), column("assets_fts"))
+
+SEARCH_INDEX_DDL = {
+    # prefix indexes make the "term*" prefix queries cheap
+    "assets_fts": """CREATE VIRTUAL TABLE IF NOT EXISTS assets_fts USING fts5(
+        name, description, prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    "assets_fts_insert": """CREATE TRIGGER IF NOT EXISTS assets_fts_insert AFTER INSERT ON assets
+    WHEN new.is_deleted = 0 BEGIN
+        INSERT INTO assets_fts(rowid, name, description) VALUES (new.rowid, new.name, new.description);
+    END""",
+    "assets_fts_update": """CREATE TRIGGER IF NOT EXISTS assets_fts_update AFTER UPDATE OF name, description, is_deleted ON assets
+    BEGIN
+        DELETE FROM assets_fts WHERE rowid = old.rowid;
+        INSERT INTO assets_fts(rowid, name, description)
+            SELECT new.rowid, new.name, new.description WHERE new.is_deleted = 0;
+    END""",
+    "assets_fts_delete": """CREATE TRIGGER IF NOT EXISTS assets_fts_delete AFTER DELETE ON assets
+    BEGIN
+        DELETE FROM assets_fts WHERE rowid = old.rowid;
+    END""",
+}
+
+
+def create_search_index(bind: Engine) -> None:
+    """Create the FTS table and sync triggers; the first time they appear the table is filled from assets"""
+    if not FTS_ENABLED:
+        return
+    with bind.begin() as conn:
+        existing = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")).scalars())
+        missing = [name for name in SEARCH_INDEX_DDL if name not in existing]
+        for name in missing:
+            conn.execute(text(SEARCH_INDEX_DDL[name]))
+        if missing:
+            # rows written before the table and its triggers existed are not indexed yet
+            _refill(conn)
+
+
+def rebuild_search_index(bind: Engine) -> int:
+    """Refill the FTS table from the assets table in one transaction, returns indexed rows"""
+    create_search_index(bind)
+    with bind.begin() as conn:
+        return _refill(conn)
+
+
+def _refill(conn) -> int:
+    conn.execute(text("DELETE FROM assets_fts"))
+    indexed = conn.execute(text(
+        "INSERT INTO assets_fts(rowid, name, description) "
+        "SELECT rowid, name, description FROM assets WHERE is_deleted = 0"
+    )).rowcount
+    conn.execute(text("INSERT INTO assets_fts(assets_fts) VALUES ('optimize')"))
+    return indexed
+
+
+def to_fts_query(search: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match as a prefix ("mac book" -> "mac"* "book"*)"""
+    terms = re.findall(r"\w+", search)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_condition(fts_query: str):
+    """WHERE condition matching assets whose name/description match the FTS query"""
+    matching_rowids = select(assets_fts.c.rowid).where(assets_fts.c.assets_fts.op("MATCH")(fts_query))
+    return literal_column("assets.rowid").in_(matching_rowids)
+
+
+def join_search(query, fts_query: str):
+    """
+    Join assets_fts to a SELECT on assets with one MATCH, which both keeps the matching assets and
+    makes assets_fts.c.rank (bm25, lower is more relevant) available to ORDER BY
+    """
+    return (
+        query.join(assets_fts, assets_fts.c.rowid == literal_column("assets.rowid"))
+        .where(assets_fts.c.assets_fts.op("MATCH")(fts_query))
+    )
+
+
+if __name__ == "__main__":
+    from app.database import engine, init_db
+
+    init_db()
+    print(f"Indexed {rebuild_search_index(engine)} assets into assets_fts")
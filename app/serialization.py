@@ -0,0 +1,39 @@
+"""
+Fast JSON bodies for the asset list and detail endpoints.
+
+The schema path loads Asset objects, validates each into an AssetResponse (from_attributes)
+and dumps the models. The fast path selects RESPONSE_COLUMNS as plain rows and hands dicts
+straight to orjson. Both produce the same JSON (AssetResponse field order, ISO dates, floats),
+so the response schema doesn't change.
+
+orjson is optional: without it (or with FAST_SERIALIZATION_ENABLED=false) the endpoints
+stay on the schema path.
+"""
+from typing import Optional, Sequence
+
+from app.config import get_settings
+from app.routes.crud import RESPONSE_COLUMNS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+settings = get_settings()
+
+FAST_SERIALIZATION = settings.FAST_SERIALIZATION_ENABLED and orjson is not None
+
+
+def asset_json(row) -> bytes:
+    """AssetResponse JSON of one RESPONSE_COLUMNS row"""
+    return orjson.dumps(dict(zip(RESPONSE_COLUMNS, row)))
+
+
+def asset_list_json(rows: Sequence, total: Optional[int], total_is_estimate: bool, next_cursor: Optional[str]) -> bytes:
+    """AssetListResponse JSON of a page of RESPONSE_COLUMNS rows (extra trailing columns like the total are ignored)"""
+    return orjson.dumps({
+        "total": total,
+        "total_is_estimate": total_is_estimate,
+        "assets": [dict(zip(RESPONSE_COLUMNS, row)) for row in rows],
+        "next_cursor": next_cursor,
+    })
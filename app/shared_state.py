@@ -0,0 +1,103 @@
+"""
+Connections to the state shared between workers.
+
+Everything the API keeps between requests goes through two interfaces: CacheBackend
+(app/cache.py: cached responses, agent answers and sessions, the data-version counters that
+invalidate them) and RateLimitStore (app/rate_limit.py: token buckets). SHARED_STATE_BACKEND
+picks their implementation:
+  memory  in process, the default for a single worker
+  sqlite  one SQLite file (SHARED_STATE_URL, a path) opened by every worker on the host
+  redis   a Redis-compatible server (SHARED_STATE_URL=redis://...), workers on several hosts
+This module only opens the connections, the stores live next to their interfaces. The stores
+are async: sqlite3 calls run in a thread (asyncio.to_thread), Redis goes through redis.asyncio.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.config import get_settings
+
+settings = get_settings()
+
+BACKENDS = ("memory", "sqlite", "redis")
+
+SQLITE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache_entries (namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+    "expires_at REAL NOT NULL, PRIMARY KEY (namespace, key)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS ix_cache_entries_expires ON cache_entries (namespace, expires_at)",
+    "CREATE TABLE IF NOT EXISTS counters (namespace TEXT NOT NULL, key TEXT NOT NULL, value INTEGER NOT NULL, "
+    "PRIMARY KEY (namespace, key)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, "
+    "full_at REAL NOT NULL) WITHOUT ROWID",
+)
+
+
+class SQLiteState:
+    """
+    One connection per thread (and per process, a forked worker opens its own) to the shared SQLite file.
+    Used from the asyncio.to_thread threads, never on the event loop
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # isolation_level=None: transactions are explicit (BEGIN IMMEDIATE in transaction())
+            conn = sqlite3.connect(self.path, timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            # cache and buckets can be rebuilt, no need to fsync them
+            conn.execute("PRAGMA synchronous = OFF")
+            for statement in SQLITE_SCHEMA:
+                conn.execute(statement)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction, takes the write lock up front so read-modify-write is atomic across workers"""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+_sqlite_state = None
+_redis_client = None
+_lock = threading.Lock()
+
+
+def sqlite_state() -> SQLiteState:
+    global _sqlite_state
+    with _lock:
+        if _sqlite_state is None:
+            _sqlite_state = SQLiteState(settings.SHARED_STATE_URL or "shared_state.db")
+        return _sqlite_state
+
+
+def redis_client():
+    """redis.asyncio client for SHARED_STATE_URL (redis is an optional dependency, only needed for this backend)"""
+    global _redis_client
+    with _lock:
+        if _redis_client is None:
+            try:
+                from redis import asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("SHARED_STATE_BACKEND=redis needs the redis package: pip install redis") from e
+            _redis_client = redis.Redis.from_url(settings.SHARED_STATE_URL or "redis://localhost:6379/0")
+        return _redis_client
+
+
+def backend() -> str:
+    if settings.SHARED_STATE_BACKEND not in BACKENDS:
+        raise RuntimeError(f"SHARED_STATE_BACKEND must be one of {', '.join(BACKENDS)}, not {settings.SHARED_STATE_BACKEND!r}")
+    return settings.SHARED_STATE_BACKEND
@@ -0,0 +1,171 @@
+"""
+Group commit for single-asset creates and updates.
+
+With WRITE_BATCH_ENABLED, POST /assets and PUT /assets/{id} don't commit on their own: the
+write is queued and a flusher runs everything that arrived within WRITE_BATCH_MAX_DELAY_MS
+(or as soon as WRITE_BATCH_MAX_ROWS are waiting) in one transaction:
+  - the creates as one INSERT ... RETURNING executemany
+  - the updates in arrival order, each an UPDATE ... RETURNING
+then a single commit. Every caller gets its own row back once that commit is done, so a 201/200
+still means the write is durable. While a batch commits the next one fills up and goes right
+after it, so concurrent writers share one commit (and one SQLite write lock) instead of
+queueing for one each.
+
+If the batch transaction fails it is rolled back and its writes are retried one transaction
+each, so a bad write only fails its own request.
+
+Batching only helps with concurrent writers: a lone write waits up to WRITE_BATCH_MAX_DELAY_MS
+longer than it would without it.
+"""
+import asyncio
+import time
+from typing import Callable, List, Optional, Tuple
+
+from app.config import get_settings
+from app.cache import asset_cache
+from app.database import AsyncSessionLocal
+from app.models import Asset
+from app.routes.crud import AsyncAssetCRUD, async_asset_crud
+from app.schemas import AssetCreate, AssetUpdate
+
+settings = get_settings()
+
+# ("create", AssetCreate, None) or ("update", AssetUpdate, asset id)
+Write = Tuple[str, object, Optional[str]]
+
+
+class WriteBatcher:
+    """Queues single-row writes and commits them in groups, one flusher task at a time"""
+
+    def __init__(self, session_factory: Callable, crud: AsyncAssetCRUD, max_rows: int = 100, max_delay: float = 0.005, enabled: bool = True):
+        self.session_factory = session_factory
+        self.crud = crud
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.enabled = enabled
+        self._pending: List[Tuple[Write, asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._full: Optional[asyncio.Event] = None
+        self.batches = 0
+        self.writes = 0
+        self.retried_batches = 0
+        self.largest_batch = 0
+        self.commit_seconds = 0.0
+
+    async def create(self, db, asset_data: AssetCreate) -> Asset:
+        """Create an asset, through the next group commit when enabled (otherwise on db right away)"""
+        if not self.enabled:
+            return await self.crud.create(db, asset_data)
+        return await self._submit(("create", asset_data, None))
+
+    async def update(self, db, asset_id: str, asset_data: AssetUpdate) -> Optional[Asset]:
+        """Update an asset, through the next group commit when enabled (otherwise on db right away)"""
+        if not self.enabled:
+            return await self.crud.update(db, asset_id, asset_data)
+        return await self._submit(("update", asset_data, asset_id))
+
+    async def _submit(self, write: Write):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((write, future))
+        # a flusher left behind by a closed event loop (e.g. between test clients) never runs again
+        if self._flusher is None or self._flusher.done() or self._flusher.get_loop() is not loop:
+            self._full = asyncio.Event()
+            self._flusher = loop.create_task(self._run())
+        if len(self._pending) >= self.max_rows:
+            self._full.set()
+        return await future
+
+    async def _run(self) -> None:
+        # only the first batch waits for company, the next ones take whatever arrived while the previous one committed
+        idle = True
+        while self._pending:
+            if idle and len(self._pending) < self.max_rows:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            idle = False
+            self._full.clear()
+            batch, self._pending = self._pending[:self.max_rows], self._pending[self.max_rows:]
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[Write, asyncio.Future]]) -> None:
+        started = time.perf_counter()
+        try:
+            results = await self._commit([write for write, _ in batch])
+        except Exception:
+            # find the failing write(s): every write on its own
+            self.retried_batches += 1
+            for write, future in batch:
+                try:
+                    result = (await self._commit([write]))[0]
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+        else:
+            for (_, future), result in zip(batch, results):
+                # the caller may be gone (client disconnected), the write still happened
+                if not future.done():
+                    future.set_result(result)
+        self.batches += 1
+        self.writes += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.commit_seconds += time.perf_counter() - started
+
+    async def _commit(self, writes: List[Write]) -> list:
+        """Run writes in one transaction, returns their rows (None for an update of a missing asset)"""
+        creates = [data for kind, data, _ in writes if kind == "create"]
+        results = []
+        async with self.session_factory() as db:
+            try:
+                created = []
+                if creates:
+                    created = list((await db.execute(self.crud._insert_returning(), self.crud._bulk_rows(creates))).scalars())
+                created = iter(created)
+                for kind, data, asset_id in writes:
+                    if kind == "create":
+                        results.append(next(created))
+                        continue
+                    updated_data = self.crud._update_values(data)
+                    if not updated_data:
+                        results.append(await self.crud.get_by_id(db, asset_id))
+                        continue
+                    results.append((await db.execute(self.crud._update_returning(asset_id, updated_data))).scalar_one_or_none())
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+        if creates:
+            await asset_cache.invalidate_lists()
+        for (kind, _, asset_id), result in zip(writes, results):
+            if kind == "update" and result is not None:
+                await asset_cache.invalidate_asset(asset_id)
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "max_rows": self.max_rows,
+            "max_delay_ms": self.max_delay * 1000,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "writes": self.writes,
+            "avg_batch": round(self.writes / self.batches, 2) if self.batches else None,
+            "largest_batch": self.largest_batch,
+            "retried_batches": self.retried_batches,
+            "avg_commit_ms": round(self.commit_seconds / self.batches * 1000, 2) if self.batches else None,
+        }
+
+
+write_batcher = WriteBatcher(
+    AsyncSessionLocal,
+    async_asset_crud,
+    max_rows=settings.WRITE_BATCH_MAX_ROWS,
+    max_delay=settings.WRITE_BATCH_MAX_DELAY_MS / 1000,
+    enabled=settings.WRITE_BATCH_ENABLED,
+)
@@ -0,0 +1,119 @@
+"""
+Per-query overhead of building the agent on every request vs reusing one runtime.
+
+A stub OpenAI-compatible server answers every chat completion instantly with a final
+answer, so the numbers are pure client-side overhead:
+  per-request  AssetAgent() per query (new ChatOpenAI + HTTP client, tools, prompt, executor)
+  shared       one AssetAgent reused for every query (pooled keep-alive connection)
+  cached       the shared agent with the answer cache on (repeated question, no LLM call)
+
+    python benchmarks/agent_runtime.py --queries 200
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--queries", type=int, default=200)
+parser.add_argument("--port", type=int, default=8766)
+args = parser.parse_args()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ["OPEN_API_KEY"] = "stub"
+os.environ["AGENT_LLM_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+os.environ["AGENT_CACHE_ENABLED"] = "false"  # switched on for the last run only
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.agent import AssetAgent
+from app.agent_cache import agent_answer_cache
+from app.database import AsyncSessionLocal, async_engine, init_db
+
+stub_llm = FastAPI()
+
+
+ANSWER = "Thought: I now know the final answer\nFinal Answer: You have no assets."
+
+
+@stub_llm.post("/v1/chat/completions")
+def chat_completions(body: dict):
+    base = {"id": "stub", "created": int(time.time()), "model": body.get("model", "stub")}
+    if body.get("stream"):
+        # the ReAct executor streams, answer with a single SSE chunk
+        chunk = {**base, "object": "chat.completion.chunk", "choices": [
+            {"index": 0, "delta": {"role": "assistant", "content": ANSWER}, "finish_reason": "stop"}
+        ]}
+        return StreamingResponse(iter([f"data: {json.dumps(chunk)}\n\n", "data: [DONE]\n\n"]), media_type="text/event-stream")
+    return {**base, "object": "chat.completion", "choices": [
+        {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": ANSWER}}
+    ], "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}}
+
+
+def serve():
+    uvicorn.run(stub_llm, port=args.port, log_level="warning")
+
+
+def wait_for_server():
+    for _ in range(200):
+        try:
+            httpx.get(f"http://127.0.0.1:{args.port}/docs")
+            return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise RuntimeError("stub LLM did not start")
+
+
+async def measure(run_query) -> dict:
+    timings = []
+    for _ in range(args.queries):
+        started = time.perf_counter()
+        await run_query()
+        timings.append(time.perf_counter() - started)
+    return {
+        "mean ms": round(statistics.mean(timings) * 1000, 2),
+        "p50 ms": round(statistics.median(timings) * 1000, 2),
+    }
+
+
+async def run() -> None:
+    question = "What assets do I have?"
+    async with AsyncSessionLocal() as db:
+        shared_agent = AssetAgent()
+        await shared_agent.aquery(question, db)  # warm up imports and the connection
+
+        per_request = await measure(lambda: AssetAgent().aquery(question, db))
+        shared = await measure(lambda: shared_agent.aquery(question, db))
+        agent_answer_cache.enabled = True
+        cached = await measure(lambda: shared_agent.aquery(question, db))
+
+    print(f"queries={args.queries}")
+    print("per-request".ljust(12), per_request)
+    print("shared".ljust(12), shared)
+    print("cached".ljust(12), cached)
+    print("saved per query ms", round(per_request["mean ms"] - shared["mean ms"], 2))
+    await async_engine.dispose()
+
+
+def main():
+    init_db()
+    server = multiprocessing.Process(target=serve, daemon=True)
+    server.start()
+    wait_for_server()
+
+    asyncio.run(run())
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
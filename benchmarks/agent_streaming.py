@@ -0,0 +1,140 @@
+"""
+Async vs streaming agent queries with a slow LLM.
+
+A stub OpenAI-compatible server waits --llm-latency seconds before the first token and
+then streams the final answer word by word over another --llm-latency seconds. The API
+runs in one uvicorn worker and gets --concurrency simultaneous questions on:
+  async     POST /api/v1/agent/query (AssetAgent.aquery)
+  stream    POST /api/v1/agent/query/stream (SSE, time to first byte is the first answer token)
+The answer cache and rate limits are disabled and admission lets every question in, so all
+of them reach the LLM.
+
+    python benchmarks/agent_streaming.py --concurrency 200 --llm-latency 1
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--concurrency", type=int, default=200)
+parser.add_argument("--llm-latency", type=float, default=1.0)
+parser.add_argument("--port", type=int, default=8767)
+parser.add_argument("--llm-port", type=int, default=8768)
+args = parser.parse_args()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ["OPEN_API_KEY"] = "stub"
+os.environ["AGENT_LLM_BASE_URL"] = f"http://127.0.0.1:{args.llm_port}/v1"
+os.environ["AGENT_CACHE_ENABLED"] = "false"
+os.environ["AGENT_HTTP_MAX_CONNECTIONS"] = str(args.concurrency)
+os.environ["AGENT_MAX_IN_FLIGHT"] = str(args.concurrency)
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+ANSWER_WORDS = ("You have no assets yet, add some with POST /api/v1/assets and ask again. " * 2).split()
+
+stub_llm = FastAPI()
+
+
+@stub_llm.post("/v1/chat/completions")
+async def chat_completions(body: dict):
+    base = {"id": "stub", "created": int(time.time()), "model": "stub", "object": "chat.completion.chunk"}
+
+    async def chunks():
+        await asyncio.sleep(args.llm_latency)
+        for i, word in enumerate(["Thought: I now know the final answer\nFinal Answer:"] + ANSWER_WORDS):
+            delta = {"role": "assistant", "content": word if i == 0 else " " + word}
+            yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]})}\n\n"
+            await asyncio.sleep(args.llm_latency / len(ANSWER_WORDS))
+        yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+def serve_llm():
+    uvicorn.run(stub_llm, port=args.llm_port, log_level="warning", timeout_keep_alive=120)
+
+
+def serve_api():
+    from app.main import app
+
+    uvicorn.run(app, port=args.port, log_level="warning", timeout_keep_alive=120)
+
+
+def wait_for(port: int):
+    for _ in range(200):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs")
+            return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def drive(path: str) -> dict:
+    first_byte, total, errors = [], [], 0
+
+    async def one(http: httpx.AsyncClient, i: int):
+        nonlocal errors
+        started = time.perf_counter()
+        first = None
+        try:
+            async with http.stream("POST", path, json={"question": f"What assets do I have? #{i}"}) as response:
+                response.raise_for_status()
+                async for _ in response.aiter_raw():
+                    if first is None:
+                        first = time.perf_counter() - started
+        except httpx.HTTPError:
+            errors += 1
+            return
+        first_byte.append(first)
+        total.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=300) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(http, i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "wall s": round(elapsed, 2),
+        "ttfb p50 s": round(statistics.median(first_byte), 2) if first_byte else None,
+        "latency p50 s": round(statistics.median(total), 2) if total else None,
+        "latency max s": round(max(total), 2) if total else None,
+        "errors": errors,
+    }
+
+
+def main():
+    from app.database import init_db
+
+    init_db()
+    servers = [multiprocessing.Process(target=serve_llm, daemon=True), multiprocessing.Process(target=serve_api, daemon=True)]
+    for server in servers:
+        server.start()
+    wait_for(args.llm_port)
+    wait_for(args.port)
+
+    print(f"concurrency={args.concurrency} llm latency={args.llm_latency}s to first token + {args.llm_latency}s streaming")
+    for name, path in [("async", "/api/v1/agent/query"), ("stream", "/api/v1/agent/query/stream")]:
+        print(name.ljust(7), asyncio.run(drive(path)))
+
+    for server in servers:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
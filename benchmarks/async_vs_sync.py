@@ -0,0 +1,152 @@
+"""
+Sync vs async asset listing under concurrent load.
+
+Serves the same list query twice from one uvicorn process:
+  /sync/assets   def handler + SessionLocal running the same page statement (the old stack)
+  /async/assets  async def handler + AsyncSessionLocal + async_asset_crud
+from a separate uvicorn process, and reports req/s, p50 and p99 for each at the given concurrency.
+The response cache is disabled so every request reaches the database.
+
+    python benchmarks/async_vs_sync.py --rows 20000 --concurrency 100 --requests 3000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=20000)
+parser.add_argument("--concurrency", type=int, default=100)
+parser.add_argument("--requests", type=int, default=3000)
+parser.add_argument("--port", type=int, default=8765)
+args = parser.parse_args()
+
+db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+os.environ["CACHE_ENABLED"] = "false"
+
+import httpx
+import uvicorn
+from fastapi import Depends, FastAPI
+from sqlalchemy.orm import Session
+
+from app.database import engine, get_async_db, get_db, init_db
+from app.models import Asset
+from app.routes.crud import async_asset_crud
+
+CATEGORIES = ["electronics", "furniture", "vehicle", "jewelry", "other"]
+STATUSES = ["active", "sold", "donated"]
+
+
+def seed(rows: int) -> None:
+    init_db()
+    with engine.begin() as conn:
+        conn.execute(Asset.__table__.insert(), [
+            {
+                "id": f"{i:08d}-0000-0000-0000-000000000000",
+                "name": f"asset {i}",
+                "category": random.choice(CATEGORIES),
+                "status": random.choice(STATUSES),
+                "value": round(random.uniform(10, 10000), 2),
+                "purchase_date": date(2020, 1, 1) + timedelta(days=random.randint(0, 1800)),
+                "description": None,
+            }
+            for i in range(rows)
+        ])
+
+
+bench_app = FastAPI()
+
+
+def sync_page(db: Session, category: str = None) -> tuple:
+    """The statement AsyncAssetCRUD.get_page runs, executed on a sync Session"""
+    page_select, _, _ = async_asset_crud._page_statement(0, 50, "value", "desc", None, "exact", {"category": category})
+    rows = db.execute(page_select).all()
+    return [row.Asset for row in rows], rows[0].total if rows else 0
+
+
+@bench_app.get("/sync/assets")
+def sync_assets(category: str = None, db=Depends(get_db)):
+    # runs in the threadpool
+    assets, total = sync_page(db, category)
+    return {"total": total, "ids": [asset.id for asset in assets]}
+
+
+@bench_app.get("/async/assets")
+async def async_assets(category: str = None, db=Depends(get_async_db)):
+    assets, total, _ = await async_asset_crud.get_page(db, 0, 50, category=category, sort_by="value")
+    return {"total": total, "ids": [asset.id for asset in assets]}
+
+
+async def drive(path: str, concurrency: int, total_requests: int) -> dict:
+    latencies = []
+    errors = 0
+    queue = list(range(total_requests))
+
+    async def client(http: httpx.AsyncClient):
+        nonlocal errors
+        while queue:
+            queue.pop()
+            started = time.perf_counter()
+            try:
+                response = await http.get(path, params={"category": random.choice(CATEGORIES)})
+                response.raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "req/s": round(len(latencies) / elapsed, 1),
+        "p50 ms": round(statistics.median(latencies) * 1000, 2),
+        "p99 ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "errors": errors,
+    }
+
+
+def serve():
+    uvicorn.run(bench_app, port=args.port, log_level="warning", timeout_keep_alive=120)
+
+
+def wait_for_server():
+    for _ in range(200):
+        try:
+            httpx.get(f"http://127.0.0.1:{args.port}/docs")
+            return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise RuntimeError("benchmark server did not start")
+
+
+def main():
+    seed(args.rows)
+    # separate process so the load generator doesn't share the server's GIL
+    server = multiprocessing.Process(target=serve, daemon=True)
+    server.start()
+    wait_for_server()
+
+    print(f"rows={args.rows} concurrency={args.concurrency} requests={args.requests}")
+    for name, path in [("sync", "/sync/assets"), ("async", "/async/assets")]:
+        asyncio.run(drive(path, args.concurrency, min(200, args.requests)))  # warm up
+        print(name.ljust(6), asyncio.run(drive(path, args.concurrency, args.requests)))
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
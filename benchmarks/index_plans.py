@@ -0,0 +1,38 @@
+"""
+EXPLAIN QUERY PLAN checks for the asset list queries, on a bigger seeded database.
+
+The checks live in tests/test_index_plans.py; this runs them with --rows seeded assets and,
+with --analyze, against the plans SQLite picks after ANALYZE.
+
+    python benchmarks/index_plans.py --rows 20000
+
+Exits with pytest's status (1 and the offending plans when a check fails).
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=20000)
+parser.add_argument("--analyze", action="store_true", help="also check the plans after ANALYZE")
+args = parser.parse_args()
+
+
+def run(analyze: bool) -> int:
+    # a fresh interpreter per run, the tests configure and seed the app on import
+    env = dict(os.environ, INDEX_PLANS_ROWS=str(args.rows), INDEX_PLANS_ANALYZE=str(analyze).lower())
+    return subprocess.run([sys.executable, "-m", "pytest", "-q", "tests/test_index_plans.py"], cwd=ROOT, env=env).returncode
+
+
+def main():
+    failures = run(analyze=False)
+    if args.analyze:
+        failures = run(analyze=True) or failures
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
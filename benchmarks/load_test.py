@@ -0,0 +1,576 @@
+"""
+Load test for the CRUD and agent endpoints, with machine-readable results to compare runs.
+
+Seeds a SQLite database with --rows assets (10k, 1m, 10m ...) drawn from skewed distributions:
+most assets are electronics and furniture, most are active, values are log-normal per category
+(a vehicle is worth more than a chair), purchases cluster in the recent years, a few percent are
+soft deleted, and names/descriptions come from a small vocabulary so searches match. The same
+--rows and --seed always give the same data. Seeding 10m rows takes a while, so --db keeps the
+database between runs (it is re-seeded only when --rows/--seed change or with --reseed).
+
+The real app (app.main) then serves it from one uvicorn process, with the response cache and
+rate limits off so every request reaches the database, and a stub OpenAI-compatible server
+answers the agent's LLM calls (after --llm-latency seconds). Every scenario runs --requests
+requests at each --concurrency level:
+  list:<filter>:<sort>:<order>  GET /assets, every filter (none, category, status, category+status,
+                                value range, purchase date range, category+value) with every sort
+  page:offset / page:cursor     a page halfway to nine tenths into the table, by skip and by cursor
+  search:*                      full text search: a word, a prefix, relevance order, with a category
+  get_asset                     GET /assets/{id} of random seeded assets
+  write:create / write:update   POST /assets, then PUT /assets/{id} on the assets it created
+  write:bulk                    POST /assets/bulk with --bulk-rows NDJSON rows (--bulk-requests times)
+  agent:fast-path / agent:llm   POST /agent/query, answered by the router / by the stubbed LLM
+Writes come last and everything they added is deleted at the end, so the database stays as seeded.
+
+Reported per scenario and level: req/s, p50/p95/p99 latency, errors, and the time the server spent
+in the database per request (mean and p95 ms, queries per request), measured with SQLAlchemy
+cursor events for the run (sent back as X-DB-Time-Ms / X-DB-Queries). Writes made by the group
+commit batcher (WRITE_BATCH_ENABLED) run outside the request and are not in its DB time.
+The load generator shares the machine with the server, compare runs made on the same host.
+
+--json PATH writes the results with the run's settings, git commit and versions (- for stdout),
+--compare BASELINE.json reports the change against an earlier --json file and exits 1 when a
+scenario lost more than --max-regression of its req/s or its p95 grew by more than that.
+
+    python benchmarks/load_test.py --rows 10k --concurrency 1,16,64
+    python benchmarks/load_test.py --rows 1m --db /var/tmp/assets-1m.db --json runs/base.json
+    python benchmarks/load_test.py --rows 1m --db /var/tmp/assets-1m.db --compare runs/base.json
+    python benchmarks/load_test.py --rows 10k --scenarios list:category,get_asset,agent
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+
+def row_count(value: str) -> int:
+    """10000, 10k, 1m, 10M"""
+    units = {"k": 1_000, "m": 1_000_000}
+    value = value.strip().lower().replace("_", "")
+    if value[-1:] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=row_count, default=row_count("10k"), help="seeded assets: 10k, 1m, 10m ...")
+parser.add_argument("--seed", type=int, default=1, help="random seed of the data and the requests")
+parser.add_argument("--db", help="SQLite file to seed once and reuse (default: a throwaway file)")
+parser.add_argument("--reseed", action="store_true", help="seed --db again even if it matches --rows/--seed")
+parser.add_argument("--concurrency", default="1,16,64", help="comma separated client counts")
+parser.add_argument("--requests", type=int, default=200, help="requests per scenario and level")
+parser.add_argument("--warmup", type=int, default=20, help="unrecorded requests before every scenario")
+parser.add_argument("--page-size", type=int, default=50)
+parser.add_argument("--bulk-rows", type=int, default=1000, help="rows per write:bulk request")
+parser.add_argument("--bulk-requests", type=int, default=20, help="write:bulk requests per level")
+parser.add_argument("--scenarios", help="comma separated scenario name prefixes to run (default: all)")
+parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the stub LLM takes per call")
+parser.add_argument("--json", dest="json_path", help="write the results as JSON to this file (- for stdout)")
+parser.add_argument("--compare", help="results JSON of an earlier run to compare with")
+parser.add_argument("--max-regression", type=float, default=0.2, help="allowed req/s loss / p95 growth, as a fraction")
+parser.add_argument("--min-delta-ms", type=float, default=2.0, help="p95 changes below this are never a regression")
+parser.add_argument("--port", type=int, default=8770)
+parser.add_argument("--llm-port", type=int, default=8771)
+args = parser.parse_args()
+
+LEVELS = [int(level) for level in args.concurrency.split(",")]
+# with --json - stdout is the JSON only
+report = sys.stderr if args.json_path == "-" else sys.stdout
+
+db_path = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+os.environ["DB_MIGRATE_ON_STARTUP"] = "false"
+os.environ["CACHE_ENABLED"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["OPEN_API_KEY"] = "stub"
+os.environ["AGENT_LLM_BASE_URL"] = f"http://127.0.0.1:{args.llm_port}/v1"
+os.environ["AGENT_CACHE_ENABLED"] = "false"
+os.environ["AGENT_HTTP_MAX_CONNECTIONS"] = str(max(LEVELS))
+os.environ["AGENT_MAX_IN_FLIGHT"] = str(max(LEVELS))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import event, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
+
+from app.database import SessionLocal, engine
+from app.migrate import SCHEMA_VERSION, current_version, migrate
+from app.models import Asset
+from app.pagination import encode_cursor
+from app.search import rebuild_search_index
+
+BASE = "/api/v1"
+
+# share of the assets per category / status
+CATEGORIES = {"electronics": 0.40, "furniture": 0.25, "other": 0.15, "vehicle": 0.12, "jewelry": 0.08}
+STATUSES = {"active": 0.80, "sold": 0.14, "donated": 0.06}
+# median value and log-normal sigma per category
+VALUES = {"electronics": (600, 1.0), "furniture": (350, 0.9), "other": (80, 1.2), "vehicle": (18000, 0.7), "jewelry": (1500, 1.3)}
+NOUNS = {
+    "electronics": ["laptop", "monitor", "phone", "camera", "tablet", "headphones", "router", "printer", "console", "speaker"],
+    "furniture": ["desk", "chair", "sofa", "bookshelf", "wardrobe", "table", "bed", "cabinet", "lamp", "dresser"],
+    "other": ["bicycle", "guitar", "tent", "drill", "painting", "rug", "piano", "telescope", "kayak", "grill"],
+    "vehicle": ["sedan", "hatchback", "pickup", "motorcycle", "scooter", "van", "coupe", "trailer", "suv", "boat"],
+    "jewelry": ["ring", "necklace", "bracelet", "watch", "earrings", "pendant", "brooch", "cufflinks", "anklet", "tiara"],
+}
+BRANDS = ["acme", "globex", "initech", "umbrella", "stark", "wayne", "hooli", "vandelay", "soylent", "tyrell"]
+WORDS = (
+    "vintage used refurbished new gift inherited spare office home travel work kitchen garage "
+    "black white silver gold steel oak leather wireless portable compact premium limited edition "
+    "warranty receipt insured repaired scratched mint boxed original imported handmade"
+).split()
+DELETED_SHARE = 0.03
+DESCRIBED_SHARE = 0.6
+HISTORY_DAYS = 3650
+# one purchase every ~2 years into the past on average, most assets are recent
+PURCHASE_AGE_DAYS = 700
+SEED_CHUNK = 50_000
+
+INSERT = (
+    "INSERT INTO assets (id, name, category, value, purchase_date, status, created_at, description, "
+    "updated_at, is_deleted, deleted_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SEED_INFO = "load_test_seed"
+SQLITE_DATETIME = "%Y-%m-%d %H:%M:%S.%f"  # how SQLAlchemy stores DateTime on SQLite
+
+
+def weighted(rng: random.Random, shares: dict) -> str:
+    return rng.choices(list(shares), weights=list(shares.values()))[0]
+
+
+def seed_rows(rng: random.Random, count: int, now: datetime) -> list:
+    rows = []
+    for _ in range(count):
+        category = weighted(rng, CATEGORIES)
+        median, sigma = VALUES[category]
+        noun = rng.choice(NOUNS[category])
+        brand = rng.choice(BRANDS)
+        purchased = now.date() - timedelta(days=min(int(rng.expovariate(1 / PURCHASE_AGE_DAYS)), HISTORY_DAYS))
+        # entered some days after the purchase, a third edited since
+        created = min(datetime.combine(purchased, datetime.min.time()) + timedelta(seconds=rng.randint(0, 30 * 86400)), now)
+        updated = created + (now - created) * rng.random() if rng.random() < 0.33 else created
+        deleted = rng.random() < DELETED_SHARE
+        description = None
+        if rng.random() < DESCRIBED_SHARE:
+            description = " ".join([noun] + rng.sample(WORDS, rng.randint(5, 12)))
+        rows.append((
+            str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            f"{brand.title()} {noun} {rng.choice('ABCDEFGHKMXZ')}{rng.randint(10, 999)}",
+            category,
+            round(max(1.0, rng.lognormvariate(math.log(median), sigma)), 2),
+            purchased.isoformat(),
+            weighted(rng, STATUSES),
+            created.strftime(SQLITE_DATETIME),
+            description,
+            updated.strftime(SQLITE_DATETIME),
+            1 if deleted else 0,
+            updated.strftime(SQLITE_DATETIME) if deleted else None,
+        ))
+    return rows
+
+
+def seeded_with() -> tuple:
+    """(rows, seed) the database was seeded with, None when it wasn't seeded by this script"""
+    if not os.path.exists(db_path) or current_version() != SCHEMA_VERSION:
+        return None
+    with engine.connect() as conn:
+        if not conn.exec_driver_sql(f"SELECT 1 FROM sqlite_master WHERE name = '{SEED_INFO}'").first():
+            return None
+        return tuple(conn.exec_driver_sql(f"SELECT rows, seed FROM {SEED_INFO}").first() or ())
+
+
+def seed() -> None:
+    if not args.reseed and seeded_with() == (args.rows, args.seed):
+        print(f"reusing {db_path} ({args.rows} rows, seed {args.seed})", file=sys.stderr)
+        return
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    started = time.perf_counter()
+    rng = random.Random(args.seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    # bare table first: indexes, FTS and rollups are built once over the loaded rows, not row by row
+    with engine.begin() as conn:
+        conn.execute(CreateTable(Asset.__table__))
+    for done in range(0, args.rows, SEED_CHUNK):
+        rows = seed_rows(rng, min(SEED_CHUNK, args.rows - done), now)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(INSERT, rows)
+        if args.rows > SEED_CHUNK:
+            print(f"\rseeding {done + len(rows)}/{args.rows}", end="", file=sys.stderr)
+    print(f"\rindexing {args.rows} rows" + " " * 20, file=sys.stderr)
+    migrate()
+    rebuild_search_index(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"CREATE TABLE {SEED_INFO} (rows INTEGER NOT NULL, seed INTEGER NOT NULL)")
+        conn.exec_driver_sql(f"INSERT INTO {SEED_INFO} VALUES (?, ?)", (args.rows, args.seed))
+    print(f"seeded {args.rows} rows in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+def sample(count: int) -> dict:
+    """Seeded ids, search terms and cursors the scenarios draw from"""
+    rng = random.Random(args.seed)
+    with SessionLocal() as db:
+        live = db.execute(text("SELECT count(*) FROM assets WHERE is_deleted = 0")).scalar()
+        # rowids are dense after seeding, so random rowids are random assets without ORDER BY random()
+        rowids = [rng.randint(1, args.rows) for _ in range(count)]
+        ids = list(db.execute(text(f"SELECT id FROM assets WHERE rowid IN ({','.join(map(str, rowids))}) AND is_deleted = 0")).scalars())
+        depths = sorted(rng.randint(live // 2, live * 9 // 10) for _ in range(10))
+        cursors = []
+        for depth in depths:
+            asset = db.execute(
+                select(Asset).where(Asset.is_deleted == False)  # noqa: E712
+                .order_by(Asset.created_at.desc(), Asset.id.desc()).offset(depth - 1).limit(1)
+            ).scalar_one()
+            cursors.append(encode_cursor(asset, "created_at", "desc"))
+    return {"live": live, "ids": ids, "depths": depths, "cursors": cursors}
+
+
+# ---- server: the app with per-request DB time, and the stub LLM
+
+request_db_time: ContextVar = ContextVar("request_db_time", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if request_db_time.get() is not None:
+        conn.info.setdefault("load_test_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = request_db_time.get()
+    started = conn.info.get("load_test_started")
+    if timing is not None and started:
+        timing[0] += (time.perf_counter() - started.pop()) * 1000
+        timing[1] += 1
+
+
+def serve_api():
+    # the startup banner would end up in the --json - output
+    sys.stdout = sys.stderr
+    from app.main import app
+
+    @app.middleware("http")
+    async def db_time(request: Request, call_next):
+        # [ms, queries], one list shared with the threads and tasks handling the request
+        timing = [0.0, 0]
+        token = request_db_time.set(timing)
+        try:
+            response = await call_next(request)
+        finally:
+            request_db_time.reset(token)
+        response.headers["X-DB-Time-Ms"] = f"{timing[0]:.3f}"
+        response.headers["X-DB-Queries"] = str(timing[1])
+        return response
+
+    uvicorn.run(app, port=args.port, log_level="warning", timeout_keep_alive=120)
+
+
+ANSWER = "Thought: I now know the final answer\nFinal Answer: Your portfolio is mostly electronics and furniture."
+
+stub_llm = FastAPI()
+
+
+@stub_llm.post("/v1/chat/completions")
+async def chat_completions(body: dict):
+    await asyncio.sleep(args.llm_latency)
+    base = {"id": "stub", "created": int(time.time()), "model": body.get("model", "stub")}
+    if body.get("stream"):
+        chunk = {**base, "object": "chat.completion.chunk", "choices": [
+            {"index": 0, "delta": {"role": "assistant", "content": ANSWER}, "finish_reason": "stop"}
+        ]}
+        return StreamingResponse(iter([f"data: {json.dumps(chunk)}\n\n", "data: [DONE]\n\n"]), media_type="text/event-stream")
+    return {**base, "object": "chat.completion", "choices": [
+        {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": ANSWER}}
+    ], "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}}
+
+
+def serve_llm():
+    uvicorn.run(stub_llm, port=args.llm_port, log_level="warning", timeout_keep_alive=120)
+
+
+def wait_for(port: int):
+    for _ in range(400):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs")
+            return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+# ---- scenarios: name -> function(rng) returning (method, path, httpx keyword arguments)
+
+FILTERS = {
+    "none": lambda rng: {},
+    "category": lambda rng: {"category": weighted(rng, CATEGORIES)},
+    "status": lambda rng: {"status": weighted(rng, STATUSES)},
+    "category+status": lambda rng: {"category": weighted(rng, CATEGORIES), "status": weighted(rng, STATUSES)},
+    "value": lambda rng: dict(zip(("min_value", "max_value"), sorted(rng.sample([10, 100, 500, 1000, 5000, 20000], 2)))),
+    "date": lambda rng: purchase_year(rng),
+    "category+value": lambda rng: {"category": weighted(rng, CATEGORIES), "min_value": rng.choice([100, 500, 1000])},
+}
+SORTS = ["name", "value", "purchase_date", "created_at", "updated_at"]
+
+
+def purchase_year(rng: random.Random) -> dict:
+    year = date.today().year - min(int(rng.expovariate(365 / PURCHASE_AGE_DAYS)), HISTORY_DAYS // 365)
+    return {"purchase_date_from": f"{year}-01-01T00:00:00", "purchase_date_to": f"{year}-12-31T23:59:59"}
+
+
+def new_asset(rng: random.Random) -> dict:
+    category = weighted(rng, CATEGORIES)
+    return {
+        "name": f"loadtest {rng.choice(NOUNS[category])}",
+        "category": category,
+        "status": "active",
+        "value": round(rng.lognormvariate(math.log(VALUES[category][0]), VALUES[category][1]), 2) + 1,
+        "purchase_date": (date.today() - timedelta(days=rng.randint(0, 365))).isoformat(),
+        "description": " ".join(rng.sample(WORDS, 6)),
+    }
+
+
+def scenarios(samples: dict, created: list) -> list:
+    """[(name, request maker, requests per level)], writes last"""
+    page = {"limit": args.page_size}
+    found = []
+    for name, make_filter in FILTERS.items():
+        for sort_by in SORTS:
+            for order in ("desc", "asc"):
+                found.append((f"list:{name}:{sort_by}:{order}", lambda rng, f=make_filter, s=sort_by, o=order: (
+                    "GET", f"{BASE}/assets", {"params": {**page, **f(rng), "sort_by": s, "order": o}}
+                )))
+
+    found += [
+        ("page:offset", lambda rng: ("GET", f"{BASE}/assets", {"params": {**page, "skip": rng.choice(samples["depths"]), "total": "none"}})),
+        ("page:cursor", lambda rng: ("GET", f"{BASE}/assets", {"params": {**page, "cursor": rng.choice(samples["cursors"]), "total": "none"}})),
+        ("search:word", lambda rng: ("GET", f"{BASE}/assets", {"params": {**page, "search": rng.choice(BRANDS + WORDS)}})),
+        ("search:prefix", lambda rng: ("GET", f"{BASE}/assets", {"params": {**page, "search": rng.choice(WORDS)[:3]}})),
+        ("search:relevance", lambda rng: ("GET", f"{BASE}/assets", {"params": {
+            **page, "search": f"{rng.choice(BRANDS)} {rng.choice(WORDS)}", "sort_by": "relevance"}})),
+        ("search:category", lambda rng: ("GET", f"{BASE}/assets", {"params": {
+            **page, "search": rng.choice(WORDS), "category": weighted(rng, CATEGORIES)}})),
+        ("get_asset", lambda rng: ("GET", f"{BASE}/assets/{rng.choice(samples['ids'])}", {})),
+        ("agent:fast-path", lambda rng: ("POST", f"{BASE}/agent/query", {"json": {"question": rng.choice([
+            f"how many {weighted(rng, STATUSES)} assets",
+            f"total value of {weighted(rng, CATEGORIES)}",
+            f"average value of my {weighted(rng, CATEGORIES)}",
+            f"most valuable {weighted(rng, CATEGORIES)}",
+        ])}})),
+        ("agent:llm", lambda rng: ("POST", f"{BASE}/agent/query", {"json": {
+            "question": f"Which of my {rng.choice(BRANDS)} things should I insure first? #{rng.getrandbits(32)}"}})),
+        ("write:create", lambda rng: ("POST", f"{BASE}/assets", {"json": new_asset(rng)})),
+        ("write:update", lambda rng: ("PUT", f"{BASE}/assets/{rng.choice(created)}", {"json": {
+            "value": round(rng.uniform(10, 10000), 2), "status": weighted(rng, STATUSES)}})),
+        ("write:bulk", lambda rng: ("POST", f"{BASE}/assets/bulk", {
+            "content": "\n".join(json.dumps(new_asset(rng)) for _ in range(args.bulk_rows)),
+            "headers": {"Content-Type": "application/x-ndjson"}})),
+    ]
+    selected = [prefix for prefix in (args.scenarios or "").split(",") if prefix]
+    return [
+        (name, make, args.bulk_requests if name == "write:bulk" else args.requests)
+        for name, make in found if not selected or any(name.startswith(prefix) for prefix in selected)
+    ]
+
+
+# ---- load generation
+
+def percentile(values: list, p: float) -> float:
+    """Nearest rank percentile of sorted values"""
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)] if values else None
+
+
+async def drive(name: str, make, requests: int, concurrency: int, created: list) -> dict:
+    rng = random.Random(f"{args.seed}:{name}:{concurrency}")
+    # built up front so making the request bodies isn't timed
+    calls = [make(rng) for _ in range(requests)]
+    latencies, db_ms, db_queries = [], [], []
+    errors = 0
+
+    async def client(http: httpx.AsyncClient):
+        nonlocal errors
+        while calls:
+            method, path, kwargs = calls.pop()
+            started = time.perf_counter()
+            try:
+                response = await http.request(method, path, **kwargs)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                errors += 1
+                continue
+            latencies.append(elapsed)
+            db_ms.append(float(response.headers.get("X-DB-Time-Ms", 0)))
+            db_queries.append(int(response.headers.get("X-DB-Queries", 0)))
+            if name == "write:create":
+                created.append(response.json()["id"])
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=600) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    db_ms.sort()
+    ms = lambda seconds: round(seconds * 1000, 2) if seconds is not None else None  # noqa: E731
+    result = {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "req/s": round(len(latencies) / elapsed, 1),
+        "p50 ms": ms(percentile(latencies, 50)),
+        "p95 ms": ms(percentile(latencies, 95)),
+        "p99 ms": ms(percentile(latencies, 99)),
+        "db mean ms": round(statistics.mean(db_ms), 2) if db_ms else None,
+        "db p95 ms": round(percentile(db_ms, 95), 2) if db_ms else None,
+        "db queries": round(statistics.mean(db_queries), 1) if db_queries else None,
+    }
+    if name == "write:bulk":
+        result["rows/s"] = round(len(latencies) * args.bulk_rows / elapsed, 1)
+    return result
+
+
+def run_info() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "started": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "commit": commit,
+        "rows": args.rows,
+        "seed": args.seed,
+        "concurrency": LEVELS,
+        "requests": args.requests,
+        "page size": args.page_size,
+        "bulk rows": args.bulk_rows,
+        "llm latency s": args.llm_latency,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: list, baseline_path: str) -> list:
+    """Print the change against the baseline run, returns the regressions"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline["run"]["rows"] != args.rows:
+        print(f"note: baseline was seeded with {baseline['run']['rows']} rows, this run {args.rows}", file=report)
+    before = {(result["scenario"], result["concurrency"]): result for result in baseline["results"]}
+
+    regressions = []
+    print(f"\nchange against {baseline_path} (commit {baseline['run'].get('commit')})", file=report)
+    for result in results:
+        old = before.get((result["scenario"], result["concurrency"]))
+        if not old or not old["req/s"] or old["p95 ms"] is None or result["p95 ms"] is None:
+            continue
+        throughput = result["req/s"] / old["req/s"] - 1
+        p95 = result["p95 ms"] / old["p95 ms"] - 1 if old["p95 ms"] else 0
+        slower = (
+            throughput < -args.max_regression
+            or (p95 > args.max_regression and result["p95 ms"] - old["p95 ms"] > args.min_delta_ms)
+        )
+        label = f"{result['scenario']} c={result['concurrency']}"
+        print(f"  {label:<42} req/s {throughput:+7.1%}  p95 {p95:+7.1%}{'  REGRESSION' if slower else ''}", file=report)
+        if slower:
+            regressions.append(f"{label}: req/s {old['req/s']} -> {result['req/s']}, p95 {old['p95 ms']} -> {result['p95 ms']} ms")
+    return regressions
+
+
+def cleanup(started: datetime) -> int:
+    """Delete what the write scenarios added (their updates only touched those rows)"""
+    with engine.begin() as conn:
+        return conn.execute(
+            text("DELETE FROM assets WHERE is_deleted = 0 AND created_at >= :started"),
+            {"started": started.strftime(SQLITE_DATETIME)},
+        ).rowcount
+
+
+def main():
+    seed()
+    samples = sample(1000)
+    created = []
+    selected = scenarios(samples, created)
+
+    servers = [multiprocessing.Process(target=serve_llm, daemon=True), multiprocessing.Process(target=serve_api, daemon=True)]
+    for server in servers:
+        server.start()
+    wait_for(args.llm_port)
+    wait_for(args.port)
+
+    run = run_info()
+    started = datetime.utcnow()
+    results = []
+    print(f"rows={args.rows} live={samples['live']} concurrency={args.concurrency} requests={args.requests} page size={args.page_size}", file=report)
+    print(f"{'scenario':<36} {'c':>4} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'db ms':>8} {'db p95':>8} {'queries':>7} {'errors':>6}", file=report)
+    try:
+        for name, make, requests in selected:
+            if name == "write:update" and not created:
+                print(f"{name:<36} skipped: needs write:create", file=report)
+                continue
+            if args.warmup:
+                asyncio.run(drive(name, make, min(args.warmup, requests), LEVELS[0], []))
+            for concurrency in LEVELS:
+                result = asyncio.run(drive(name, make, requests, concurrency, created))
+                results.append(result)
+                print(
+                    f"{name:<36} {concurrency:>4} {result['req/s']:>9} {result['p50 ms']!s:>9} {result['p95 ms']!s:>9} "
+                    f"{result['p99 ms']!s:>9} {result['db mean ms']!s:>8} {result['db p95 ms']!s:>8} "
+                    f"{result['db queries']!s:>7} {result['errors']:>6}"
+                    + (f"  rows/s={result['rows/s']}" if "rows/s" in result else ""),
+                    file=report,
+                )
+    finally:
+        for server in servers:
+            server.terminate()
+            server.join()
+        removed = cleanup(started)
+        if removed:
+            print(f"removed {removed} assets written by the run", file=sys.stderr)
+
+    failures = [f"{r['scenario']} c={r['concurrency']}: {r['errors']} errors" for r in results if r["errors"]]
+    if args.compare:
+        failures += compare(results, args.compare)
+
+    if args.json_path:
+        output = json.dumps({"run": run, "results": results, "failures": failures}, indent=2)
+        if args.json_path == "-":
+            print(output)
+        else:
+            with open(args.json_path, "w") as f:
+                f.write(output + "\n")
+    for failure in failures:
+        print(f"FAIL {failure}", file=report)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+N uvicorn workers against one database: stale reads and rate limits per shared-state backend.
+
+Runs the checks of tests/test_multi_worker.py with more rounds and workers, for every --backends
+entry. The memory backend is the per-process baseline (stale reads and N x burst expected), the
+shared backends must have no stale read, let at most burst + 1 requests through and share agent
+sessions, or the script exits with status 1.
+
+    python benchmarks/multi_worker.py --workers 4 --backends memory,sqlite
+    python benchmarks/multi_worker.py --workers 4 --backends redis --redis-url redis://localhost:6379/15
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--workers", type=int, default=4)
+parser.add_argument("--backends", default="memory,sqlite", help="comma separated: memory, sqlite, redis")
+parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+parser.add_argument("--rounds", type=int, default=20, help="write/read-back rounds")
+parser.add_argument("--reads", type=int, default=12, help="reads after every write")
+parser.add_argument("--burst", type=int, default=20)
+parser.add_argument("--port", type=int, default=8767)
+args = parser.parse_args()
+
+from tests.test_multi_worker import problems, run
+
+
+def main():
+    failures = []
+    print(f"workers={args.workers} rounds={args.rounds} reads/write={args.reads} burst={args.burst}")
+    for backend in args.backends.split(","):
+        result = run(backend, args.workers, args.rounds, args.reads, args.burst, args.port, args.redis_url)
+        print(f"{backend:<7} workers seen={result['workers']} {result['stale reads']} rate limit={result['rate limit']} agent sessions={result['sessions']}")
+        if backend != "memory":
+            failures += [f"{backend}: {problem}" for problem in problems(result, args.burst)]
+        if result["workers"] < 2:
+            print(f"  note: only {result['workers']} worker answered, the reads didn't spread")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
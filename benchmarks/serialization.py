@@ -0,0 +1,116 @@
+"""
+Rows/sec serialized for a get_assets page, schema path vs fast path.
+
+Builds the same --page-size row AssetListResponse body --repeat times with:
+  jsonable_encoder  Asset objects -> AssetListResponse -> jsonable_encoder -> json.dumps (FastAPI's response_model default)
+  schema            Asset objects -> AssetListResponse.model_dump_json (FAST_SERIALIZATION_ENABLED=false)
+  fast              RESPONSE_COLUMNS rows -> orjson (FAST_SERIALIZATION_ENABLED=true)
+"serialize" times the encoding of an already fetched page, "query+serialize" includes the
+SELECT and building Asset objects / rows, which is what build() in get_assets does.
+
+    python benchmarks/serialization.py --rows 20000 --page-size 1000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=20000)
+parser.add_argument("--page-size", type=int, default=1000)
+parser.add_argument("--repeat", type=int, default=20)
+args = parser.parse_args()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from fastapi.encoders import jsonable_encoder
+
+from app.database import AsyncSessionLocal, async_engine, engine, init_db
+from app.models import Asset
+from app.routes.crud import async_asset_crud
+from app.schemas import AssetListResponse
+from app.serialization import asset_list_json
+
+CATEGORIES = ["electronics", "furniture", "vehicle", "jewelry", "other"]
+STATUSES = ["active", "sold", "donated"]
+
+
+def seed(rows: int) -> None:
+    init_db()
+    with engine.begin() as conn:
+        conn.execute(Asset.__table__.insert(), [
+            {
+                "name": f"asset {i}",
+                "category": random.choice(CATEGORIES),
+                "status": random.choice(STATUSES),
+                "value": round(random.uniform(10, 10000), 2),
+                "purchase_date": date(2020, 1, 1) + timedelta(days=random.randint(0, 1800)),
+                "description": f"description of asset {i}" if i % 2 else None,
+            }
+            for i in range(rows)
+        ])
+
+
+def jsonable_body(assets, total) -> bytes:
+    return json.dumps(jsonable_encoder(AssetListResponse(total=total, assets=assets))).encode()
+
+
+def schema_body(assets, total) -> bytes:
+    return AssetListResponse(total=total, assets=assets).model_dump_json().encode()
+
+
+def fast_body(rows, total) -> bytes:
+    return asset_list_json(rows, total, False, None)
+
+
+async def fetch(as_rows: bool):
+    async with AsyncSessionLocal() as db:
+        page, total, _ = await async_asset_crud.get_page(db, 0, args.page_size, sort_by="value", as_rows=as_rows)
+        return page, total
+
+
+async def run(encode, as_rows: bool) -> dict:
+    page, total = await fetch(as_rows)
+    body = encode(page, total)
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        encode(page, total)
+    serialize = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        encode(*(await fetch(as_rows)))
+    end_to_end = time.perf_counter() - started
+
+    rows = args.repeat * len(page)
+    return {
+        "serialize rows/s": round(rows / serialize),
+        "query+serialize rows/s": round(rows / end_to_end),
+        "body bytes": len(body),
+    }, body
+
+
+async def main():
+    seed(args.rows)
+    print(f"rows={args.rows} page size={args.page_size} repeat={args.repeat}")
+    bodies = {}
+    for name, encode, as_rows in [("jsonable_encoder", jsonable_body, False), ("schema", schema_body, False), ("fast", fast_body, True)]:
+        result, bodies[name] = await run(encode, as_rows)
+        print(name.ljust(17), result)
+    # same response either way (jsonable_encoder + json.dumps only differs in whitespace)
+    assert bodies["schema"] == bodies["fast"]
+    assert json.loads(bodies["jsonable_encoder"]) == json.loads(bodies["fast"])
+    # pooled aiosqlite connections keep their worker threads (and the interpreter) alive otherwise
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
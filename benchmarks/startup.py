@@ -0,0 +1,161 @@
+"""
+Import time per module and time to a started API, each measured in a fresh interpreter.
+
+  imports   python -X importtime -c "import <module>" for every module of MODULES, the median
+            cumulative import time of --repeat runs. For app.main also the app.* modules and
+            the heaviest third-party packages it pulls in.
+  startup   import app.main + the startup handlers (schema check, optional agent preload):
+              lazy agent     the defaults, LangChain is imported on the first /agent query
+              preload agent  AGENT_PRELOAD=true, the agent is built before serving (the old startup)
+              migrate        lazy agent on an empty database, startup runs the migration
+              no migrate     schema already stamped, startup only checks the version
+
+For CI: --json prints the results as JSON, --max-import-ms / --max-startup-ms fail the run
+(exit 1) when app.main imports or the default startup take longer.
+
+    python benchmarks/startup.py --repeat 5
+    python benchmarks/startup.py --repeat 5 --json --max-import-ms 1500
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--repeat", type=int, default=5)
+parser.add_argument("--top", type=int, default=10, help="third-party packages listed for app.main")
+parser.add_argument("--json", action="store_true", help="print the results as JSON")
+parser.add_argument("--max-import-ms", type=float, help="fail when importing app.main takes longer")
+parser.add_argument("--max-startup-ms", type=float, help="fail when the default startup takes longer")
+args = parser.parse_args()
+
+MODULES = ["app.config", "app.database", "app.routes.crud", "app.cache", "app.agent_metrics", "app.main", "app.agent"]
+
+# import time:   self [us] | cumulative | imported package
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+STARTUP = """
+import asyncio, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+asyncio.run(app.main.app.router.startup())
+print(round((imported - started) * 1000, 1), round((time.perf_counter() - started) * 1000, 1), "langchain_core" in sys.modules)
+"""
+
+
+def env(**overrides) -> dict:
+    values = dict(os.environ)
+    values.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+        "OPEN_API_KEY": "stub",
+        "PYTHONDONTWRITEBYTECODE": "",
+    })
+    values.update(overrides)
+    return values
+
+
+def import_times(module: str) -> dict:
+    """{module name: (self ms, cumulative ms, nesting depth)} of one fresh `import module`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", f"import {module}"],
+        cwd=ROOT, env=env(), capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            times[name] = (int(own) / 1000, int(cumulative) / 1000, len(indent) // 2)
+    return times
+
+
+def median_ms(values: list) -> float:
+    return round(statistics.median(values), 1)
+
+
+def measure_imports() -> dict:
+    results = {}
+    for module in MODULES:
+        runs = [import_times(module) for _ in range(args.repeat)]
+        results[module] = median_ms([run[module][1] for run in runs])
+        if module == "app.main":
+            breakdown = {
+                name: median_ms([run[name][1] for run in runs if name in run])
+                for name in runs[0] if name.startswith("app.")
+            }
+            # top-level third-party packages, by what they add to importing app.main
+            packages = {
+                name: median_ms([run[name][1] for run in runs if name in run])
+                for name, (_, _, depth) in runs[0].items() if "." not in name and not name.startswith("_") and name != "app"
+            }
+            results["app.main modules"] = dict(sorted(breakdown.items(), key=lambda item: -item[1]))
+            results["app.main packages"] = dict(sorted(packages.items(), key=lambda item: -item[1])[:args.top])
+    return results
+
+
+def startup(database_url: str = None, **overrides) -> dict:
+    """Median import / startup ms of --repeat fresh processes"""
+    imported, started, langchain = [], [], False
+    for _ in range(args.repeat):
+        values = env(**overrides)
+        if database_url:
+            values["DATABASE_URL"] = database_url
+        output = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", STARTUP], cwd=ROOT, env=values, capture_output=True, text=True, check=True,
+        ).stdout.split()
+        # the startup handler prints its banner first
+        imported.append(float(output[-3]))
+        started.append(float(output[-2]))
+        langchain = output[-1] == "True"
+    return {"import ms": median_ms(imported), "startup ms": median_ms(started), "langchain loaded": langchain}
+
+
+def measure_startup() -> dict:
+    migrated = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'migrated.db')}"
+    subprocess.run([sys.executable, "-W", "ignore", "-m", "app.migrate"], cwd=ROOT, env=env(DATABASE_URL=migrated), capture_output=True, check=True)
+    return {
+        "lazy agent": startup(migrated),
+        "preload agent": startup(migrated, AGENT_PRELOAD="true"),
+        "migrate": startup(),
+        "no migrate": startup(migrated, DB_MIGRATE_ON_STARTUP="false"),
+    }
+
+
+def main():
+    results = {"imports": measure_imports(), "startup": measure_startup()}
+
+    failures = []
+    if args.max_import_ms is not None and results["imports"]["app.main"] > args.max_import_ms:
+        failures.append(f"import app.main took {results['imports']['app.main']}ms > {args.max_import_ms}ms")
+    if args.max_startup_ms is not None and results["startup"]["lazy agent"]["startup ms"] > args.max_startup_ms:
+        failures.append(f"startup took {results['startup']['lazy agent']['startup ms']}ms > {args.max_startup_ms}ms")
+
+    if args.json:
+        print(json.dumps({**results, "failures": failures}, indent=2))
+    else:
+        print(f"import time, median of {args.repeat} fresh interpreters (ms, cumulative)")
+        for module in MODULES:
+            print(f"  {module:<22} {results['imports'][module]:>8}")
+        print("app.main, by app module")
+        for name, ms in results["imports"]["app.main modules"].items():
+            print(f"  {name:<22} {ms:>8}")
+        print("app.main, heaviest packages")
+        for name, ms in results["imports"]["app.main packages"].items():
+            print(f"  {name:<22} {ms:>8}")
+        print("startup (import app.main + startup handlers)")
+        for name, result in results["startup"].items():
+            print(f"  {name:<22} {result}")
+        for failure in failures:
+            print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
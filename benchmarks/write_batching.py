@@ -0,0 +1,120 @@
+"""
+Single-asset writes/sec with and without group commit.
+
+--concurrency writers each create (then update) assets one at a time, the same calls
+POST /assets and PUT /assets/{id} make:
+  per-request   AsyncSession + async_asset_crud.create/update, one transaction per write
+  group commit  write_batcher.create/update, concurrent writes share one transaction
+HTTP is left out so the numbers are the database write path (on a small machine the
+load generator and uvicorn would otherwise compete for the same cores).
+
+    python benchmarks/write_batching.py --concurrency 1,16,64 --writes 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--concurrency", default="1,16,64", help="comma separated writer counts")
+parser.add_argument("--writes", type=int, default=2000, help="creates (and as many updates) per run")
+parser.add_argument("--max-delay-ms", type=float, default=5)
+args = parser.parse_args()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ["CACHE_ENABLED"] = "false"
+os.environ["WRITE_BATCH_ENABLED"] = "true"
+os.environ["WRITE_BATCH_MAX_DELAY_MS"] = str(args.max_delay_ms)
+
+from app.database import AsyncSessionLocal, async_engine, init_db
+from app.routes.crud import async_asset_crud
+from app.schemas import AssetCreate, AssetUpdate
+from app.write_batch import write_batcher
+
+CATEGORIES = ["electronics", "furniture", "vehicle", "jewelry", "other"]
+STATUSES = ["active", "sold", "donated"]
+
+
+def new_asset(i: int) -> AssetCreate:
+    return AssetCreate(
+        name=f"asset {i}",
+        category=random.choice(CATEGORIES),
+        status=random.choice(STATUSES),
+        value=round(random.uniform(10, 10000), 2),
+        purchase_date=date(2024, 1, 1),
+    )
+
+
+async def per_request_create(asset: AssetCreate):
+    async with AsyncSessionLocal() as db:
+        return await async_asset_crud.create(db, asset)
+
+
+async def per_request_update(asset_id: str, changes: AssetUpdate):
+    async with AsyncSessionLocal() as db:
+        return await async_asset_crud.update(db, asset_id, changes)
+
+
+async def batched_create(asset: AssetCreate):
+    return await write_batcher.create(None, asset)
+
+
+async def batched_update(asset_id: str, changes: AssetUpdate):
+    return await write_batcher.update(None, asset_id, changes)
+
+
+async def drive(concurrency: int, calls: list) -> tuple:
+    latencies = []
+    results = []
+    queue = list(calls)
+
+    async def writer():
+        while queue:
+            call, call_args = queue.pop()
+            started = time.perf_counter()
+            results.append(await call(*call_args))
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "writes/s": round(len(latencies) / elapsed, 1),
+        "p50 ms": round(statistics.median(latencies) * 1000, 2),
+        "p99 ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }, results
+
+
+async def run(create, update, concurrency: int) -> dict:
+    create_stats, created = await drive(concurrency, [(create, (new_asset(i),)) for i in range(args.writes)])
+    changes = AssetUpdate(status="sold")
+    update_stats, updated = await drive(concurrency, [(update, (asset.id, changes)) for asset in created])
+    assert all(asset is not None and asset.status == "sold" for asset in updated)
+    return {"create": create_stats, "update": update_stats}
+
+
+async def main():
+    init_db()
+    levels = [int(level) for level in args.concurrency.split(",")]
+    print(f"writes={args.writes} max delay={args.max_delay_ms}ms")
+    for concurrency in levels:
+        print(f"per-request  c={concurrency:<4}", await run(per_request_create, per_request_update, concurrency))
+        batches, writes = write_batcher.batches, write_batcher.writes
+        result = await run(batched_create, batched_update, concurrency)
+        result["avg batch"] = round((write_batcher.writes - writes) / (write_batcher.batches - batches), 1)
+        print(f"group commit c={concurrency:<4}", result)
+    # pooled aiosqlite connections keep their worker threads (and the interpreter) alive otherwise
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,10 @@
+"""
+The app reads its settings when app.config is first imported, so the tests point it at a
+throwaway SQLite database before any test module imports the app.
+"""
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("OPEN_API_KEY", "sk-test")
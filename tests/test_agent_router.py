@@ -0,0 +1,29 @@
+"""Which questions the fast path answers, and with which purchase year"""
+import pytest
+
+from app.agent_router import FastPathRouter
+
+router = FastPathRouter(lambda question: [])
+
+
+@pytest.mark.parametrize("question, year", [
+    ("how many assets bought in 2024", 2024),
+    ("average value of sold vehicles bought in 2023", 2023),
+    ("total value of electronics purchased 2022", 2022),
+    ("how many assets purchased during 2021", 2021),
+    ("how many active assets", None),
+])
+def test_purchase_year(question, year):
+    route = router.parse(question)
+    assert route is not None and route.year == year
+
+
+@pytest.mark.parametrize("question", [
+    "how many assets were sold in 2024",  # a sale year
+    "how many assets sold 2024",
+    "how many assets in 2024",  # no purchase verb
+    "total value of assets worth 2000",  # an amount
+    "2024 how many assets",
+])
+def test_other_numbers_go_to_the_llm(question):
+    assert router.parse(question) is None
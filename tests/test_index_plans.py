@@ -0,0 +1,177 @@
+"""
+EXPLAIN QUERY PLAN checks for the asset list queries.
+
+Seeds the test database and asserts, for every supported filter/sort combination, that the
+page query (with its embedded total), the standalone total, the keyset (cursor) page and the
+export query:
+  - never scan the assets table without an index
+  - only use the partial ix_assets_live_* indexes or the primary key
+  - read rows already in order (no temp b-tree for ORDER BY) where an index matches the sort
+The app never runs ANALYZE, so the plans are checked without sqlite_stat1; INDEX_PLANS_ANALYZE=true
+checks them after ANALYZE, where the unfiltered count may scan the table (see app/indexes.py).
+Finally migrate_indexes has to turn an old schema (full indexes) into the current one.
+
+    python -m pytest tests/test_index_plans.py
+    python benchmarks/index_plans.py --rows 20000 --analyze
+"""
+import os
+import random
+import re
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, inspect, select
+from sqlalchemy.orm import Session
+
+from app.database import Base, engine, init_db
+from app.indexes import OBSOLETE_INDEXES, migrate_indexes
+from app.models import Asset
+from app.pagination import encode_cursor
+from app.routes.crud import async_asset_crud as crud
+
+ROWS = int(os.getenv("INDEX_PLANS_ROWS", 2000))
+ANALYZE = os.getenv("INDEX_PLANS_ANALYZE", "false").lower() == "true"
+
+CATEGORIES = ["electronics", "furniture", "vehicle", "jewelry", "other"]
+STATUSES = ["active", "sold", "donated"]
+SORTS = ["name", "value", "purchase_date", "created_at", "updated_at"]
+
+VALUE_RANGE = {"min_value": 100, "max_value": 500}
+DATE_RANGE = {"purchase_date_from": date(2022, 1, 1), "purchase_date_to": date(2022, 12, 31)}
+
+# (filters, sorts that must come straight out of an index)
+SUPPORTED = [
+    ({}, SORTS),
+    ({"category": "vehicle"}, ["created_at", "value"]),
+    ({"status": "active"}, ["created_at", "value"]),
+    ({"category": "vehicle", "status": "active"}, ["created_at", "value"]),
+    (VALUE_RANGE, ["value"]),
+    (DATE_RANGE, ["purchase_date"]),
+    ({"category": "vehicle", **VALUE_RANGE}, ["value"]),
+    ({"status": "sold", **DATE_RANGE}, []),
+    ({"category": "vehicle", **DATE_RANGE}, []),
+    ({"search": "asset"}, []),
+]
+
+COMBINATIONS = [
+    pytest.param(filters, sort_by, order, sort_by in ordered_sorts, id=f"{'+'.join(filters) or 'none'}-{sort_by}-{order}")
+    for filters, ordered_sorts in SUPPORTED
+    for sort_by in SORTS
+    for order in ("asc", "desc")
+]
+
+# a step reading the assets table itself (not assets_fts or asset_rollups)
+ASSETS_ACCESS = re.compile(r"^(SCAN|SEARCH) assets\b(?!_)")
+
+
+@pytest.fixture(scope="module")
+def conn():
+    init_db()
+    with engine.begin() as seeding:
+        seeding.execute(Asset.__table__.insert(), [
+            {
+                "name": f"asset {i}",
+                "category": random.choice(CATEGORIES),
+                "status": random.choice(STATUSES),
+                "value": round(random.uniform(10, 10000), 2),
+                "purchase_date": date(2020, 1, 1) + timedelta(days=random.randint(0, 1800)),
+                "description": None,
+                # a tenth soft deleted, they must not matter to any plan
+                "is_deleted": i % 10 == 0,
+            }
+            for i in range(ROWS)
+        ])
+    with engine.connect() as connection:
+        if ANALYZE:
+            connection.exec_driver_sql("ANALYZE")
+        yield connection
+
+
+@pytest.fixture(scope="module")
+def first(conn):
+    with Session(engine) as db:
+        return db.scalars(select(Asset).where(Asset.is_deleted == False).limit(1)).one()
+
+
+def plan(conn, statement) -> list:
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    return [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+
+
+def problems(lines: list, ordered: bool, scan_allowed: bool = False) -> list:
+    found = []
+    for line in lines:
+        if not ASSETS_ACCESS.match(line):
+            continue
+        if "USING" not in line:
+            if not scan_allowed:
+                found.append("full table scan")
+        elif "ix_assets_live_" not in line and "PRIMARY KEY" not in line and "sqlite_autoindex_assets" not in line:
+            found.append("not a live index")
+    if ordered and any("TEMP B-TREE FOR ORDER BY" in line for line in lines):
+        found.append("sorts in a temp b-tree")
+    return found
+
+
+@pytest.mark.parametrize("filters, sort_by, order, ordered", COMBINATIONS)
+def test_list_queries_use_live_indexes(conn, first, filters, sort_by, order, ordered):
+    page, total, _ = crud._page_statement(0, 100, sort_by, order, None, "exact", filters)
+    keyset, _, _ = crud._page_statement(0, 100, sort_by, order, encode_cursor(first, sort_by, order), "none", filters)
+    queries = {
+        "page": (page, ordered),
+        "total": (total, False),
+        "keyset": (keyset, ordered),
+        "export": (crud._export_select(sort_by, order, filters), ordered),
+    }
+    if "search" in filters:
+        # relevance order comes from bm25, only the filtering has to use indexes
+        relevance, _, _ = crud._page_statement(0, 100, "relevance", order, None, "exact", filters)
+        queries["relevance"] = (relevance, False)
+
+    failures = {}
+    for name, (statement, must_be_ordered) in queries.items():
+        lines = plan(conn, statement)
+        found = problems(lines, must_be_ordered, scan_allowed=ANALYZE and not filters)
+        if found:
+            failures[name] = (found, lines)
+    assert not failures
+
+
+def test_get_by_id_uses_primary_key(conn, first):
+    lines = plan(conn, select(Asset).where(*crud._by_id(first.id)))
+    assert not problems(lines, False), lines
+
+
+# the indexes databases were created with before the partial ones
+OLD_INDEXES = {
+    "ix_assets_id": "id",
+    "ix_assets_name": "name",
+    "ix_assets_status": "status",
+    "ix_assets_is_deleted": "is_deleted",
+    "ix_assets_name_id": "name, id",
+    "ix_assets_value_id": "value, id",
+    "ix_assets_purchase_date_id": "purchase_date, id",
+    "ix_assets_created_at_id": "created_at, id",
+    "ix_assets_updated_at_id": "updated_at, id",
+}
+
+
+def test_migrate_indexes_from_old_schema():
+    """An old schema (full indexes, index=True columns) ends up with exactly the model's indexes"""
+    old_engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'old.db')}")
+    with old_engine.begin() as old:
+        old.exec_driver_sql(
+            "CREATE TABLE assets (id VARCHAR PRIMARY KEY, name VARCHAR NOT NULL, category VARCHAR NOT NULL, value FLOAT NOT NULL, "
+            "purchase_date DATE NOT NULL, status VARCHAR NOT NULL, created_at DATETIME NOT NULL, description VARCHAR(500), "
+            "updated_at DATETIME NOT NULL, is_deleted BOOLEAN NOT NULL, deleted_at DATETIME)"
+        )
+        for name, columns in OLD_INDEXES.items():
+            old.exec_driver_sql(f"CREATE INDEX {name} ON assets ({columns})")
+
+    dropped, _ = migrate_indexes(old_engine, Base.metadata)
+
+    assert {index["name"] for index in inspect(old_engine).get_indexes("assets")} == {index.name for index in Asset.__table__.indexes}
+    assert sorted(dropped) == sorted(OBSOLETE_INDEXES)
+    # idempotent
+    assert migrate_indexes(old_engine, Base.metadata) == ([], [])
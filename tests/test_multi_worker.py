@@ -0,0 +1,170 @@
+"""
+N uvicorn workers against one database: stale reads, rate limits and agent sessions per shared-state backend.
+
+Migrates a throwaway SQLite database once (python -m app.migrate), then starts
+`uvicorn app.main:app --workers N` with SHARED_STATE_BACKEND set to the backend and, over a
+new connection per request (so the kernel spreads them over the workers):
+  stale reads  warms every worker's cache with an asset's detail and a list page, updates the
+               asset / creates one through some worker, then reads both back `reads` times:
+               any read without the write is stale
+  rate limit   sends 3 x burst requests as one client (X-Forwarded-For) with a bucket that
+               barely refills: with shared buckets only `burst` get through
+  sessions     stores an agent session through one process and reads it back through another
+A shared backend must have no stale read, let at most burst + 1 requests through and share
+sessions. The redis case is skipped without the redis package or a server at MULTI_WORKER_REDIS_URL.
+
+    python -m pytest tests/test_multi_worker.py
+    python benchmarks/multi_worker.py --workers 4 --backends memory,sqlite
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+REDIS_URL = os.getenv("MULTI_WORKER_REDIS_URL", "redis://localhost:6379/15")
+ASSET = {"name": "worker asset", "category": "vehicle", "status": "active", "value": 100, "purchase_date": "2024-01-01"}
+
+
+class Cluster:
+    """uvicorn workers on one database with one shared-state backend"""
+
+    def __init__(self, backend: str, workers: int = 4, burst: int = 20, port: int = 8767, redis_url: str = REDIS_URL):
+        self.backend = backend
+        self.workers = workers
+        self.burst = burst
+        self.port = port
+        self.base = f"http://127.0.0.1:{port}/api/v1"
+        self.state_dir = tempfile.mkdtemp()
+        self.env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(self.state_dir, 'bench.db')}",
+            SHARED_STATE_BACKEND=backend,
+            SHARED_STATE_URL=redis_url if backend == "redis" else os.path.join(self.state_dir, "shared_state.db"),
+        )
+        self.env.pop("ASYNC_DATABASE_URL", None)
+        self.server = None
+
+    def __enter__(self) -> "Cluster":
+        subprocess.run([sys.executable, "-W", "ignore", "-m", "app.migrate"], cwd=ROOT, env=self.env, check=True, stdout=subprocess.DEVNULL)
+        env = dict(
+            self.env,
+            DB_MIGRATE_ON_STARTUP="false",
+            RATE_LIMIT_TRUST_FORWARDED="true",
+            RATE_LIMIT_API_BURST=str(self.burst),
+            RATE_LIMIT_API_PER_SECOND="0.01",
+            AGENT_ENABLED="false",
+        )
+        self.server = subprocess.Popen(
+            [sys.executable, "-W", "ignore", "-m", "uvicorn", "app.main:app", "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+        )
+        for _ in range(400):
+            try:
+                httpx.get(f"http://127.0.0.1:{self.port}/")
+                # every worker has to be up before the reads are spread over them
+                time.sleep(1)
+                return self
+            except httpx.TransportError:
+                time.sleep(0.05)
+        self.__exit__()
+        raise RuntimeError("server did not start")
+
+    def __exit__(self, *exc) -> None:
+        self.server.terminate()
+        self.server.wait()
+
+    def request(self, method: str, path: str, client: str = None, **kwargs) -> httpx.Response:
+        """A new connection every time, so consecutive requests can land on different workers"""
+        headers = {"X-Forwarded-For": client or uuid.uuid4().hex, "Connection": "close"}
+        return httpx.request(method, self.base + path, headers=headers, timeout=30, **kwargs)
+
+    def stale_reads(self, rounds: int, reads: int, workers: set) -> dict:
+        asset = self.request("POST", "/assets", json=ASSET).json()
+        stale_details = stale_lists = done = 0
+        for round_ in range(rounds):
+            # warm the detail and the list page in (ideally) every worker
+            for _ in range(reads):
+                self.request("GET", f"/assets/{asset['id']}")
+                self.request("GET", "/assets", params={"category": "vehicle", "limit": 1})
+                workers.add(self.request("GET", "/cache/stats").json()["worker"])
+            total = self.request("GET", "/assets", params={"category": "vehicle", "limit": 1}).json()["total"]
+
+            value = 1000 + round_
+            assert self.request("PUT", f"/assets/{asset['id']}", json={"value": value}).status_code == 200
+            assert self.request("POST", "/assets", json=ASSET).status_code == 201
+
+            for _ in range(reads):
+                done += 1
+                if self.request("GET", f"/assets/{asset['id']}").json()["value"] != value:
+                    stale_details += 1
+                if self.request("GET", "/assets", params={"category": "vehicle", "limit": 1}).json()["total"] != total + 1:
+                    stale_lists += 1
+        return {"reads": done, "stale details": stale_details, "stale lists": stale_lists}
+
+    def rate_limited(self) -> dict:
+        client = f"burst-{uuid.uuid4().hex}"
+        codes = [self.request("GET", "/assets", client=client, params={"limit": 1}).status_code for _ in range(self.burst * 3)]
+        return {"sent": len(codes), "allowed": codes.count(200), "limited": codes.count(429)}
+
+    def shared_sessions(self) -> str:
+        """A session saved in one process must be visible to another"""
+        session_id = uuid.uuid4().hex
+        save = (
+            "import asyncio; from app.agent_memory import agent_memory\n"
+            "async def main():\n"
+            f"    s = await agent_memory.session('{session_id}'); s.record_turn('q', 'a'); await agent_memory.save(s)\n"
+            "asyncio.run(main())"
+        )
+        load = (
+            "import asyncio; from app.agent_memory import agent_memory\n"
+            f"print(len(asyncio.run(agent_memory.session('{session_id}')).turns))"
+        )
+        subprocess.run([sys.executable, "-W", "ignore", "-c", save], cwd=ROOT, env=self.env, check=True)
+        turns = subprocess.run([sys.executable, "-W", "ignore", "-c", load], cwd=ROOT, env=self.env, check=True, capture_output=True, text=True).stdout.strip()
+        return "shared" if turns == "1" else "per process"
+
+
+def run(backend: str, workers: int = 4, rounds: int = 20, reads: int = 12, burst: int = 20, port: int = 8767, redis_url: str = REDIS_URL) -> dict:
+    """Every check against one backend"""
+    seen = set()
+    with Cluster(backend, workers, burst, port, redis_url) as cluster:
+        result = {"stale reads": cluster.stale_reads(rounds, reads, seen), "rate limit": cluster.rate_limited()}
+    result.update(workers=len(seen), sessions=cluster.shared_sessions())
+    return result
+
+
+def problems(result: dict, burst: int) -> list:
+    """What a shared backend got wrong"""
+    found = []
+    reads = result["stale reads"]
+    if reads["stale details"] or reads["stale lists"]:
+        found.append(f"stale reads {reads}")
+    if result["rate limit"]["allowed"] > burst + 1:
+        found.append(f"{result['rate limit']['allowed']} requests allowed with a burst of {burst}")
+    if result["sessions"] != "shared":
+        found.append("agent sessions are not shared")
+    return found
+
+
+def redis_available() -> bool:
+    try:
+        import redis
+
+        return bool(redis.Redis.from_url(REDIS_URL, socket_connect_timeout=1).ping())
+    except Exception:
+        return False
+
+
+@pytest.mark.parametrize("backend", [
+    "sqlite",
+    pytest.param("redis", marks=pytest.mark.skipif(not redis_available(), reason=f"no redis package or server at {REDIS_URL}")),
+])
+def test_shared_backend_across_workers(backend):
+    result = run(backend, rounds=5, reads=8)
+    assert not problems(result, burst=20), result